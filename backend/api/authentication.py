@@ -0,0 +1,189 @@
+from collections import OrderedDict
+from copy import copy
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from cards.utils.helpers import hash_sha256
+
+
+class TTLCache:
+    """Thread-safe, process-local cache with a limited number of entries
+    (least recently used are evicted first) which expire after timeout
+    seconds.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_matching(self, predicate):
+        """Deletes entries with values for which the predicate is true.
+        """
+        with self._lock:
+            for key in [key for key, (_, value) in self._entries.items()
+                        if predicate(value)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TokenCache:
+    """Cache of token key -> (user, token) lookups: process-local or -
+    if settings.TOKEN_AUTH_CACHE["SHARED_CACHE"] names one of the CACHES -
+    shared between processes, so that invalidation reaches all of them.
+    Keys are stored hashed.
+
+    settings.TOKEN_AUTH_CACHE is read on each use, so changes of it (e.g.
+    with override_settings()) take effect.
+    """
+    key_prefix = "auth-token:"
+
+    def __init__(self):
+        self._local_cache = None
+        self._lock = Lock()
+
+    @property
+    def timeout(self):
+        return settings.TOKEN_AUTH_CACHE["TIMEOUT"]
+
+    @property
+    def local_cache(self) -> TTLCache:
+        """The process-local cache - a new (empty) one when its settings
+        have changed.
+        """
+        max_size = settings.TOKEN_AUTH_CACHE["MAX_SIZE"]
+        timeout = self.timeout
+        with self._lock:
+            cache = self._local_cache
+            if cache is None or cache.max_size != max_size \
+                    or cache.timeout != timeout:
+                cache = self._local_cache = TTLCache(max_size, timeout)
+        return cache
+
+    @property
+    def shared_cache(self):
+        alias = settings.TOKEN_AUTH_CACHE["SHARED_CACHE"]
+        if alias is None:
+            return None
+        return caches[alias]
+
+    def get_cache_key(self, key):
+        return self.key_prefix + hash_sha256(key)
+
+    def get(self, key):
+        cache_key = self.get_cache_key(key)
+        if self.shared_cache is not None:
+            return self.shared_cache.get(cache_key)
+        cached = self.local_cache.get(cache_key)
+        if cached is None:
+            return None
+        # copies, so that requests do not share (and modify) instances
+        user, token = (copy(instance) for instance in cached)
+        token.user = user
+        return user, token
+
+    def set(self, key, user, token):
+        cache_key = self.get_cache_key(key)
+        if self.shared_cache is not None:
+            self.shared_cache.set(cache_key, (user, token), self.timeout)
+        else:
+            self.local_cache.set(cache_key, (user, token))
+
+    def delete(self, key):
+        cache_key = self.get_cache_key(key)
+        if self.shared_cache is not None:
+            self.shared_cache.delete(cache_key)
+        self.local_cache.delete(cache_key)
+
+    def delete_user(self, user_pk):
+        """Deletes cached tokens of the user.
+        """
+        if self.shared_cache is not None:
+            self.shared_cache.delete_many(
+                [self.get_cache_key(key) for key in
+                 Token.objects.filter(user_id=user_pk)
+                 .values_list("key", flat=True)])
+        self.local_cache.delete_matching(
+            lambda entry: entry[0].pk == user_pk)
+
+    def clear(self):
+        if self.shared_cache is not None:
+            self.shared_cache.clear()
+        self.local_cache.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication which caches users for token keys (see
+    TokenCache), so authenticated requests do not query the database.
+
+    Cached entries are invalidated when the token is deleted (logout) and
+    when the user is saved (password change, deactivation) or deleted.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user, token)
+        return user, token
+
+
+def invalidate_token(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+def invalidate_user_tokens(sender, instance, **kwargs):
+    token_cache.delete_user(instance.pk)
+
+
+def invalidate_logged_out_user_tokens(sender, request, user, **kwargs):
+    if user is not None:
+        token_cache.delete_user(user.pk)
+
+
+def connect_signals():
+    post_delete.connect(invalidate_token, sender=Token)
+    post_save.connect(invalidate_user_tokens, sender=get_user_model())
+    post_delete.connect(invalidate_user_tokens, sender=get_user_model())
+    user_logged_out.connect(invalidate_logged_out_user_tokens)
@@ -0,0 +1,187 @@
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Keyset (seek) pagination: instead of OFFSET, the cursor holds
+    the ordering values of the last (or first) item on a page, and the next
+    page starts right after them - e.g. (created_on, id) or
+    (introduced_on, id). The ordering is taken from the paginated queryset,
+    the last ordering field has to be unique.
+
+    The total count is not computed unless requested with the 'count'
+    query parameter: 'exact' (COUNT(*)) or 'approximate' (the query
+    planner's estimate).
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self):
+        self.base_url = None
+        self.ordering = ()
+        self.count = None
+        self.page = []
+        self.has_next = False
+        self.has_previous = False
+        self.request = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+        self.count = self.get_count(queryset, request)
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by(*self._reversed(self.ordering))
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(
+                self._reversed(self.ordering) if reverse else self.ordering,
+                position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        response_data = OrderedDict()
+        if self.count is not None:
+            response_data["count"] = self.count
+        response_data["next"] = self.get_next_link()
+        response_data["previous"] = self.get_previous_link()
+        response_data["results"] = data
+        return Response(response_data)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    @staticmethod
+    def get_ordering(queryset) -> tuple[str, ...]:
+        ordering = tuple(queryset.query.order_by)
+        if not ordering or not all(isinstance(field, str)
+                                   for field in ordering):
+            raise TypeError("keyset pagination requires a queryset "
+                            "ordered by field names")
+        return ordering
+
+    def get_count(self, queryset, request) -> int | None:
+        match request.query_params.get(self.count_query_param):
+            case "exact":
+                return queryset.count()
+            case "approximate":
+                plan = json.loads(queryset.explain(format="json"))
+                return int(plan[0]["Plan"]["Plan Rows"])
+            case _:
+                return None
+
+    def decode_cursor(self, request) -> tuple[list | None, bool]:
+        encoded_cursor = request.query_params.get(self.cursor_query_param)
+        if encoded_cursor is None:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded_cursor.encode("ascii")))
+            position, reverse = cursor["p"], bool(cursor["r"])
+        except (BinasciiError, UnicodeError, ValueError, KeyError,
+                TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) \
+                or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, item, reverse) -> str:
+        position = [self._get_position_value(item, field.lstrip("-"))
+                    for field in self.ordering]
+        cursor = json.dumps({"p": position, "r": int(reverse)},
+                            separators=(",", ":"))
+        encoded_cursor = b64encode(cursor.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   encoded_cursor)
+
+    @staticmethod
+    def _get_position_value(item, field_path):
+        value = item
+        for attribute in field_path.split("__"):
+            value = getattr(value, attribute)
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return str(value)
+
+    @staticmethod
+    def _reversed(ordering) -> tuple[str, ...]:
+        return tuple(field[1:] if field.startswith("-") else f"-{field}"
+                     for field in ordering)
+
+    @staticmethod
+    def _seek_filter(ordering, position) -> Q:
+        """Builds a filter for items placed after the position, e.g. for
+        (created_on, id):
+        created_on >= x AND (created_on > x OR (created_on = x AND id > y))
+        The leading, non-strict condition lets the database use an index on
+        the first ordering field.
+        """
+        conditions = Q()
+        equal_so_far = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            conditions |= equal_so_far & Q(**{f"{name}__{lookup}": value})
+            equal_so_far &= Q(**{name: value})
+        first_field = ordering[0]
+        first_lookup = "lte" if first_field.startswith("-") else "gte"
+        return Q(**{f"{first_field.lstrip('-')}__{first_lookup}":
+                    position[0]}) & conditions
+
+
+class CardListPagination(PageNumberPagination):
+    """Page number pagination which switches to the keyset pagination when
+    requested with '?pagination=keyset' (or when a keyset cursor is given).
+    """
+    pagination_query_param = "pagination"
+    keyset_pagination_class = KeysetPagination
+
+    def __init__(self):
+        self.keyset_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_requested(request):
+            self.keyset_paginator = self.keyset_pagination_class()
+            return self.keyset_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def keyset_requested(self, request) -> bool:
+        cursor_query_param = self.keyset_pagination_class.cursor_query_param
+        return (request.query_params.get(self.pagination_query_param)
+                == "keyset" or cursor_query_param in request.query_params)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -4,15 +4,16 @@ from rest_framework.serializers import CharField, ModelSerializer, \
 from rest_framework_recursive.fields import RecursiveField
 from api.utils.helpers import get_card_body
 from cards.models import Card, Image, CardUserData, Category
+from wsra.performance import TimedSerializerMixin
 
 
-class ImageSerializer(ModelSerializer):
+class ImageSerializer(TimedSerializerMixin, ModelSerializer):
     class Meta:
         model = Image
         fields = ("id", "image",)
 
 
-class CategoryForCardSerializer(ModelSerializer):
+class CategoryForCardSerializer(TimedSerializerMixin, ModelSerializer):
     title = CharField(source="name")
     key = CharField(source="id")
 
@@ -29,7 +30,7 @@ class CategorySerializer(CategoryForCardSerializer):
         fields = ("key", "title", "children",)
 
 
-class CardForEditingSerializer(ModelSerializer):
+class CardForEditingSerializer(TimedSerializerMixin, ModelSerializer):
     front_images = ImageSerializer(many=True)
     back_images = ImageSerializer(many=True)
     categories = CategoryForCardSerializer(many=True)
@@ -42,7 +43,7 @@ class CardForEditingSerializer(ModelSerializer):
                             "back_images", "categories")
 
 
-class CrammedCardReviewDataSerializer(ModelSerializer):
+class CrammedCardReviewDataSerializer(TimedSerializerMixin, ModelSerializer):
     body = SerializerMethodField()
     categories = CategoryForCardSerializer(source="card.categories",
                                            many=True)
@@ -54,17 +55,17 @@ class CrammedCardReviewDataSerializer(ModelSerializer):
 
     @staticmethod
     def get_front_audio(obj):
-        if obj.question.front_audio:
-            return obj.question.front_audio.sound_file.url
+        if obj.card.front_audio:
+            return obj.card.front_audio.sound_file.url
 
     @staticmethod
     def get_back_audio(obj):
-        if obj.question.back_audio:
-            return obj.question.back_audio.sound_file.url
+        if obj.card.back_audio:
+            return obj.card.back_audio.sound_file.url
 
     def get_body(self, obj):
         request = self.context.get("request")
-        return get_card_body(obj.question, request)
+        return get_card_body(obj.card, request)
 
     @staticmethod
     def get_cram_link(obj):
@@ -72,7 +73,7 @@ class CrammedCardReviewDataSerializer(ModelSerializer):
         cram-queued and which in turn may be used for removing card from cram.
         """
         return reverse("cram_single_card",
-                       kwargs={"card_pk": obj.question.id,
+                       kwargs={"card_pk": obj.card.id,
                                "user_id": obj.user.id})
 
     class Meta:
@@ -92,7 +93,7 @@ class CardReviewDataSerializer(CrammedCardReviewDataSerializer):
         """Returns reviews simulation for currently scheduled cards only.
         """
         if obj.current_real_interval > 0:
-            return obj.question.simulate_reviews(user=obj.user)
+            return obj.card.simulate_reviews(user=obj.user)
 
     def get_cram_link(self, obj):
         if not obj.crammed:
@@ -100,7 +101,7 @@ class CardReviewDataSerializer(CrammedCardReviewDataSerializer):
         return super().get_cram_link(obj)
 
 
-class CardUserNoReviewDataSerializer(ModelSerializer):
+class CardUserNoReviewDataSerializer(TimedSerializerMixin, ModelSerializer):
     categories = CategoryForCardSerializer(many=True)
     front_audio = SerializerMethodField()
     back_audio = SerializerMethodField()
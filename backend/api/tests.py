@@ -1,17 +1,26 @@
+import asyncio
 import json
 import uuid
 from math import ceil
 import time_machine
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
-from django.test import TestCase
+from django.db import connection, transaction
+from django.test import TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
 from datetime import date, timedelta
 from datetime import datetime
 from random import choice, shuffle, randint
 from cards.models import Card, CardImage, CardTemplate, Category, CardUserData
 from faker import Faker
 from rest_framework import status
-from .utils.helpers import add_url_params, get_card_body
+from rest_framework.authtoken.models import Token
+from .authentication import TTLCache, token_cache
+from .utils.benchmarks import Dataset, compare_results, run_suite
+from .utils.custom_search_filters import search_cards, \
+    search_memorized_cards
+from .utils.helpers import add_url_params, compile_card_template, \
+    get_card_body
 
 if __name__ == "__main__" and __package__ is None:
     # overcoming sibling module imports problem
@@ -22,8 +31,10 @@ if __name__ == "__main__" and __package__ is None:
     path.append(dirname(path[0]))
 
 from rest_framework.test import APIClient
-from django.urls import reverse
-from cards.tests import FakeUsersCards, HelpersMixin
+from django.urls import resolve, reverse
+from cards.tests import FakeUsersCards, HelpersMixin, \
+    TemporaryMediaRootMixin
+from wsra.warmup import warm_up
 
 fake = Faker()
 
@@ -905,6 +916,29 @@ class ListOfCardsForUser(ApiTestHelpersMixin, TestCase):
         self.assertIn("<!-- fallback card template -->",
                       response_results[0]["body"])
 
+    def test_list_of_queued_cards_ignored(self):
+        """Cards ignored by the user should not be queued.
+        """
+        card_1, card_2, card_3 = self.make_fake_cards(3)
+        user_2 = self.make_fake_users(1)[0]
+        self.user.ignored_cards.add(card_1)
+        user_2.ignored_cards.add(card_2)
+        card_3.memorize(self.user)
+        response = self.client.get(reverse("queued_cards",
+                                           kwargs={"user_id": self.user.id}))
+
+        self.assertEqual(get_card_ids(response), [str(card_2.id)])
+
+    def test_queued_card_ignored(self):
+        """Ignored card should not be available as a single queued card.
+        """
+        card = self.make_fake_cards(1)[0]
+        self.user.ignored_cards.add(card)
+        response = self.client.get(reverse(
+            "queued_card", kwargs={"pk": card.id, "user_id": self.user.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_sum_memorized_queued_cards(self):
         """Test if number of cards for both endpoints:
         for memorized and not memorized cards - equals total number of cards.
@@ -1606,6 +1640,185 @@ class QueuedCardsFiltering(ApiTestHelpersMixin, TestCase):
                          str(self.selected_card.id))
 
 
+class CardsFullTextSearch(ApiTestHelpersMixin, TestCase):
+    """Full-text and partial-word (trigram) search of card lists.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.memorized_card = Card.objects.create(
+            front="<p>Which organ pumps the blood?</p>",
+            back="<p>The heart</p>")
+        self.queued_card = Card.objects.create(
+            front="<p>What are the <b>pumping</b> stations called?</p>",
+            back="<div>Pumping stations</div>")
+        self.other_card = Card.objects.create(
+            front="<p>Capital of France?</p>", back="<p>Paris</p>")
+        self.memorized_card.memorize(self.user)
+
+    def search(self, url, search_parameter, **params):
+        return get_card_ids(self.client.get(add_url_params(
+            url, {"search": search_parameter, **params})))
+
+    def test_stemmed_words(self):
+        found_ids = self.search(reverse_all_cards(self.user.id), "pumped")
+
+        self.assertCountEqual(found_ids, [str(self.memorized_card.id),
+                                          str(self.queued_card.id)])
+
+    def test_partial_words(self):
+        found_ids = self.search(reverse_queued_cards(self.user.id), "stati")
+
+        self.assertEqual(found_ids, [str(self.queued_card.id)])
+
+    def test_phrase_substrings(self):
+        """
+        Cards containing the searched phrase (case-insensitively, anywhere
+        in words) in the front, back or template body are found - as by
+        the former phrase search.
+        """
+        template = CardTemplate.objects.create(
+            title="Blood", description="Blood circulation",
+            body="<p>Circulatory system: {{ card.front }}</p>")
+        templated_card = Card.objects.create(
+            front="<p>Veins</p>", back="<p>Arteries</p>", template=template)
+        url = reverse_all_cards(self.user.id)
+
+        self.assertEqual(self.search(url, "ORGAN PUMP"),
+                         [str(self.memorized_card.id)])
+        self.assertEqual(self.search(url, "he hear"),
+                         [str(self.memorized_card.id)])
+        self.assertEqual(self.search(url, "ing stat"),
+                         [str(self.queued_card.id)])
+        self.assertEqual(self.search(url, "latory syst"),
+                         [str(templated_card.id)])
+
+    def test_html_tags_not_searched(self):
+        found_ids = self.search(reverse_all_cards(self.user.id), "div")
+
+        self.assertEqual(found_ids, [])
+
+    def test_memorized_cards(self):
+        other_user = self.make_fake_users(1)[0]
+        self.queued_card.memorize(other_user)
+        found_cards = search_memorized_cards(
+            "pumps", CardUserData.objects.filter(user=self.user))
+
+        self.assertEqual([review_data.card for review_data in found_cards],
+                         [self.memorized_card])
+
+    def test_rank_ordering(self):
+        best_match = Card.objects.create(front="<p>Pumping pumps</p>",
+                                         back="<p>pump</p>")
+        found_ids = self.search(reverse_all_cards(self.user.id), "pump",
+                                ordering="rank")
+        keyset_found_ids = self.search(reverse_all_cards(self.user.id),
+                                       "pump", ordering="rank",
+                                       pagination="keyset")
+
+        self.assertEqual(found_ids[0], str(best_match.id))
+        self.assertEqual(keyset_found_ids, found_ids)
+
+    def test_search_uses_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+            plan = search_cards("pumping stati", Card.objects.all()).explain()
+            cursor.execute("RESET enable_seqscan")
+
+        self.assertIn("card_search_vector_idx", plan)
+        self.assertIn("card_search_text_trgm_idx", plan)
+
+
+class KeysetPagination(ApiTestHelpersMixin, TestCase):
+    """Keyset pagination of card lists (opt-in with ?pagination=keyset).
+    """
+    NUMBER_OF_CARDS = 25
+
+    def setUp(self):
+        super().setUp()
+        self.cards = self.make_fake_cards(self.NUMBER_OF_CARDS)
+        self.ordered_ids = [str(card.id) for card in Card.objects.order_by(
+            "created_on", "id")]
+
+    @staticmethod
+    def get_page_ids(response_json):
+        return [card["id"] for card in response_json["results"]]
+
+    def get_all_pages(self, url):
+        ids = []
+        while url:
+            response_json = self.client.get(url).json()
+            ids.extend(self.get_page_ids(response_json))
+            url = response_json["next"]
+        return ids
+
+    def test_following_next_links(self):
+        url = add_url_params(reverse_queued_cards(self.user.id),
+                             {"pagination": "keyset"})
+        self.assertEqual(self.get_all_pages(url), self.ordered_ids)
+
+    def test_all_cards(self):
+        url = add_url_params(reverse_all_cards(self.user.id),
+                             {"pagination": "keyset"})
+        self.assertEqual(self.get_all_pages(url), self.ordered_ids)
+
+    def test_previous_link(self):
+        url = add_url_params(reverse_queued_cards(self.user.id),
+                             {"pagination": "keyset"})
+        first_page = self.client.get(url).json()
+        second_page = self.client.get(first_page["next"]).json()
+        previous_page = self.client.get(second_page["previous"]).json()
+
+        self.assertIsNone(first_page["previous"])
+        self.assertEqual(self.get_page_ids(second_page),
+                         self.ordered_ids[10:20])
+        self.assertEqual(self.get_page_ids(previous_page),
+                         self.ordered_ids[:10])
+        self.assertIsNone(previous_page["previous"])
+
+    def test_no_count_by_default(self):
+        url = add_url_params(reverse_queued_cards(self.user.id),
+                             {"pagination": "keyset"})
+        self.assertNotIn("count", self.client.get(url).json())
+
+    def test_exact_count(self):
+        url = add_url_params(reverse_queued_cards(self.user.id),
+                             {"pagination": "keyset", "count": "exact"})
+        self.assertEqual(self.client.get(url).json()["count"],
+                         self.NUMBER_OF_CARDS)
+
+    def test_approximate_count(self):
+        url = add_url_params(reverse_queued_cards(self.user.id),
+                             {"pagination": "keyset",
+                              "count": "approximate"})
+        self.assertIsInstance(self.client.get(url).json()["count"], int)
+
+    def test_search(self):
+        searched_cards = self.cards[:12]
+        for card in searched_cards:
+            card.front += " keyset search phrase"
+            card.save()
+        url = add_url_params(reverse_queued_cards(self.user.id),
+                             {"pagination": "keyset",
+                              "search": "keyset search phrase"})
+        expected_ids = [card_id for card_id in self.ordered_ids
+                        if card_id in {str(card.id)
+                                       for card in searched_cards}]
+
+        self.assertEqual(self.get_all_pages(url), expected_ids)
+
+    def test_invalid_cursor(self):
+        url = add_url_params(reverse_queued_cards(self.user.id),
+                             {"cursor": "invalid"})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_pagination_by_default(self):
+        response = self.client.get(reverse_queued_cards(self.user.id))
+        self.assertEqual(response.json()["count"], self.NUMBER_OF_CARDS)
+        self.assertEqual(get_card_ids(response), self.ordered_ids[:10])
+
+
 class CardsMultipleSubcategories(ApiTestHelpersMixin, TestCase):
     def setUp(self):
         super().setUp()
@@ -2630,3 +2843,393 @@ class UtilsTests(ApiTestFakeUsersCardsMixin, TestCase):
         self.assertIn("<!-- fallback card template -->", card_body)
         self.assertIn(card.front, card_body)
         self.assertIn(card.back, card_body)
+
+    def test_get_card_body_compiled_template_reused(self):
+        template = CardTemplate.objects.create(
+            title="compiled template",
+            body="<p>{{ card.front }}</p>")
+        cards = self.make_fake_cards(2)
+        for card in cards:
+            card.template = template
+            card.save()
+        compile_card_template.cache_clear()
+        bodies = [get_card_body(card, {}) for card in cards]
+
+        self.assertEqual(compile_card_template.cache_info().misses, 1)
+        self.assertEqual(compile_card_template.cache_info().hits, 1)
+        self.assertEqual(bodies, [f"<p>{card.front}</p>" for card in cards])
+
+    def test_warm_up_compiles_card_templates(self):
+        template = CardTemplate.objects.create(
+            title="warmed-up template",
+            body="<p>{{ card.back }}</p>")
+        compile_card_template.cache_clear()
+        warm_up()
+        card = self.make_fake_cards(1)[0]
+        card.template = template
+        card.save()
+        get_card_body(card, {})
+
+        self.assertEqual(compile_card_template.cache_info().misses, 1)
+        self.assertEqual(compile_card_template.cache_info().hits, 1)
+
+
+class QueryPlans(ApiTestHelpersMixin, TestCase):
+    """Queries run by the API on a seeded dataset should read the
+    CardUserData table using indexes: neither with sequential scans,
+    nor with index scans which filter out rows afterwards (which means
+    that an index for an access path is missing).
+    """
+    NUMBER_OF_CARDS = 1000
+    NUMBER_OF_USERS = 20
+    checked_table = "cards_carduserdata"
+
+    def setUp(self):
+        super().setUp()
+        self.seed_dataset()
+
+    def seed_dataset(self):
+        cards = Card.objects.bulk_create(
+            Card(front=f"query plan card {number}",
+                 back=f"query plan card {number} back")
+            for number in range(self.NUMBER_OF_CARDS))
+        users = [self.user, *get_user_model().objects.bulk_create(
+            get_user_model()(username=f"query_plan_user_{number}")
+            for number in range(self.NUMBER_OF_USERS - 1))]
+        category = self.create_category()
+        Card.categories.through.objects.bulk_create(
+            Card.categories.through(card=card, category=category)
+            for card in cards)
+        self.user.selected_categories.set([category])
+        # data distributed as in a real collection: few outstanding
+        # and crammed cards, memorized over a year
+        CardUserData.objects.bulk_create(
+            CardUserData(card=card, user=user,
+                         review_date=date.today() + timedelta(
+                             days=randint(-3, 180)),
+                         grade=choice([1, 2, 3, 4, 4, 4, 5, 5, 5, 5]),
+                         easiness_factor=round(randint(130, 400) / 100, 2),
+                         crammed=randint(0, 9) == 0)
+            for user in users for card in cards)
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {self.checked_table} "
+                           "SET introduced_on = introduced_on "
+                           "- random() * interval '365 days'")
+            cursor.execute("ANALYZE")
+
+    def get_urls(self):
+        card = Card.objects.first()
+        user_id = self.user.id
+        urls = [reverse(name, kwargs={"user_id": user_id}) for name in (
+            "all_cards", "memorized_cards", "outstanding_cards",
+            "queued_cards", "cram_queue", "general_statistics")]
+        urls.extend(reverse("distribution_dynamic_part",
+                            kwargs={"user_id": user_id,
+                                    "dynamic_part": dynamic_part})
+                    for dynamic_part in ("daily-cards", "memorized",
+                                         "grades", "e-factor"))
+        urls.append(reverse("memorized_card",
+                            kwargs={"user_id": user_id, "pk": card.id}))
+        urls.append(add_url_params(reverse_memorized_cards(user_id),
+                                   {"pagination": "keyset"}))
+        return urls
+
+    def get_table_scans(self, plan) -> list[dict]:
+        """Returns plan nodes which read the checked table.
+        """
+        table_scans = []
+        if plan.get("Relation Name") == self.checked_table:
+            table_scans.append(plan)
+        for sub_plan in plan.get("Plans", []):
+            table_scans.extend(self.get_table_scans(sub_plan))
+        return table_scans
+
+    def explain(self, sql) -> dict:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]["Plan"]
+
+    def test_index_access_paths(self):
+        for url in self.get_urls():
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            queries = [query["sql"] for query in context.captured_queries
+                       if query["sql"].startswith("SELECT")
+                       and self.checked_table in query["sql"]]
+            for sql in queries:
+                for table_scan in self.get_table_scans(self.explain(sql)):
+                    with self.subTest(url=url, sql=sql):
+                        self.assertNotEqual(table_scan["Node Type"],
+                                            "Seq Scan")
+                        self.assertNotIn("Filter", table_scan)
+
+
+class CachedTokenAuthentication(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.password = fake.password()
+        self.user = get_user_model().objects.create_user(
+            username=fake.profile()["username"], password=self.password)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.url = reverse_selected_categories(self.user.id)
+
+    def get_token_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        return response, [query["sql"] for query in context.captured_queries
+                          if Token._meta.db_table in query["sql"]]
+
+    def test_cached_user(self):
+        first_response, first_token_queries = self.get_token_queries()
+        response, token_queries = self.get_token_queries()
+
+        self.assertEqual(first_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(first_token_queries), 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_queries, [])
+
+    def test_logout(self):
+        self.client.get(self.url)
+        logout_response = self.client.post(reverse("logout"))
+        response = self.client.get(self.url)
+
+        self.assertEqual(logout_response.status_code,
+                         status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change(self):
+        self.client.get(self.url)
+        password_response = self.client.post(
+            reverse("user-set-password"),
+            {"current_password": self.password,
+             "new_password": fake.password(length=16)})
+        response, token_queries = self.get_token_queries()
+
+        self.assertEqual(password_response.status_code,
+                         status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(token_queries), 1)
+
+    def test_deactivation(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_settings_changed(self):
+        self.get_token_queries()
+        with override_settings(TOKEN_AUTH_CACHE={
+                "TIMEOUT": 0, "MAX_SIZE": 10, "SHARED_CACHE": None}):
+            self.get_token_queries()
+            response, token_queries = self.get_token_queries()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(token_queries), 1)
+
+    def test_cache_expiry(self):
+        cache = TTLCache(max_size=10, timeout=0)
+        cache.set("key", "value")
+
+        self.assertIsNone(cache.get("key"))
+
+    def test_cache_size(self):
+        cache = TTLCache(max_size=2, timeout=60)
+        for key in ("first", "second", "third"):
+            cache.set(key, key)
+
+        self.assertIsNone(cache.get("first"))
+        self.assertEqual(cache.get("third"), "third")
+        self.assertEqual(len(cache), 2)
+
+
+class AsyncViews(ApiTestHelpersMixin, TestCase):
+    def get_async_urls(self):
+        card = self.make_fake_cards(1)[0]
+        user_id = self.user.id
+        return [
+            reverse_outstanding_cards(user_id),
+            reverse("memorized_card", kwargs={"user_id": user_id,
+                                              "pk": card.id}),
+        ]
+
+    def test_async_views(self):
+        for url in self.get_async_urls():
+            with self.subTest(url=url):
+                self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func))
+
+    def test_unauthenticated(self):
+        client = APIClient()
+        for url in self.get_async_urls():
+            with self.subTest(url=url):
+                self.assertEqual(client.get(url).status_code,
+                                 status.HTTP_401_UNAUTHORIZED)
+
+    def test_memorized_card_not_found(self):
+        url = reverse("memorized_card", kwargs={"user_id": self.user.id,
+                                                "pk": uuid.uuid4()})
+
+        self.assertEqual(self.client.get(url).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    def test_sync_handlers(self):
+        """Sync handlers of the same view still work.
+        """
+        card = self.make_fake_cards(1)[0]
+        card.memorize(self.user)
+        url = reverse("memorized_card", kwargs={"user_id": self.user.id,
+                                                "pk": card.id})
+        response = self.client.delete(url)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(CardUserData.objects.filter(card=card).exists())
+
+
+@override_settings(PERFORMANCE_METRICS={
+    "ENABLED": True, "SAMPLE_RATE": 1, "SLOW_REQUEST_MS": 60000})
+class PerformanceMetrics(ApiTestHelpersMixin, TestCase):
+    @staticmethod
+    def get_server_timing(response) -> dict:
+        metrics = {}
+        for metric in response.headers["Server-Timing"].split(", "):
+            name, *params = metric.split(";")
+            metrics[name] = dict(param.split("=", 1) for param in params)
+        return metrics
+
+    def test_server_timing(self):
+        self.make_fake_cards(3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse_queued_cards(self.user.id))
+        server_timing = self.get_server_timing(response)
+
+        self.assertEqual(set(server_timing),
+                         {"sql", "serialize", "render", "total"})
+        self.assertEqual(server_timing["sql"]["desc"],
+                         f'"{len(queries)} queries"')
+        self.assertGreater(float(server_timing["render"]["dur"]), 0)
+        self.assertGreaterEqual(float(server_timing["serialize"]["dur"]),
+                                float(server_timing["render"]["dur"]))
+        self.assertGreaterEqual(float(server_timing["total"]["dur"]),
+                                float(server_timing["serialize"]["dur"]))
+
+    def test_async_view_queries(self):
+        response = self.client.get(reverse_outstanding_cards(self.user.id))
+
+        self.assertNotEqual(self.get_server_timing(response)["sql"]["desc"],
+                            '"0 queries"')
+
+    async def test_async_request(self):
+        """Requests are measured by the middleware in async mode.
+        """
+        token = await Token.objects.acreate(user=self.user)
+        response = await self.async_client.get(
+            reverse_outstanding_cards(self.user.id),
+            AUTHORIZATION=f"Token {token.key}")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(self.get_server_timing(response)["sql"]["desc"],
+                            '"0 queries"')
+
+    def test_structured_log(self):
+        url = reverse_queued_cards(self.user.id)
+        with self.assertLogs("wsra.performance", "INFO") as logs:
+            self.client.get(url)
+        record = json.loads(logs.records[0].getMessage())
+
+        self.assertEqual(logs.records[0].levelname, "INFO")
+        self.assertEqual(record["path"], url)
+        self.assertEqual(record["status"], status.HTTP_200_OK)
+        self.assertFalse(record["slow"])
+        self.assertEqual(set(record) - {"method", "path", "status", "slow"},
+                         {"sql_count", "sql_ms", "serialize_ms", "render_ms",
+                          "total_ms"})
+
+    @override_settings(PERFORMANCE_METRICS={
+        "ENABLED": True, "SAMPLE_RATE": 0, "SLOW_REQUEST_MS": 0})
+    def test_slow_request_not_sampled(self):
+        with self.assertLogs("wsra.performance", "WARNING") as logs:
+            response = self.client.get(reverse_queued_cards(self.user.id))
+        record = json.loads(logs.records[0].getMessage())
+
+        self.assertNotIn("Server-Timing", response.headers)
+        self.assertTrue(record["slow"])
+        self.assertIn("total_ms", record)
+        self.assertNotIn("sql_count", record)
+
+    @override_settings(PERFORMANCE_METRICS={
+        "ENABLED": False, "SAMPLE_RATE": 1, "SLOW_REQUEST_MS": 0})
+    def test_disabled(self):
+        response = self.client.get(reverse_queued_cards(self.user.id))
+
+        self.assertNotIn("Server-Timing", response.headers)
+
+
+@tag("benchmark")
+class BenchmarkSuite(TemporaryMediaRootMixin, TestCase):
+    """Smoke tests of the benchmark suite on tiny datasets - run with
+    the other tests (tagged only so they can be excluded with
+    --exclude-tag benchmark). Benchmarks themselves are run with
+    the benchmark_suite management command.
+    """
+
+    def test_suite_results(self):
+        results = run_suite(Dataset(users=2, cards=20, categories=4),
+                            repeat=2)
+
+        self.assertEqual(results["dataset"]["cards"], 20)
+        self.assertIn("GET queued_cards", results["results"])
+        self.assertIn("PATCH queued_card", results["results"])
+        self.assertIn("SM2 (100 reviews)", results["results"])
+        queued_cards = results["results"]["GET queued_cards"]
+        self.assertEqual(queued_cards["status"], status.HTTP_200_OK)
+        self.assertEqual(queued_cards["runs"], 2)
+        self.assertGreater(queued_cards["queries"], 0)
+        json.dumps(results)
+
+    def test_write_requests_rolled_back(self):
+        results = run_suite(Dataset(users=1, cards=10, categories=2,
+                                    crammed=1),
+                            repeat=1, names=["DELETE"])
+
+        self.assertEqual(
+            results["results"]["DELETE memorized_card"]["status"],
+            status.HTTP_204_NO_CONTENT)
+        self.assertEqual(CardUserData.objects.filter(crammed=True).count(),
+                         5)
+
+    def test_queries_independent_of_dataset_size(self):
+        # datasets with more than a page of cards in each list
+        names = ["GET queued_cards", "GET list_cards"]
+        with transaction.atomic():
+            small = run_suite(Dataset(users=1, cards=100), repeat=1,
+                              names=names)
+            transaction.set_rollback(True)
+        large = run_suite(Dataset(users=1, cards=200), repeat=1, names=names)
+
+        for name in names:
+            self.assertEqual(small["results"][name]["queries"],
+                             large["results"][name]["queries"], name)
+
+    def test_compare_results(self):
+        baseline = {"results": {
+            "slower": {"p50_ms": 10, "queries": 3},
+            "more queries": {"p50_ms": 10, "queries": 3},
+            "unchanged": {"p50_ms": 10, "queries": 3}}}
+        results = {"results": {
+            "slower": {"p50_ms": 15, "queries": 3},
+            "more queries": {"p50_ms": 10, "queries": 4},
+            "unchanged": {"p50_ms": 11, "queries": 3},
+            "new": {"p50_ms": 100, "queries": 100}}}
+
+        regressions = compare_results(results, baseline)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("slower: p50"))
+        self.assertEqual(regressions[1], "more queries: queries 3 -> 4")
@@ -0,0 +1,51 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+
+
+class AsyncAPIViewMixin:
+    """Lets DRF views define async handlers (DRF's APIView dispatches
+    requests synchronously). Authentication, permission checks and
+    the view's sync handlers run in a thread, async handlers
+    on the event loop.
+    """
+    # handlers may be both sync and async
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, request.method.lower(),
+                              self.http_method_not_allowed) \
+                if request.method.lower() in self.http_method_names \
+                else self.http_method_not_allowed
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(
+                    request, *args, **kwargs)
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        self.response = self.finalize_response(request, response,
+                                               *args, **kwargs)
+        return self.response
+
+
+async def aget_object_or_404(queryset, **kwargs):
+    """Async counterpart of django.shortcuts.get_object_or_404
+    (for querysets).
+    """
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(f"No {queryset.model._meta.object_name} matches "
+                      "the given query.")
+
@@ -0,0 +1,369 @@
+"""
+Benchmark suite: API endpoints (all of them in api/urls.py), the SM2
+algorithm, CardUserData.schedule_date_for_review and the FullRecall
+importer's card conversion and tag stripping (compared with the one done
+with BeautifulSoup) - timed on a seeded dataset.
+
+Results (p50/p95/mean times and numbers of queries of each benchmark)
+are JSON-serializable, so runs can be stored and compared against
+a baseline (see compare_results()).
+"""
+
+import datetime
+import platform
+import random
+from statistics import mean, median, quantiles
+from time import perf_counter
+
+import django
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from cards.management.fr_importer.modules.item_formatter import \
+    format_items
+from cards.management.fr_importer.modules.tag_stripper import \
+    strip_tags_except, strip_tags_with_soup
+from cards.models import Card, CardUserData, Category, VisibleCard
+from cards.utils.supermemo2 import SM2
+
+
+class Dataset:
+    """Seeded (reproducible) benchmark data: users with selected
+    categories and cards in various review states: queued, memorized
+    (outstanding or scheduled for review) and crammed.
+    """
+    prefix = "benchmark"
+
+    def __init__(self, users=3, cards=1000, categories=20, memorized=0.5,
+                 outstanding=0.2, crammed=0.1, seed=0, batch_size=5000):
+        self.users = users
+        self.cards = cards
+        self.categories = categories
+        # fractions of cards memorized by each user, and of the memorized:
+        # outstanding and crammed
+        self.memorized = memorized
+        self.outstanding = outstanding
+        self.crammed = crammed
+        self.seed = seed
+        self.batch_size = batch_size
+
+    def as_dict(self) -> dict:
+        return {key: getattr(self, key) for key in
+                ("users", "cards", "categories", "memorized", "outstanding",
+                 "crammed", "seed")}
+
+    def create(self):
+        """Creates the data (with bulk operations) and returns the first
+        user (the one benchmarked requests are made for).
+        """
+        rng = random.Random(self.seed)
+        users = get_user_model().objects.bulk_create(
+            [get_user_model()(username=f"{self.prefix}-user-{number}")
+             for number in range(self.users)])
+        categories = self.create_categories(rng)
+        cards = Card.objects.bulk_create(
+            [Card(front=f"{self.prefix} card {number} front "
+                        f"word{rng.randrange(1000)}",
+                  back=f"{self.prefix} card {number} back "
+                       f"word{rng.randrange(1000)}")
+             for number in range(self.cards)],
+            batch_size=self.batch_size)
+        Card.update_search_fields(Card.objects.filter(
+            id__in=[card.id for card in cards]),
+            batch_size=self.batch_size)
+        Card.categories.through.objects.bulk_create(
+            [Card.categories.through(card_id=card.id,
+                                     category_id=rng.choice(categories).id)
+             for card in cards],
+            batch_size=self.batch_size)
+        get_user_model().selected_categories.through.objects.bulk_create(
+            [get_user_model().selected_categories.through(
+                user_id=user.id, category_id=category.id)
+             for user in users
+             for category in rng.sample(categories,
+                                        max(len(categories) // 2, 1))])
+        # bulk operations send no signals
+        VisibleCard.rebuild_all()
+        for user in users:
+            self.memorize_cards(rng, user, cards)
+        return users[0]
+
+    def create_categories(self, rng) -> list[Category]:
+        categories = []
+        roots = max(int(self.categories ** 0.5), 1)
+        for number in range(self.categories):
+            parent = rng.choice(categories) if number >= roots else None
+            categories.append(Category.objects.create(
+                name=f"{self.prefix} category {number}", parent=parent))
+        return categories
+
+    def memorize_cards(self, rng, user, cards):
+        today = datetime.date.today()
+        review_data = []
+        for card in rng.sample(cards, int(len(cards) * self.memorized)):
+            outstanding = rng.random() < self.outstanding
+            interval = rng.randint(1, 60)
+            review_date = today - datetime.timedelta(
+                days=rng.randint(0, 10)) if outstanding \
+                else today + datetime.timedelta(days=rng.randint(1, 60))
+            review_data.append(CardUserData(
+                card=card, user=user,
+                computed_interval=interval,
+                reviews=rng.randint(1, 10),
+                last_reviewed=review_date - datetime.timedelta(
+                    days=interval),
+                review_date=review_date,
+                grade=rng.randint(0, 5),
+                easiness_factor=round(rng.uniform(1.3, 3.0), 2),
+                crammed=rng.random() < self.crammed))
+        CardUserData.objects.bulk_create(review_data,
+                                         batch_size=self.batch_size)
+
+
+def get_statistics(timings, queries) -> dict:
+    """Returns statistics of timings (in milliseconds).
+    """
+    return {
+        "runs": len(timings),
+        "p50_ms": round(median(timings), 3),
+        "p95_ms": round(quantiles(timings, n=20)[-1]
+                        if len(timings) > 1 else timings[0], 3),
+        "mean_ms": round(mean(timings), 3),
+        "queries": queries,
+    }
+
+
+class QueryCounter:
+    """Database execute wrapper counting queries.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_benchmark(benchmark_fn, repeat) -> dict:
+    """Runs the function once to count its queries (and warm up caches),
+    then times repeat runs.
+    """
+    query_counter = QueryCounter()
+    with connection.execute_wrapper(query_counter):
+        result = benchmark_fn()
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        benchmark_fn()
+        timings.append((perf_counter() - start) * 1000)
+    statistics = get_statistics(timings, query_counter.count)
+    if isinstance(result, int):
+        # status code of the response
+        statistics["status"] = result
+    return statistics
+
+
+def get_endpoint_benchmarks(user) -> dict:
+    """Returns requests to every endpoint (named with the method and
+    the URL's name), as functions returning the response's status code.
+    Changes made by requests are rolled back (the numbers of their queries
+    include the savepoint's).
+    """
+    staff_user = get_user_model().objects.create(
+        username=f"{Dataset.prefix}-staff-user", is_staff=True)
+    user_cards = CardUserData.objects.filter(user=user)
+    outstanding = user_cards.filter(
+        review_date__lte=datetime.date.today()).first()
+    not_crammed = user_cards.filter(crammed=False).first()
+    crammed = user_cards.filter(crammed=True).first()
+    queued_card = Card.get_queued_cards(user).filter(
+        VisibleCard.is_visible(user)).first()
+    any_card = Card.objects.first()
+    user_id = {"user_id": user.id}
+
+    def user_url(name, **kwargs):
+        return reverse(name, kwargs={**user_id, **kwargs})
+
+    # name: (user, method, url, data)
+    requests = {
+        "GET list_cards": (staff_user, "get", reverse("list_cards"), None),
+        "GET single_card": (staff_user, "get", reverse(
+            "single_card", kwargs={"pk": any_card.id}), None),
+        "GET all_cards": (user, "get", user_url("all_cards"), None),
+        "GET memorized_cards": (user, "get", user_url("memorized_cards"),
+                                None),
+        "GET outstanding_cards": (user, "get",
+                                  user_url("outstanding_cards"), None),
+        "GET queued_cards": (user, "get", user_url("queued_cards"), None),
+        "GET cram_queue": (user, "get", user_url("cram_queue"), None),
+        "DELETE cram_queue": (user, "delete", user_url("cram_queue"), None),
+        "GET user_categories": (user, "get", user_url("user_categories"),
+                                None),
+        "GET selected_categories": (user, "get",
+                                    user_url("selected_categories"), None),
+        "PUT selected_categories": (
+            user, "put", user_url("selected_categories"),
+            user.selected_categories_ids),
+        "GET distribution": (user, "get", user_url("distribution"), None),
+        "GET distribution_dynamic_part": (
+            user, "get",
+            user_url("distribution_dynamic_part", dynamic_part="memorized"),
+            None),
+        "GET general_statistics": (user, "get",
+                                   user_url("general_statistics"), None),
+    }
+    if outstanding is not None:
+        url = user_url("memorized_card", pk=outstanding.card_id)
+        requests["GET memorized_card"] = (user, "get", url, None)
+        requests["PATCH memorized_card"] = (user, "patch", url,
+                                            {"grade": 4})
+        requests["DELETE memorized_card"] = (user, "delete", url, None)
+    if queued_card is not None:
+        url = user_url("queued_card", pk=queued_card.id)
+        requests["GET queued_card"] = (user, "get", url, None)
+        requests["PATCH queued_card"] = (user, "patch", url, {"grade": 4})
+    if not_crammed is not None:
+        requests["PUT cram_queue"] = (user, "put", user_url("cram_queue"),
+                                      {"card_pk": str(not_crammed.card_id)})
+    if crammed is not None:
+        requests["DELETE cram_single_card"] = (
+            user, "delete",
+            user_url("cram_single_card", card_pk=crammed.card_id), None)
+
+    clients = {}
+    for request_user in (user, staff_user):
+        client = APIClient(raise_request_exception=False,
+                           HTTP_HOST="localhost")
+        client.force_authenticate(user=request_user)
+        clients[request_user] = client
+
+    def make_request(request_user, method, url, data):
+        send = getattr(clients[request_user], method)
+        if method == "get":
+            return lambda: send(url, secure=True).status_code
+
+        def send_and_roll_back():
+            with transaction.atomic():
+                status_code = send(url, data, format="json",
+                                   secure=True).status_code
+                transaction.set_rollback(True)
+            return status_code
+        return send_and_roll_back
+
+    return {name: make_request(*request)
+            for name, request in requests.items()}
+
+
+def get_card_sides(number, seed=0) -> list[str]:
+    """Seeded card sides like the ones in elements.xml files: mostly plain
+    text, some with formatting tags, entities, line breaks and media tags.
+    """
+    rng = random.Random(seed)
+    lines = ["definition of a word", "to take [...] into account",
+             "key [p@'tenS(e)l]", "He, he, he! You will pardon me.",
+             "<i>idiom</i> - informal", "<b>Definition</b><br>meaning",
+             "A &amp; B", "<strike>old</strike> new", "łódź, żółw"]
+    media = ["<img>../obrazy/image.jpg</img>", "<snd>snds/sound.mp3</snd>"]
+    sides = []
+    for _ in range(number):
+        side = "\n".join(rng.choices(lines, k=rng.randint(1, 4)))
+        if rng.random() < 0.2:
+            side += rng.choice(media)
+        sides.append(side)
+    return sides
+
+
+def get_function_benchmarks(user, importer_cards=100) -> dict:
+    review_data = CardUserData.objects.filter(user=user) \
+        .select_related("user").first()
+    rng = random.Random(0)
+
+    def sm2_reviews():
+        sm2 = SM2.first_review(4)
+        for _ in range(100):
+            sm2.review(rng.randint(0, 5))
+
+    fr_cards = [{
+        "question": f"definition {number}\nexample sentence {number}",
+        "answer": f"answer {number}\nkey [dIn6n3i:ItB:ri:]\n"
+                  f"sentence {number}\nsentence {number + 1}",
+        "review_details": {"id": 1236435838, "tmtrpt": 6574,
+                           "stmtrpt": 6574, "livl": 1274, "rllivl": 1764,
+                           "ivl": 583, "rp": 6, "gr": number % 6}}
+        for number in range(importer_cards)]
+
+    def import_cards():
+        format_items(fr_cards, 1186655166)
+
+    card_sides = get_card_sides(importer_cards * 2)
+
+    def strip_tags(strip):
+        return lambda: [strip(side) for side in card_sides]
+
+    benchmarks = {
+        "SM2 (100 reviews)": sm2_reviews,
+        f"importer ({importer_cards} cards)": import_cards,
+        f"tag stripping ({len(card_sides)} sides)":
+            strip_tags(strip_tags_except),
+        f"tag stripping (bs4, {len(card_sides)} sides)":
+            strip_tags(strip_tags_with_soup)}
+    if review_data is not None:
+        benchmarks["schedule_date_for_review"] = \
+            lambda: review_data.schedule_date_for_review(
+                datetime.date.today(), days_range=7)
+    return benchmarks
+
+
+def run_suite(dataset: Dataset, repeat=20, names=None) -> dict:
+    """Seeds the dataset and runs the benchmarks (all or those with
+    the names containing one of the names). The data should be rolled
+    back by the caller.
+    """
+    user = dataset.create()
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    benchmarks = {**get_endpoint_benchmarks(user),
+                  **get_function_benchmarks(user)}
+    results = {}
+    for name, benchmark_fn in benchmarks.items():
+        if names and not any(part in name for part in names):
+            continue
+        results[name] = run_benchmark(benchmark_fn, repeat)
+    return {
+        "dataset": dataset.as_dict(),
+        "repeat": repeat,
+        "environment": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+        },
+        "results": results,
+    }
+
+
+def compare_results(results, baseline, threshold=0.2,
+                    min_difference_ms=0.5) -> list[str]:
+    """Returns regressions of results against the baseline: benchmarks
+    with p50 time longer by more than the threshold (and
+    min_difference_ms) or with more queries.
+    """
+    regressions = []
+    for name, current in results["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        difference = current["p50_ms"] - previous["p50_ms"]
+        if difference > previous["p50_ms"] * threshold \
+                and difference > min_difference_ms:
+            regressions.append(
+                f"{name}: p50 {previous['p50_ms']:.2f} -> "
+                f"{current['p50_ms']:.2f} ms "
+                f"(+{difference / previous['p50_ms']:.0%})")
+        if current["queries"] > previous["queries"]:
+            regressions.append(
+                f"{name}: queries {previous['queries']} -> "
+                f"{current['queries']}")
+    return regressions
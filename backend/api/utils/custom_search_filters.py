@@ -1,5 +1,47 @@
-from django.db.models import Q
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Q
+from rest_framework import filters
+from cards.apps import CardsConfig
 from cards.models import Card, CardUserData
+from cards.utils.helpers import get_search_text
+
+# lookup prefixes of the card's fields
+card_prefixes = {
+    Card: "",
+    CardUserData: "card__",
+}
+
+
+def get_search_query(search_parameter) -> SearchQuery:
+    return SearchQuery(get_search_text(search_parameter),
+                       search_type="websearch",
+                       config=CardsConfig.search_config)
+
+
+def search_cards(search_parameter, queryset, prefix=""):
+    """Filters cards matching the search parameter with either
+    the full-text search (on card's search vector) or - for partial
+    words - with each of the search terms contained in the card's search
+    text (resolved with the trigram index).
+    """
+    search_text = get_search_text(search_parameter)
+    if not search_text:
+        return queryset
+    contains_terms = Q()
+    for term in search_text.replace(",", " ").split():
+        contains_terms &= Q(**{f"{prefix}search_text__icontains": term})
+    return queryset.filter(
+        Q(**{f"{prefix}search_vector": get_search_query(search_text)}) |
+        contains_terms)
+
+
+def rank_cards(search_parameter, queryset, prefix=""):
+    """Orders cards by the full-text search rank (preserving the former
+    ordering for cards with equal rank).
+    """
+    return queryset.annotate(search_rank=SearchRank(
+        F(f"{prefix}search_vector"), get_search_query(search_parameter))) \
+        .order_by("-search_rank", *queryset.query.order_by)
 
 
 def get_search_cards_filter(queryset_filter, card_type):
@@ -17,19 +59,38 @@ def get_search_cards_filter(queryset_filter, card_type):
 
 
 def search_queued_cards(search_parameter, queryset):
-    return queryset.filter(
-        Q(front__icontains=search_parameter) |
-        Q(back__icontains=search_parameter) |
-        Q(template__body__icontains=search_parameter))
+    return search_cards(search_parameter, queryset)
 
 
 def search_memorized_cards(search_parameter, queryset):
-    return queryset.filter(
-        Q(card__front__icontains=search_parameter) |
-        Q(card__back__icontains=search_parameter) |
-        Q(card__template__body__icontains=search_parameter))
+    return search_cards(search_parameter, queryset,
+                        prefix=card_prefixes[CardUserData])
 
 
 filter_queued_cards = get_search_cards_filter(search_queued_cards, Card)
 filter_memorized_cards = get_search_cards_filter(
     search_memorized_cards, CardUserData)
+
+
+class CardSearchFilter(filters.SearchFilter):
+    """Search filter for lists of cards (Card and CardUserData querysets).
+    Results are ordered by the search rank when requested with
+    '?ordering=rank'.
+    """
+    ordering_param = "ordering"
+    rank_ordering = "rank"
+
+    def filter_queryset(self, request, queryset, view):
+        search_parameter = request.query_params.get(self.search_param, "")
+        if not get_search_text(search_parameter):
+            return queryset
+        if queryset.model not in card_prefixes:
+            raise TypeError("the queryset should be of type "
+                            + " or ".join(str(card_type)
+                                          for card_type in card_prefixes))
+        prefix = card_prefixes[queryset.model]
+        queryset = search_cards(search_parameter, queryset, prefix)
+        if request.query_params.get(self.ordering_param) \
+                == self.rank_ordering:
+            queryset = rank_cards(search_parameter, queryset, prefix)
+        return queryset
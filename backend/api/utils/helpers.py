@@ -1,4 +1,5 @@
 import json
+from functools import lru_cache
 from json import JSONDecodeError
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
@@ -8,6 +9,7 @@ from django.template import Context, Template
 from django.template.loader import render_to_string
 from rest_framework import status
 from rest_framework.response import Response
+from wsra.performance import measure
 
 User = get_user_model()
 
@@ -49,6 +51,14 @@ def no_review_data_response(card):
     return response
 
 
+@lru_cache(maxsize=256)
+def compile_card_template(body) -> Template:
+    """Compiles (once per process for the same body) card's database
+    template. Compiled templates are reusable between threads.
+    """
+    return Template(body)
+
+
 def get_card_body(card, request):
     """Renders body using fields: Card.front Card.back and Card.template.
     Should be appended as a method to a serializer.
@@ -58,10 +68,11 @@ def get_card_body(card, request):
         "card": card,
         "request": request
     }
-    if card.template:
-        context = Context(context_data)
-        template = Template(card.template.body, context)
-        card_rendering = template.render(context)
-    else:
-        card_rendering = render_to_string("fallback.html", context_data)
+    with measure("render"):
+        if card.template:
+            context = Context(context_data)
+            template = compile_card_template(card.template.body)
+            card_rendering = template.render(context)
+        else:
+            card_rendering = render_to_string("fallback.html", context_data)
     return card_rendering
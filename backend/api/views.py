@@ -1,33 +1,36 @@
 import datetime
 import uuid
+from asgiref.sync import sync_to_async
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q
 from django.urls import reverse
 from django.shortcuts import get_object_or_404
-from rest_framework import status, filters, serializers
+from rest_framework import status, serializers
 from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.generics import RetrieveAPIView, ListAPIView, \
     RetrieveUpdateAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from cards.models import Card, CardUserData, Category
+from cards.models import Card, CardUserData, Category, VisibleCard
 from cards.utils.exceptions import CardReviewDataExists, \
     CardsDistributionRangeExceeded
+from .pagination import CardListPagination
 from .permissions import UserPermission
 from .serializers import (CardForEditingSerializer, CardReviewDataSerializer,
                           CardUserNoReviewDataSerializer, CategorySerializer,
                           CrammedCardReviewDataSerializer, AllCardsSerializer)
 from cards.utils.exceptions import ReviewBeforeDue
+from .utils.async_views import AsyncAPIViewMixin, aget_object_or_404
+from .utils.custom_search_filters import CardSearchFilter
 from .utils.helpers import extract_grade, no_review_data_response
 
 
 class ListAPIAbstractView(ListAPIView):
-    query_ordering = None
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._user_categories = []
+    # the last field should be unique, so the ordering can be used
+    # for the keyset pagination
+    query_ordering = ()
+    pagination_class = CardListPagination
+    filter_backends = [CardSearchFilter]
 
     def query_set_filter(self, user_query_set):
         pass
@@ -36,16 +39,15 @@ class ListAPIAbstractView(ListAPIView):
         pass
 
     def get_queryset(self):
-        user = self.request.user
-        self._user_categories = user.get_user_categories_trees()
         query_set = self.get_base_queryset()
         user_query_set = self.query_set_filter(query_set)
-        return user_query_set.order_by(self.query_ordering)
+        return user_query_set.order_by(*self.query_ordering)
 
 
 class ListCardsForBackendView(ListAPIView):
     queryset = Card.objects.all().order_by("created_on")
     serializer_class = CardForEditingSerializer
+    filter_backends = [CardSearchFilter]
 
 
 class SingleCardForBackendView(RetrieveAPIView):
@@ -57,35 +59,30 @@ class AllCards(ListAPIView):
     """Returns a single, ordered list of both types of cards:
     memorized and pending.
     """
-    filter_backends = [filters.SearchFilter]
-    search_fields = ["front", "back", "template__body"]
+    filter_backends = [CardSearchFilter]
     permission_classes = [IsAuthenticated, UserPermission]
     serializer_class = AllCardsSerializer
+    pagination_class = CardListPagination
 
     def get_queryset(self):
-        user_categories = self.request.user.get_user_categories_trees()
         return Card.objects.filter(
-            Q(categories__in=user_categories) |
-            Q(categories__isnull=True)
-        ).distinct().order_by("created_on")
+            VisibleCard.is_visible(self.request.user)
+        ).order_by("created_on", "id")
 
 
 class QueuedCards(ListAPIAbstractView):
     """list cards that are not yet memorized by a given user.
     """
-    filter_backends = [filters.SearchFilter]
-    search_fields = ["front", "back", "template__body"]
     serializer_class = CardUserNoReviewDataSerializer
     permission_classes = [IsAuthenticated, UserPermission]
-    query_ordering = "created_on"
+    query_ordering = ("created_on", "id",)
 
     def get_base_queryset(self):
-        return Card.objects.exclude(reviewing_users=self.request.user)
+        return Card.get_queued_cards(self.request.user)
 
     def query_set_filter(self, user_query_set):
         return user_query_set.filter(
-            Q(categories__in=self._user_categories) |
-            Q(categories__isnull=True)).distinct()
+            VisibleCard.is_visible(self.request.user))
 
 
 class QueuedCard(RetrieveUpdateAPIView):
@@ -93,7 +90,7 @@ class QueuedCard(RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated, UserPermission]
 
     def get_queryset(self):
-        return Card.objects.exclude(reviewing_users=self.request.user) \
+        return Card.get_queued_cards(self.request.user) \
             .filter(id=self.kwargs["pk"])
 
     def patch(self, request, **kwargs):
@@ -125,30 +122,27 @@ class QueuedCard(RetrieveUpdateAPIView):
 
 class MemorizedCards(ListAPIAbstractView):
     serializer_class = CardReviewDataSerializer
-    filter_backends = [filters.SearchFilter]
-    search_fields = ["card__front", "card__back", "card__template__body"]
-    query_ordering = "introduced_on"
+    query_ordering = ("introduced_on", "id",)
     permission_classes = [IsAuthenticated, UserPermission]
 
     def query_set_filter(self, user_query_set):
         return user_query_set.filter(
-            Q(card__categories__in=self._user_categories) |
-            Q(card__categories__isnull=True)).distinct()
+            VisibleCard.is_visible(self.request.user, "card"))
 
     def get_base_queryset(self):
         return CardUserData.objects.all().filter(user=self.request.user)
 
 
-class MemorizedCard(RetrieveUpdateAPIView):
+class MemorizedCard(AsyncAPIViewMixin, RetrieveUpdateAPIView):
     serializer_class = CardReviewDataSerializer
     permission_classes = [IsAuthenticated, UserPermission]
 
-    def get(self, request, **kwargs):
-        card = get_object_or_404(Card, id=kwargs["pk"])
-        card_user_data = get_object_or_404(CardUserData,
-                                           user=self.request.user,
-                                           card=card)
-        data = self.serializer_class(card_user_data).data
+    async def get(self, request, **kwargs):
+        card_user_data = await aget_object_or_404(
+            CardUserData.objects.select_related("card"),
+            user=self.request.user, card_id=kwargs["pk"])
+        data = await sync_to_async(
+            lambda: self.serializer_class(card_user_data).data)()
         return Response(data)
 
     def delete(self, request, **kwargs):
@@ -183,10 +177,17 @@ class MemorizedCard(RetrieveUpdateAPIView):
         return response
 
 
-class OutstandingCards(ListAPIAbstractView):
+class OutstandingCards(AsyncAPIViewMixin, ListAPIAbstractView):
     serializer_class = CardReviewDataSerializer
     permission_classes = [IsAuthenticated, UserPermission]
-    query_ordering = "introduced_on"
+    query_ordering = ("introduced_on", "id",)
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await sync_to_async(self.paginate_queryset)(queryset)
+        data = await sync_to_async(
+            lambda: self.get_serializer(page, many=True).data)()
+        return self.get_paginated_response(data)
 
     def get_base_queryset(self):
         return CardUserData.objects.filter(
@@ -196,13 +197,13 @@ class OutstandingCards(ListAPIAbstractView):
 
     def query_set_filter(self, user_query_set):
         return user_query_set.filter(
-            Q(card__categories__in=self._user_categories) |
-            Q(card__categories__isnull=True)).distinct()
+            VisibleCard.is_visible(self.request.user, "card"))
 
 
 class CramQueue(ListAPIView):
     serializer_class = CrammedCardReviewDataSerializer
     permission_classes = [IsAuthenticated, UserPermission]
+    filter_backends = [CardSearchFilter]
 
     def get_queryset(self):
         user = self.request.user
@@ -223,7 +224,7 @@ class CramQueue(ListAPIView):
             response = Response(serialized_data)
             response["Location"] = reverse(
                 "cram_single_card",
-                kwargs={"card_pk": card_review_data.question.id,
+                kwargs={"card_pk": card_review_data.card.id,
                         "user_id": card_review_data.user.id})
         return response
 
@@ -385,8 +386,8 @@ class GeneralStatistics(APIView):
             furthest_scheduled_card_data = None
         else:
             furthest_scheduled_card_data = {
-                "card_id": furthest_scheduled_card.question.id,
-                "card_title": str(furthest_scheduled_card.question),
+                "card_id": furthest_scheduled_card.card.id,
+                "card_title": str(furthest_scheduled_card.card),
                 "review_date": furthest_scheduled_card.review_date
             }
         return furthest_scheduled_card_data
@@ -6,3 +6,5 @@ class CardsConfig(AppConfig):
     name = 'cards'
     default_encoding = 'utf-8'
     max_comment_len = 500
+    # text search configuration for the cards' search vectors
+    search_config = 'english'
@@ -0,0 +1,66 @@
+from statistics import median, quantiles
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+from cards.models import Card
+from wsra.postgresql.base import connection_stats
+
+
+class Command(BaseCommand):
+    help = ("Compares database connection management modes by simulating "
+            "requests (with request_started/request_finished signals, "
+            "which close connections according to CONN_MAX_AGE), each "
+            "running a small query.")
+
+    # name: (CONN_MAX_AGE, CONN_HEALTH_CHECKS)
+    modes = {
+        "new-connection": (0, False),
+        "persistent": (60, False),
+        "persistent-health-checks": (60, True),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500,
+                            help="number of simulated requests per mode")
+        parser.add_argument("--modes", nargs="+", choices=self.modes,
+                            default=list(self.modes))
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        saved_settings = {key: settings_dict[key] for key in
+                          ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS")}
+        try:
+            for mode in options["modes"]:
+                (settings_dict["CONN_MAX_AGE"],
+                 settings_dict["CONN_HEALTH_CHECKS"]) = self.modes[mode]
+                self.stdout.write(self.run_mode(mode, options["requests"]))
+        finally:
+            connection.close()
+            settings_dict.update(saved_settings)
+
+    @staticmethod
+    def simulate_request():
+        request_started.send(sender=Command)
+        try:
+            Card.objects.order_by("created_on", "id").first()
+        finally:
+            request_finished.send(sender=Command)
+
+    def run_mode(self, mode, number_of_requests) -> str:
+        connection.close()
+        connection_stats.reset()
+        timings = []
+        for _ in range(number_of_requests):
+            start = perf_counter()
+            self.simulate_request()
+            timings.append((perf_counter() - start) * 1000)
+        p95 = quantiles(timings, n=20)[-1] if len(timings) > 1 \
+            else timings[0]
+        stats = connection_stats.as_dict()
+        return (f"{mode:>25}: p50 {median(timings):7.2f} ms, "
+                f"p95 {p95:7.2f} ms, connections {stats['count']:>5} "
+                f"(mean setup {stats['mean_ms']:.2f} ms, "
+                f"total {stats['total_ms']:.0f} ms)")
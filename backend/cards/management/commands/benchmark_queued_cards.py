@@ -0,0 +1,99 @@
+from statistics import median
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from cards.models import Card, CardUserData
+
+
+class Command(BaseCommand):
+    help = ("Times the queued cards query for growing numbers of cards "
+            "memorized by a single user. Benchmark data is created inside "
+            "a transaction which is rolled back afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+",
+                            default=[1000, 10000, 100000, 1000000],
+                            help="numbers of memorized cards to measure")
+        parser.add_argument("--queued", type=int, default=1000,
+                            help="number of cards which are not memorized")
+        parser.add_argument("--repeat", type=int, default=5,
+                            help="number of timed runs for each size")
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument("--count", action="store_true",
+                            help="also time counting all queued cards "
+                                 "(which has to visit every card)")
+        parser.add_argument("--legacy", action="store_true",
+                            help="time the former exclude() (NOT IN) query "
+                                 "for comparison")
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        with transaction.atomic():
+            user = get_user_model().objects.create(
+                username="queued-cards-benchmark-user")
+            self.make_cards(0, options["queued"])
+            number_of_memorized = 0
+
+            for size in sorted(options["sizes"]):
+                self.memorize_cards(user, start=number_of_memorized,
+                                    stop=size,
+                                    offset=options["queued"])
+                number_of_memorized = size
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+                output = f"{size:>9} memorized:"
+                queries = [("page", self.queued_cards_page)]
+                if options["count"]:
+                    queries.append(("count", self.queued_cards_count))
+                if options["legacy"]:
+                    queries.append(("legacy page",
+                                    self.legacy_queued_cards_page))
+                for label, query_fn in queries:
+                    timing = self.time_query(
+                        lambda: query_fn(user, options["page_size"]),
+                        options["repeat"])
+                    output += f" {label} {timing:8.2f} ms"
+                self.stdout.write(output)
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def time_query(query_fn, repeat) -> float:
+        """Returns median of query times (in milliseconds).
+        """
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            query_fn()
+            timings.append((perf_counter() - start) * 1000)
+        return median(timings)
+
+    @staticmethod
+    def queued_cards_page(user, page_size):
+        return list(Card.get_queued_cards(user)
+                    .order_by("created_on", "id")[:page_size])
+
+    @staticmethod
+    def queued_cards_count(user, page_size):
+        return Card.get_queued_cards(user).count()
+
+    @staticmethod
+    def legacy_queued_cards_page(user, page_size):
+        return list(Card.objects.exclude(reviewing_users=user)
+                    .order_by("created_on", "id")[:page_size])
+
+    def make_cards(self, start, stop) -> list[Card]:
+        cards = [Card(front=f"benchmark card {number}",
+                      back=f"benchmark card {number} back")
+                 for number in range(start, stop)]
+        return Card.objects.bulk_create(cards, batch_size=self.batch_size)
+
+    def memorize_cards(self, user, start, stop, offset):
+        for batch_start in range(start, stop, self.batch_size):
+            batch_stop = min(batch_start + self.batch_size, stop)
+            cards = self.make_cards(offset + batch_start, offset + batch_stop)
+            CardUserData.objects.bulk_create(
+                [CardUserData(card=card, user=user) for card in cards])
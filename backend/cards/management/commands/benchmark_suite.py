@@ -0,0 +1,78 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.utils.benchmarks import Dataset, compare_results, run_suite
+
+
+class Command(BaseCommand):
+    help = ("Times every API endpoint (changes are rolled back), SM2, "
+            "schedule_date_for_review and the FullRecall importer on "
+            "a seeded dataset, reporting numbers of queries and p50/p95 "
+            "times. Benchmark data is created inside a transaction which "
+            "is rolled back afterwards (so queries which would run "
+            "concurrently, run one after another).")
+
+    def add_arguments(self, parser):
+        dataset = Dataset()
+        parser.add_argument("--users", type=int, default=dataset.users)
+        parser.add_argument("--cards", type=int, default=dataset.cards)
+        parser.add_argument("--categories", type=int,
+                            default=dataset.categories)
+        parser.add_argument("--memorized", type=float,
+                            default=dataset.memorized,
+                            help="fraction of cards memorized by each user")
+        parser.add_argument("--outstanding", type=float,
+                            default=dataset.outstanding,
+                            help="fraction of memorized cards which are "
+                                 "due for review")
+        parser.add_argument("--crammed", type=float,
+                            default=dataset.crammed,
+                            help="fraction of memorized cards which are "
+                                 "crammed")
+        parser.add_argument("--seed", type=int, default=dataset.seed)
+        parser.add_argument("--repeat", type=int, default=20,
+                            help="number of timed runs of each benchmark")
+        parser.add_argument("--only", nargs="+", metavar="NAME",
+                            help="run benchmarks with names containing "
+                                 "one of the NAMEs")
+        parser.add_argument("--output", help="write results to JSON file")
+        parser.add_argument("--baseline",
+                            help="JSON file with results to compare with")
+        parser.add_argument("--threshold", type=float, default=0.2,
+                            help="relative p50 increase reported as "
+                                 "a regression")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **options):
+        dataset = Dataset(**{key: options[key] for key in (
+            "users", "cards", "categories", "memorized", "outstanding",
+            "crammed", "seed")})
+        with transaction.atomic():
+            results = run_suite(dataset, repeat=options["repeat"],
+                                names=options["only"])
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'benchmark':<36}{'status':>7}{'queries':>8}"
+                          f"{'p50 ms':>10}{'p95 ms':>10}")
+        for name, result in results["results"].items():
+            self.stdout.write(
+                f"{name:<36}{result.get('status', ''):>7}"
+                f"{result['queries']:>8}{result['p50_ms']:>10.2f}"
+                f"{result['p95_ms']:>10.2f}")
+
+        if options["output"]:
+            with open(options["output"], "w") as output_file:
+                json.dump(results, output_file, indent=2)
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = compare_results(results, baseline,
+                                          options["threshold"])
+            for regression in regressions:
+                self.stdout.write(self.style.WARNING(regression))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS("No regressions."))
+            elif options["fail_on_regression"]:
+                raise CommandError(f"{len(regressions)} regressions.")
@@ -0,0 +1,76 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from cards.models import Image, Sound
+from cards.utils.helpers import hash_file_sha256
+from cards.utils.storage import is_content_addressed
+
+
+class Command(BaseCommand):
+    help = ("Moves media files of images and sounds to names made of their "
+            "contents hash (see ContentAddressedStorage), so that rows "
+            "with identical files share a single one, and deletes "
+            "the former files.")
+
+    # models and their file fields
+    file_fields = ((Image, "image"), (Sound, "sound_file"))
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="only report files which would be moved")
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        dry_run = options["dry_run"]
+        for model, field_name in self.file_fields:
+            storage = model._meta.get_field(field_name).storage
+            former_names = self.move_files(model, field_name, dry_run)
+            name = model._meta.verbose_name_plural
+            if dry_run:
+                self.stdout.write(f"{name}: {len(former_names)} files "
+                                  "would be moved")
+                continue
+            referenced = set(model.objects.values_list(field_name,
+                                                       flat=True))
+            deleted, freed_bytes = 0, 0
+            for former_name in former_names - referenced:
+                freed_bytes += storage.size(former_name)
+                storage.delete(former_name)
+                deleted += 1
+            self.stdout.write(
+                f"{name}: {len(former_names)} files moved, {deleted} "
+                f"former files deleted ({freed_bytes / 2 ** 20:.1f} MiB)")
+        self.stdout.write(f"Done in {perf_counter() - start:.2f} s")
+
+    def move_files(self, model, field_name, dry_run) -> set[str]:
+        """Points rows at content-addressed copies of their files
+        and returns the former names.
+        """
+        former_names = set()
+        for row in model.objects.iterator():
+            field_file = getattr(row, field_name)
+            name = field_file.name
+            if not name or is_content_addressed(name):
+                continue
+            storage = field_file.storage
+            if not storage.exists(name):
+                self.stderr.write(f"Missing file: {name}")
+                continue
+            with field_file.open("rb"):
+                content_name = storage.get_content_name(
+                    name, hash_file_sha256(field_file))
+            former_names.add(name)
+            if dry_run:
+                continue
+            if not storage.exists(content_name):
+                with storage.open(name) as file:
+                    content_name = storage.save(content_name, file)
+            changes = {field_name: content_name}
+            if model is Image and row.derivatives \
+                    and row.derivatives[0]["name"] == name:
+                # derivatives of the same contents remain valid
+                row.derivatives[0]["name"] = content_name
+                changes["derivatives"] = row.derivatives
+            model.objects.filter(pk=row.pk).update(**changes)
+        return former_names
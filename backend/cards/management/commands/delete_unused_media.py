@@ -1,56 +1,168 @@
+import hashlib
 import os
-from django.core.management.base import BaseCommand
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from time import perf_counter, time
+
 from django.apps import apps
-from django.db.models import Q
 from django.conf import settings
-from django.db.models import FileField
+from django.core.management.base import BaseCommand
+from django.db.models import FileField, Q
+from cards.models import Image
 
-# reused from:
+# originally based on:
 # https://www.algotech.solutions/blog/python/deleting-unused-django-media-files/
 
 
+def path_key(relative_path) -> bytes:
+    """Compact (8 bytes) key of the file path. A collision could only
+    keep an unused file.
+    """
+    return hashlib.blake2b(relative_path.encode(), digest_size=8).digest()
+
+
+def scan_directory(path):
+    """Returns files (DirEntry) and subdirectories (paths) of
+    the directory.
+    """
+    files, directories = [], []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                files.append(entry)
+    return files, directories
+
+
 class Command(BaseCommand):
-    help = "This command deletes all media files from the MEDIA_ROOT directory"
-    "which are no longer referenced by any of the models from installed_apps"
+    help = ("Deletes media files from the MEDIA_ROOT directory which are no "
+            "longer referenced by any of the models from installed apps.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="only list files which would be deleted")
+        parser.add_argument("--older-than", type=float, default=0,
+                            metavar="DAYS",
+                            help="delete only files modified more than DAYS "
+                                 "ago (e.g. not to delete files of objects "
+                                 "being saved)")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="number of files deleted between progress "
+                                 "reports")
+        parser.add_argument("--chunk-size", type=int, default=2000,
+                            help="number of database rows fetched at once")
+        parser.add_argument("--workers", type=int, default=8,
+                            help="number of threads scanning directories")
+
     def handle(self, *args, **options):
-        all_models = apps.get_models()
-        physical_files = set()
-        db_files = set()
-        # Get all files from the database
-        for model in all_models:
+        self.dry_run = options["dry_run"]
+        self.verbosity = options["verbosity"]
+        start = perf_counter()
+        referenced = self.get_referenced_files(options["chunk_size"])
+        self.stdout.write(f"{len(referenced)} files referenced in the "
+                          f"database ({perf_counter() - start:.2f} s)")
+
+        media_root = settings.MEDIA_ROOT
+        if not os.path.isdir(media_root):
+            return
+        modified_before = time() - options["older_than"] * 24 * 60 * 60
+        self.scanned = self.deleted = self.deleted_bytes = 0
+        self.emptied_directories = set()
+        batch = []
+        for entry in self.scan_media_root(media_root, options["workers"]):
+            self.scanned += 1
+            relative_path = os.path.relpath(entry.path, media_root)
+            if path_key(relative_path) in referenced:
+                continue
+            if options["older_than"] \
+                    and entry.stat().st_mtime >= modified_before:
+                continue
+            batch.append(entry)
+            if len(batch) >= options["batch_size"]:
+                self.delete_batch(batch, media_root, start)
+                batch = []
+        self.delete_batch(batch, media_root, start)
+        if not self.dry_run:
+            self.delete_empty_directories(media_root)
+
+        self.stdout.write(
+            f"{self.deleted} of {self.scanned} files "
+            + ("would be deleted" if self.dry_run else "deleted")
+            + f" ({self.deleted_bytes / 2 ** 20:.1f} MiB) in "
+              f"{perf_counter() - start:.2f} s")
+
+    @staticmethod
+    def get_referenced_files(chunk_size) -> set[bytes]:
+        referenced = set()
+        for model in apps.get_models():
             file_fields = []
             filters = Q()
-            for f_ in model._meta.fields:
-                if isinstance(f_, FileField):
-                    file_fields.append(f_.name)
-                    is_null = {'{}__isnull'.format(f_.name): True}
-                    is_empty = {'{}__exact'.format(f_.name): ''}
-                    filters &= Q(**is_null) | Q(**is_empty)
-            # only retrieve the models which have non-empty,
-            # non-null file fields
+            for field in model._meta.fields:
+                if isinstance(field, FileField):
+                    file_fields.append(field.name)
+                    filters &= Q(**{f"{field.name}__isnull": True}) \
+                        | Q(**{f"{field.name}__exact": ""})
+            # only the rows with non-empty, non-null file fields
             if file_fields:
-                files = model.objects.exclude(filters).values_list(
-                    *file_fields, flat=True).distinct()
-                db_files.update(files)
-        # Get all files from the MEDIA_ROOT, recursively
-        media_root = getattr(settings, 'MEDIA_ROOT', None)
-        if media_root is not None:
-            for relative_root, dirs, files in os.walk(media_root):
-                for file_ in files:
-                    # Compute the relative file path to the media directory,
-                    # so it can be compared to the values from the db
-                    relative_file = os.path.join(os.path.relpath(
-                        relative_root, media_root), file_)
-                    physical_files.add(relative_file)
-        # Compute the difference and delete those files
-        deletables = physical_files - db_files
-        if deletables:
-            for file_ in deletables:
-                os.remove(os.path.join(media_root, file_))
-            # Bottom-up - delete all empty folders
-            for relative_root, dirs, files in os.walk(
-                    media_root, topdown=False):
-                for dir_ in dirs:
-                    if not os.listdir(os.path.join(relative_root, dir_)):
-                        os.rmdir(os.path.join(relative_root, dir_))
+                for names in model.objects.exclude(filters).values_list(
+                        *file_fields).iterator(chunk_size=chunk_size):
+                    referenced.update(path_key(os.path.normpath(name))
+                                      for name in names if name)
+        # resized variants of images
+        for derivatives in Image.objects.values_list(
+                "derivatives", flat=True).iterator(chunk_size=chunk_size):
+            referenced.update(path_key(os.path.normpath(derivative["name"]))
+                              for derivative in derivatives)
+        return referenced
+
+    @staticmethod
+    def scan_media_root(media_root, workers):
+        """Yields files (DirEntry) under media_root, scanning directories
+        in a thread pool (listing directories on network volumes mostly
+        waits for I/O).
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(scan_directory, media_root)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, directories = future.result()
+                    pending.update(executor.submit(scan_directory, path)
+                                   for path in directories)
+                    yield from files
+
+    def delete_batch(self, batch, media_root, start):
+        for entry in batch:
+            try:
+                size = entry.stat().st_size
+                if not self.dry_run:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self.deleted += 1
+            self.deleted_bytes += size
+            self.emptied_directories.add(os.path.dirname(entry.path))
+            if self.dry_run or self.verbosity > 1:
+                self.stdout.write(os.path.relpath(entry.path, media_root))
+        if batch:
+            self.stdout.write(
+                f"{self.deleted} files "
+                + ("to delete" if self.dry_run else "deleted")
+                + f", {self.scanned} scanned "
+                  f"({perf_counter() - start:.2f} s)")
 
+    def delete_empty_directories(self, media_root):
+        """Deletes directories left empty by deleting files (and their
+        empty parents).
+        """
+        media_root = os.path.normpath(media_root)
+        for directory in sorted(self.emptied_directories, key=len,
+                                reverse=True):
+            while directory != media_root \
+                    and directory.startswith(media_root):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    # not empty (or already deleted)
+                    break
+                directory = os.path.dirname(directory)
@@ -0,0 +1,43 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from cards.models import Image
+from cards.utils.image_derivatives import generate_image_derivatives
+
+
+def generate_in_thread(image_pk):
+    try:
+        generate_image_derivatives(image_pk)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = ("Generates resized variants (see IMAGE_DERIVATIVE_WIDTHS "
+            "in settings) of images which have none or outdated ones - e.g. "
+            "images uploaded before derivatives were introduced.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                            help="number of images processed in parallel")
+        parser.add_argument("--all", action="store_true",
+                            help="regenerate derivatives of all images "
+                                 "(e.g. after changing the widths)")
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        images = Image.objects.only("id", "image", "derivatives")
+        image_pks = [image.pk for image in images.iterator()
+                     if options["all"] or image.derivatives_outdated]
+        # Pillow releases the GIL while resizing and encoding images
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            for number, _ in enumerate(
+                    executor.map(generate_in_thread, image_pks), 1):
+                if number % 100 == 0:
+                    self.stdout.write(f"{number}/{len(image_pks)} images")
+        self.stdout.write(f"Derivatives of {len(image_pks)} images "
+                          f"generated in {perf_counter() - start:.2f} s")
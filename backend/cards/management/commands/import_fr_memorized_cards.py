@@ -1,7 +1,28 @@
-from django.core.management.base import BaseCommand
+import os
+from time import perf_counter
+from xml.etree import ElementTree as ET
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from cards.management.fr_importer.modules.card_writer import CardWriter
+from cards.management.fr_importer.modules.checkpoint import Checkpoint
+from cards.management.fr_importer.modules.elements_reader import \
+    ElementsReader
+from cards.management.fr_importer.modules.item_formatter import \
+    ItemFormatter
+from cards.management.fr_importer.modules.media_importer import \
+    MediaImporter
+from cards.models import Category
 
 
 class Command(BaseCommand):
+    help = ("Imports cards (and the user's review data of memorized cards) "
+            "from the FullRecall elements.xml file. The file is read "
+            "incrementally, so it is never loaded as a whole. Progress is "
+            "saved after each batch of cards, so an interrupted import can "
+            "be resumed.")
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.file = None
@@ -16,12 +37,160 @@ class Command(BaseCommand):
         if not self.file:
             return f"the {file_name} file was not found"
 
+        self.verbosity = kwargs.get("verbosity", 1)
+        dry_run = kwargs.get("dry_run", False)
+        checkpoint = Checkpoint(
+            kwargs.get("checkpoint") or f"{file_name}.checkpoint", file_name)
+        progress = self.get_progress(checkpoint, kwargs.get("resume", False))
+        start = perf_counter()
+        # items of the file read (formatted or skipped) - including ones
+        # read before the import was resumed
+        self.items_read = progress.get("items_read", 0)
+        self.skipped = 0 if dry_run else progress.get("skipped", 0)
+        user = self.get_user(kwargs.get("user"))
+        media = None if dry_run or kwargs.get("no_media") else MediaImporter(
+            kwargs.get("media_dir") or os.path.dirname(
+                os.path.abspath(file_name)),
+            workers=kwargs.get("media_workers") or 4)
+        writer = None if dry_run else CardWriter(
+            user=user,
+            category=self.get_category(kwargs.get("category")),
+            batch_size=kwargs.get("batch_size") or 1000,
+            report=self.stdout.write if self.verbosity > 0 else None,
+            on_flush=lambda card_writer: checkpoint.save(
+                items_read=self.items_read, skipped=self.skipped,
+                **card_writer.counters),
+            counters=progress,
+            media=media)
+        formatter = ItemFormatter(workers=kwargs.get("workers", 0),
+                                  chunk_size=kwargs.get("chunk_size") or 200)
+        formatted = 0
+        write_time = 0.0
+        try:
+            for card_data, error in formatter.format(
+                    ElementsReader(self.file, skip=self.items_read)):
+                self.items_read += 1
+                if card_data is None:
+                    self.skipped += 1
+                    if self.verbosity > 1:
+                        self.stderr.write(f"skipped item: {error}")
+                    continue
+                formatted += 1
+                if writer is not None:
+                    write_start = perf_counter()
+                    writer.add(card_data)
+                    write_time += perf_counter() - write_start
+            if writer is not None:
+                write_start = perf_counter()
+                writer.flush()
+                write_time += perf_counter() - write_start
+        except ET.ParseError as error:
+            raise CommandError(f"{file_name}: {error}")
+        finally:
+            self.file.close()
+            if media is not None:
+                media.close()
+
+        elapsed = perf_counter() - start
+        timings = {"reading": formatter.timings["read"],
+                   "formatting": formatter.timings["format"]}
+        if writer is None:
+            self.stdout.write(
+                f"{formatted} cards formatted ({self.skipped} skipped) in "
+                f"{elapsed:.2f} s ({formatted / elapsed:.0f} items/s) - "
+                f"dry run, nothing written")
+        else:
+            # the import is complete
+            checkpoint.remove()
+            timings["writing"] = write_time
+            self.stdout.write(
+                f"{writer.items} cards imported ({writer.cards_created} new, "
+                f"{writer.memorized} memorized, {self.skipped} skipped) in "
+                f"{elapsed:.2f} s ({formatted / elapsed:.0f} items/s)")
+        if media is not None and media.files_stored + media.files_present \
+                + media.files_missing:
+            self.stdout.write(
+                f"{media.files_stored} media files stored "
+                f"({media.files_present} already present, "
+                f"{media.files_missing} missing)")
+        if writer is None or self.verbosity > 1:
+            self.stdout.write(", ".join(
+                f"{stage}: {seconds:.2f} s"
+                for stage, seconds in timings.items()))
+
+    def get_progress(self, checkpoint, resume) -> dict:
+        if not resume:
+            return {}
+        progress = checkpoint.load()
+        if progress is None:
+            self.stdout.write(f"no checkpoint of the file found in "
+                              f"{checkpoint.path} - importing from "
+                              f"the start")
+            return {}
+        self.stdout.write(f"resuming the import after "
+                          f"{progress['items_read']} items")
+        return progress
+
     def open_input_file(self, path):
         try:
-            self.file = open(path)
+            self.file = open(path, "rb")
         except FileNotFoundError:
             pass
 
+    @staticmethod
+    def get_user(username):
+        if username is None:
+            return None
+        try:
+            return get_user_model().objects.get(username=username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"the user {username} does not exist")
+
+    @staticmethod
+    def get_category(name):
+        if name is None:
+            return None
+        category = Category.objects.filter(name=name,
+                                           parent__isnull=True).first()
+        return category or Category.objects.create(name=name)
+
     def add_arguments(self, parser):
         parser.add_argument("--inputfile", type=str,
-                            help="path to an input file")
\ No newline at end of file
+                            help="path to an input file")
+        parser.add_argument("--user", type=str,
+                            help="username of the user memorizing imported "
+                                 "cards (without it only cards are "
+                                 "imported)")
+        parser.add_argument("--category", type=str,
+                            help="name of the (top-level) category of "
+                                 "imported cards - created if it doesn't "
+                                 "exist")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="number of cards written to the database "
+                                 "in a single transaction")
+        parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                            help="maximum number of processes formatting "
+                                 "cards - one per chunk of items at most "
+                                 "(0 - format in the main process)")
+        parser.add_argument("--chunk-size", type=int, default=200,
+                            help="number of items sent to a worker process "
+                                 "at once")
+        parser.add_argument("--media-dir", type=str,
+                            help="directory which paths of media files "
+                                 "are relative to (default: the input "
+                                 "file's directory)")
+        parser.add_argument("--media-workers", type=int, default=4,
+                            help="number of threads copying media files")
+        parser.add_argument("--no-media", action="store_true",
+                            help="don't import media files")
+        parser.add_argument("--resume", action="store_true",
+                            help="skip items imported before the import "
+                                 "was interrupted (as saved in "
+                                 "the checkpoint)")
+        parser.add_argument("--checkpoint", type=str,
+                            help="path to the checkpoint file (default: "
+                                 "the input file's path with "
+                                 "the .checkpoint suffix)")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="read and format items without writing "
+                                 "anything, reporting times of the stages")
@@ -0,0 +1,17 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from cards.models import VisibleCard
+
+
+class Command(BaseCommand):
+    help = ("Rebuilds cards visible to users from their selected "
+            "categories - e.g. after cards or categories were created "
+            "with bulk operations (which send no signals).")
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        VisibleCard.rebuild_all()
+        self.stdout.write(f"{VisibleCard.objects.count()} visible cards "
+                          f"rebuilt in {perf_counter() - start:.2f} s")
@@ -1,4 +1,5 @@
 import re
+from functools import cached_property
 
 from cards.management.fr_importer.modules.card_side import CardSide
 
@@ -13,8 +14,11 @@ class Answer(CardSide):
 
     @property
     def phonetics_key(self) -> str | None:
-        matched_line = self._match_phonetics_line(1)
-        return matched_line["remaining_text"]
+        return self._phonetics_line["remaining_text"]
+
+    @cached_property
+    def _phonetics_line(self) -> dict:
+        return self._match_phonetics_line(1)
 
     def _match_phonetics_line(self, line_index) -> dict:
         single_word = "^[^\s.]{2,30}$"
@@ -41,8 +45,7 @@ class Answer(CardSide):
     def phonetics_spelling(self) -> str | None:
         phonetics_in_answer_line = None
         output_phonetics = None
-        phonetics_in_phonetics_line = \
-            self._match_phonetics_line(1)["phonetics"]
+        phonetics_in_phonetics_line = self._phonetics_line["phonetics"]
 
         if not phonetics_in_phonetics_line:
             phonetics_in_answer_line = self._get_phonetics_from_answer_line()
@@ -2,14 +2,18 @@
 Classes representing an 'Item's Side' (question and answer). Contains abstract
 class with methods/fields common for both question and answer as well
 as method/field signatures implemented in concrete classes.
+
+Contents of a side never change, so they are cleaned (and split into lines)
+once - on first use - and fields derived from them are cached.
 """
 
 import os
+from functools import cached_property
 from xml.etree import ElementTree as ET
 import re
 
-from bs4 import BeautifulSoup
-
+from cards.management.fr_importer.modules.tag_stripper import \
+    strip_tags_except
 from cards.utils.helpers import compose
 
 
@@ -27,14 +31,21 @@ class CardSide:
 
     @staticmethod
     def _strip_tags_except_specific(text: str) -> str:
-        # from: https://stackoverflow.com/questions/56001921/
-        # removing-tags-from-html-except-specific-ones-but-keep-their-contents
-        # original author: glhr
-        soup = BeautifulSoup(text, "html.parser")
-        for e in soup.find_all():
-            if e.name not in ["strike", "i"]:
-                e.unwrap()
-        return str(soup)
+        return strip_tags_except(text, kept_tags=("strike", "i"))
+
+    @cached_property
+    def _tags_contents(self) -> dict[str, str | None]:
+        """
+        Contents of tags embedded in the side (the first of each kind),
+        read in a single parse.
+        """
+        if "<" not in self._original_side_contents:
+            return {}
+        tags_contents = {}
+        for element in ET.fromstring(
+                f"<root>{self._original_side_contents}</root>"):
+            tags_contents.setdefault(element.tag, element.text)
+        return tags_contents
 
     def _get_tag_contents(self, tag) -> str | None:
         """
@@ -42,13 +53,14 @@ class CardSide:
         contains only relative paths to media files) - without expanding it
         into an absolute path.
         """
-        tag_contents = ET.fromstring(
-            f"<root>{self._original_side_contents}</root>").find(tag)
-        if tag_contents is not None:
-            return tag_contents.text
+        return self._tags_contents.get(tag)
+
+    @cached_property
+    def _lines(self) -> tuple[str, ...]:
+        return tuple(self.side_contents.splitlines())
 
     def _get_examples(self, from_line=1) -> list[str]:
-        return list(filter(None, self.side_contents.splitlines()[from_line:]))
+        return list(filter(None, self._lines[from_line:]))
 
     @staticmethod
     def _get_filename(file_path) -> str | None:
@@ -64,7 +76,7 @@ class CardSide:
         return output[0]
 
     def _get_line(self, index) -> str | None:
-        split_contents = self.side_contents.splitlines()
+        split_contents = self._lines
         try:
             line = split_contents[index]
         except IndexError:
@@ -92,9 +104,13 @@ class CardSide:
         self._strip_tags_except_specific,
         self._strip_media_tags)(original_contents)
 
+    @cached_property
+    def _cleaned_contents(self) -> str:
+        return self._clean_contents(self._original_side_contents)
+
     @property
     def side_contents(self):
-        return self._clean_contents(self._original_side_contents)
+        return self._cleaned_contents
 
     @staticmethod
     def keys():
@@ -102,10 +118,10 @@ class CardSide:
                 "sound_file_path", "sound_file_name"]
 
     def __getitem__(self, key):
-        values = [self.output_text, self.image_file_path,
-                  self.image_file_name, self.sound_file_path,
-                  self.sound_file_name]
-        return dict(zip(self.keys(), values))[key]
+        # keys are names of the fields
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
 
     image_file_path = property(lambda self: self._get_tag_contents("img"))
     sound_file_path = property(lambda self: self._get_tag_contents("snd"))
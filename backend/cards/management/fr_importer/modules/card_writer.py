@@ -0,0 +1,167 @@
+"""
+Batched writing of imported cards to the database.
+"""
+
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.db import transaction
+
+from cards.models import Card, CardUserData, VisibleCard
+
+
+@contextmanager
+def keeping_introduced_on():
+    """
+    Inserts review data with introduced_on dates of the imported items -
+    instead of the current time set by auto_now_add (updating the rows
+    afterwards would write them twice).
+    """
+    field = CardUserData._meta.get_field("introduced_on")
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class CardWriter:
+    """
+    Collects imported cards (dicts of HtmlFormattedCard or
+    HtmlFormattedMemorizedCard) and writes them in batches: each with
+    a few bulk queries in a single transaction.
+
+    Cards already in the database (with the same front and back) are not
+    created again and the user's review data of already memorized cards
+    is kept, so importing a file again does not duplicate anything.
+    """
+
+    counter_names = ("items", "cards_created", "memorized", "batches")
+
+    def __init__(self, user=None, category=None, batch_size=1000,
+                 report=None, on_flush=None, counters=None, media=None):
+        """
+        user - the user memorizing the cards (review data is written only
+        with the user), category - category of imported cards, media -
+        MediaImporter of media files of the cards, report -
+        function called with a progress line after each batch, on_flush -
+        function called (with the writer) after each batch is committed,
+        counters - initial values of counters (of a resumed import).
+        """
+        self.user = user
+        self.category = category
+        self.batch_size = batch_size
+        self.report = report
+        self.on_flush = on_flush
+        self.media = media
+        self.batch = []
+        for name in self.counter_names:
+            setattr(self, name, (counters or {}).get(name, 0))
+        self.start = perf_counter()
+        self.start_items = self.items
+
+    @property
+    def counters(self) -> dict[str, int]:
+        return {name: getattr(self, name) for name in self.counter_names}
+
+    @property
+    def items_per_second(self) -> float:
+        # of items written by this writer
+        elapsed = perf_counter() - self.start
+        return (self.items - self.start_items) / elapsed if elapsed else 0.0
+
+    def add(self, card_data):
+        if self.media is not None:
+            # media files are stored in the background until the batch
+            # is written
+            self.media.add(card_data)
+        self.batch.append(card_data)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        with transaction.atomic():
+            self._write_batch(self.batch)
+        self.items += len(self.batch)
+        self.batches += 1
+        self.batch = []
+        if self.on_flush is not None:
+            self.on_flush(self)
+        if self.report is not None:
+            self.report(
+                f"{self.items} items written ({self.cards_created} new "
+                f"cards, {self.memorized} memorized): "
+                f"{self.items_per_second:.0f} items/s")
+
+    def _write_batch(self, batch):
+        # (front, back): card data - the first one of duplicated cards
+        cards_data = {}
+        for card_data in batch:
+            cards_data.setdefault((card_data["question"]["output_text"],
+                                   card_data["answer"]["output_text"]),
+                                  card_data)
+        card_ids, created_ids = self._write_cards(cards_data)
+        if self.media is not None:
+            self.media.write(cards_data, card_ids, created_ids)
+        if self.category is not None:
+            self._write_categories(card_ids.values(), created_ids)
+        else:
+            VisibleCard.add_new_cards(created_ids)
+        if self.user is not None:
+            self._write_review_data(cards_data, card_ids)
+
+    def _write_cards(self, cards_data) -> tuple[dict, set]:
+        """
+        Returns ids of the cards ({(front, back): id}) and ids of
+        the created ones.
+        """
+        cards = {key: Card(front=key[0], back=key[1])
+                 for key in cards_data}
+        for card in cards.values():
+            # bulk_create() doesn't call save()
+            card.set_search_fields()
+        # conflicting (already existing) cards are skipped
+        Card.objects.bulk_create(cards.values(), ignore_conflicts=True)
+        card_ids = {
+            (front, back): card_id for front, back, card_id
+            in Card.objects.filter(front__in={front for front, _ in cards})
+            .values_list("front", "back", "id")
+            if (front, back) in cards}
+        created_ids = {card.pk for key, card in cards.items()
+                       if card_ids[key] == card.pk}
+        self.cards_created += len(created_ids)
+        return card_ids, created_ids
+
+    def _write_categories(self, card_ids, created_ids):
+        through = Card.categories.through
+        linked_ids = set(through.objects.filter(
+            category=self.category, card_id__in=card_ids)
+            .values_list("card_id", flat=True))
+        new_links = set(card_ids) - linked_ids
+        through.objects.bulk_create(
+            through(card_id=card_id, category_id=self.category.id)
+            for card_id in new_links)
+        VisibleCard.add_new_cards(created_ids, categories=[self.category])
+        # existing cards added to the category (bulk operations send
+        # no signals)
+        VisibleCard.update_cards(new_links - created_ids)
+
+    def _write_review_data(self, cards_data, card_ids):
+        memorized_ids = set(CardUserData.objects.filter(
+            user=self.user, card_id__in=card_ids.values())
+            .values_list("card_id", flat=True))
+        review_data = []
+        for key, card_data in cards_data.items():
+            if "review_details" not in card_data \
+                    or card_ids[key] in memorized_ids:
+                continue
+            fields = {**card_data["review_details"]}
+            # naive datetime in the local time zone
+            fields["introduced_on"] = fields["introduced_on"].astimezone()
+            review_data.append(CardUserData(card_id=card_ids[key],
+                                            user=self.user, **fields))
+        with keeping_introduced_on():
+            CardUserData.objects.bulk_create(review_data)
+        self.memorized += len(review_data)
@@ -0,0 +1,52 @@
+"""
+Checkpoints of imports: progress (number of items of the elements.xml file
+processed and counters) saved after each batch of cards committed to
+the database, so an interrupted import can be resumed.
+"""
+
+import json
+import os
+
+
+class Checkpoint:
+    """
+    Progress of importing the input file, saved (as JSON) in a file.
+    A checkpoint of another input file (or of the file changed since) is
+    not loaded.
+    """
+
+    def __init__(self, path, input_path):
+        self.path = path
+        stat = os.stat(input_path)
+        self.input_file = {"name": os.path.abspath(input_path),
+                           "size": stat.st_size,
+                           "modified": stat.st_mtime}
+
+    def load(self) -> dict | None:
+        """
+        Returns the saved progress: number of items read ("items_read")
+        and counters.
+        """
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                checkpoint = json.load(file)
+        except FileNotFoundError:
+            return None
+        if checkpoint.get("input_file") != self.input_file:
+            return None
+        return checkpoint["progress"]
+
+    def save(self, **progress):
+        # written to a temporary file first - so an interruption doesn't
+        # leave a partially written checkpoint
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump({"input_file": self.input_file, "progress": progress},
+                      file)
+        os.replace(temporary_path, self.path)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
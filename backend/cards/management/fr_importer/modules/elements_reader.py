@@ -0,0 +1,56 @@
+"""
+Streaming reader of the FullRecall elements.xml file.
+"""
+
+from xml.etree import ElementTree as ET
+
+from cards.management.fr_importer.modules.item import Item
+
+
+class ElementsReader:
+    """
+    Iterates over items of the elements.xml file parsed incrementally
+    (with iterparse), so memory use does not depend on the size of
+    the file: each <item> is discarded as soon as it is processed.
+    Items may be nested (in FullRecall's tree of items) - nested items are
+    read before their parent.
+    """
+
+    def __init__(self, file, skip=0):
+        """
+        file - path to, or a file object (opened in binary mode) of
+        the elements.xml file, skip - number of items to skip (e.g. ones
+        imported before the import was interrupted).
+        """
+        self._file = file
+        self.skip = skip
+        # attribute of the <fullrecall ...></fullrecall> tag - set when
+        # the tag is read
+        self.time_of_start = None
+
+    def __iter__(self):
+        # elements which are open at the moment (ancestors of the element
+        # being read)
+        open_elements = []
+        items_read = 0
+        for event, element in ET.iterparse(self._file,
+                                           events=("start", "end")):
+            if event == "start":
+                if element.tag == "fullrecall":
+                    self.time_of_start = int(
+                        element.get("time_of_start", 0))
+                open_elements.append(element)
+                continue
+            open_elements.pop()
+            if element.tag != "item":
+                continue
+            items_read += 1
+            # skipped items are parsed (the file is parsed from the start),
+            # but not read into Items
+            item = Item(element) if items_read > self.skip else None
+            # the parent would keep references to all the items read
+            if open_elements:
+                open_elements[-1].remove(element)
+            element.clear()
+            if item is not None:
+                yield item
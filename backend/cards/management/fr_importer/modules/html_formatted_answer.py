@@ -1,3 +1,5 @@
+from functools import cached_property
+
 from cards.management.fr_importer.modules.card_answer import Answer
 from cards.management.fr_importer.modules.phonetics_converter import \
     PhoneticsConverter
@@ -29,11 +31,14 @@ class HTMLFormattedAnswer(Answer):
 
     @property
     def phonetics_spelling(self) -> str | None:
+        return self._converted_phonetics
+
+    @cached_property
+    def _converted_phonetics(self) -> str | None:
         raw_phonetics = super().phonetics_spelling
         formatted_phonetics = None
         if raw_phonetics is not None:
-            formatted_phonetics = PhoneticsConverter(
-                raw_phonetics).converted_phonetics
+            formatted_phonetics = PhoneticsConverter.convert(raw_phonetics)
         return formatted_phonetics
 
     @property
@@ -23,12 +23,15 @@ class HtmlFormattedCard:
     def answer_output_text(self):
         return self._answer.output_text
 
+    def _get_field(self, key):
+        return {"question": self._question, "answer": self._answer}[key]
+
     def __getitem__(self, key):
-        return dict(zip(self.keys(), self.values()))[key]
+        return dict(self._get_field(key))
 
     @staticmethod
     def keys():
         return ["question", "answer"]
 
     def values(self):
-        return [dict(field) for field in (self._question, self._answer,)]
+        return [self[key] for key in self.keys()]
@@ -1,4 +1,5 @@
 import re
+from functools import cached_property
 
 from cards.management.fr_importer.modules.card_question import Question
 from cards.utils.helpers import compose
@@ -16,9 +17,13 @@ class HTMLFormattedQuestion(Question):
         self._highlight_text_in_brackets
     )(side_contents)
 
+    @cached_property
+    def _formatted_contents(self) -> str:
+        return self.add_formatting(super().side_contents)
+
     @property
     def side_contents(self):
-        return self.add_formatting(super().side_contents)
+        return self._formatted_contents
 
     @property
     def definition(self) -> str:
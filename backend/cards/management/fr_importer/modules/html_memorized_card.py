@@ -15,8 +15,9 @@ class HtmlFormattedMemorizedCard(HtmlFormattedCard):
         keys = HtmlFormattedCard.keys()
         return [*keys, "review_details"]
 
-    def values(self):
-        values = super().values()
-        return [*values, dict(self._review_details)]
+    def _get_field(self, key):
+        if key == "review_details":
+            return self._review_details
+        return super()._get_field(key)
 
 
@@ -1,26 +1,100 @@
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+
 from cards.management.fr_importer.modules.card_answer import Answer
 from cards.management.fr_importer.modules.card_question import Question
+from cards.management.fr_importer.modules.html_formatted_card import \
+    HtmlFormattedCard
+from cards.management.fr_importer.modules.html_memorized_card import \
+    HtmlFormattedMemorizedCard
+
+
+def format_item(item, time_of_start) -> HtmlFormattedCard:
+    """
+    Returns the item (a dict of Item) formatted as a memorized card (if it
+    has review details) or as a pending card.
+    """
+    if "review_details" in item:
+        return HtmlFormattedMemorizedCard(item, time_of_start)
+    return HtmlFormattedCard(item)
 
 
 class Item:
     """
     Processes a single 'Item' (<item></item>) from the elements.xml file.
+    Contents of the item's element are copied, so the element can be
+    cleared (discarded) after the Item is created.
     """
+    # <item>'s attributes with user review-data (see UserReview)
+    review_attributes = ("id", "tmtrpt", "stmtrpt", "livl", "rllivl", "ivl",
+                         "rp", "gr")
+    # key: attribute with its value
+    key_attributes = {"question": "_question_text",
+                      "answer": "_answer_text",
+                      "review_details": "_review_details"}
 
     def __init__(self, item):
-        pass
+        """
+        item - ElementTree's Element of the <item></item> tag.
+        """
+        self._item = item
+        self._question_text = self._extract_question()
+        self._answer_text = self._extract_answer()
+        self._review_details = self._extract_review_details()
+        self._item = None
+
+    @staticmethod
+    def _get_inner_xml(element) -> str:
+        """
+        Returns contents of the element as they are in the elements.xml file
+        (with tags embedded in the text, e.g. <img>, <snd>, <i>, and
+        characters escaped - sides are parsed as XML again).
+        """
+        if element is None:
+            return ""
+        return escape(element.text or "") + "".join(
+            ET.tostring(child, encoding="unicode") for child in element)
 
-    def _extract_question(self):
-        pass
+    def _extract_question(self) -> str:
+        return self._get_inner_xml(self._item.find("q"))
 
-    def _extract_answer(self):
-        pass
+    def _extract_answer(self) -> str:
+        return self._get_inner_xml(self._item.find("a"))
+
+    def _extract_review_details(self) -> dict | None:
+        attributes = self._item.attrib
+        if not all(attribute in attributes
+                   for attribute in self.review_attributes):
+            return None
+        return {attribute: int(attributes[attribute])
+                for attribute in self.review_attributes}
 
     def _get_question(self) -> Question:
-        pass
+        return Question(self._question_text)
 
     def _get_answer(self) -> Answer:
-        pass
+        return Answer(self._answer_text)
 
     question = property(_get_question)
     answer = property(_get_answer)
+    question_text = property(lambda self: self._question_text)
+    answer_text = property(lambda self: self._answer_text)
+    review_details = property(lambda self: self._review_details)
+
+    @property
+    def memorized(self) -> bool:
+        return self._review_details is not None
+
+    def keys(self) -> list[str]:
+        keys = ["question", "answer"]
+        return [*keys, "review_details"] if self.memorized else keys
+
+    def __getitem__(self, key):
+        value = getattr(self, self.key_attributes[key])
+        if value is None:
+            # review details of a pending item
+            raise KeyError(key)
+        return value
+
+    def get_formatted_card(self, time_of_start) -> HtmlFormattedCard:
+        return format_item(dict(self), time_of_start)
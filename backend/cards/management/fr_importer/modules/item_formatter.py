@@ -0,0 +1,116 @@
+"""
+Formatting of items read from the elements.xml file into cards - in
+a pool of processes, as formatting is CPU-bound and independent for each
+item.
+"""
+
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from time import perf_counter
+
+from cards.management.fr_importer.modules.html_formatted_card import \
+    HtmlFormattedCard
+from cards.management.fr_importer.modules.user_review import \
+    convert_reviews
+
+# worker processes are started afresh instead of being forked from
+# the importing process - which has threads (copying media files) running
+# and a database connection open
+mp_context = multiprocessing.get_context("spawn")
+
+
+def format_items(items, time_of_start) -> list[tuple[dict | None, str | None]]:
+    """
+    Returns cards (dicts of HtmlFormattedCard/HtmlFormattedMemorizedCard)
+    of the items (dicts of Item) - or None and the error for items which
+    can't be formatted.
+    """
+    cards = []
+    # memorized cards and review details of their items
+    memorized_cards = []
+    fr_reviews = []
+    for item in items:
+        try:
+            card = dict(HtmlFormattedCard(item))
+        except ValueError as error:
+            # e.g. an item without the question or the answer
+            cards.append((None, str(error)))
+            continue
+        cards.append((card, None))
+        if "review_details" in item:
+            memorized_cards.append(card)
+            fr_reviews.append(item["review_details"])
+    # review details of all the items are converted at once
+    for card, review_details in zip(memorized_cards, convert_reviews(
+            fr_reviews, time_of_start)):
+        card["review_details"] = review_details
+    return cards
+
+
+class ItemFormatter:
+    """
+    Formats items from the ElementsReader in chunks, in worker processes
+    (or in the current process - with no workers). Cards are yielded in
+    the order of items.
+
+    The number of chunks submitted to the pool and not yet consumed is
+    bounded, so reading the file doesn't run ahead of writing cards to
+    the database (and memory use stays flat).
+    """
+
+    def __init__(self, workers=0, chunk_size=200, max_pending_chunks=None):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_pending_chunks = max_pending_chunks or 2 * max(workers, 1)
+        # seconds spent (in the current process) reading items and
+        # formatting them - or waiting for workers formatting them
+        self.timings = {"read": 0.0, "format": 0.0}
+
+    def _get_chunks(self, reader):
+        items = (dict(item) for item in reader)
+        while True:
+            start = perf_counter()
+            chunk = list(islice(items, self.chunk_size))
+            self.timings["read"] += perf_counter() - start
+            if not chunk:
+                return
+            # time_of_start is read with the opening tag of the file
+            yield chunk, reader.time_of_start
+
+    def _get_cards(self, format_chunk) -> list:
+        start = perf_counter()
+        cards = format_chunk()
+        self.timings["format"] += perf_counter() - start
+        return cards
+
+    def format(self, reader):
+        """
+        Yields (card, error) pairs of items from the reader.
+        """
+        if not self.workers:
+            for chunk, time_of_start in self._get_chunks(reader):
+                yield from self._get_cards(
+                    lambda: format_items(chunk, time_of_start))
+            return
+
+        chunks = self._get_chunks(reader)
+        # no more workers are started than there are chunks to format
+        first_chunks = list(islice(chunks, self.workers))
+        if not first_chunks:
+            return
+        executor = ProcessPoolExecutor(max_workers=len(first_chunks),
+                                       mp_context=mp_context)
+        pending = deque()
+        try:
+            for chunk, time_of_start in chain(first_chunks, chunks):
+                pending.append(executor.submit(format_items, chunk,
+                                               time_of_start))
+                if len(pending) >= self.max_pending_chunks:
+                    yield from self._get_cards(pending.popleft().result)
+            while pending:
+                yield from self._get_cards(pending.popleft().result)
+        finally:
+            # e.g. when writing cards failed
+            executor.shutdown(cancel_futures=True)
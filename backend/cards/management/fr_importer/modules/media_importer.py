@@ -0,0 +1,154 @@
+"""
+Importing media files (images and sounds) of imported cards into
+the storage.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from cards.models import Card, CardImage, Image, Sound
+from cards.utils.image_derivatives import schedule_image_derivatives
+
+
+class MediaImporter:
+    """
+    Copies media files referenced by imported cards (<img> and <snd> tags
+    of their sides) into the storage and links them to the cards.
+
+    Files are copied in a pool of threads (as copying is I/O-bound), as
+    soon as cards are added - while further items are being read - and
+    rows of media are created in bulk when batches of cards are written.
+    Files are stored under the hash of their contents, so identical ones
+    are stored once and files already in the storage (and their rows)
+    are reused.
+    """
+    # kind of media (a prefix of CardSide's fields): model, file field
+    media_kinds = {"image": (Image, "image"), "sound": (Sound, "sound_file")}
+    # card data key: side of the card
+    sides = {"question": "front", "answer": "back"}
+
+    def __init__(self, media_dir, workers=4):
+        """
+        media_dir - directory which paths of media files are relative to
+        (in elements.xml - the directory of the file).
+        """
+        self.media_dir = media_dir
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="media-import")
+        # (kind, path): future of the stored file's name (None when
+        # the file is missing)
+        self._files = {}
+        # stored name: event set when the file is stored
+        self._storing = {}
+        self._lock = Lock()
+        self.files_stored = self.files_present = self.files_missing = 0
+
+    def add(self, card_data):
+        """
+        Starts storing media files of the card (in the background).
+        """
+        for side in self.sides:
+            for kind in self.media_kinds:
+                path = card_data[side][f"{kind}_file_path"]
+                if path and (kind, path) not in self._files:
+                    self._files[kind, path] = self._executor.submit(
+                        self._store_file, kind, path)
+
+    def _store_file(self, kind, path) -> str | None:
+        model, field_name = self.media_kinds[kind]
+        field = model._meta.get_field(field_name)
+        try:
+            with open(os.path.join(self.media_dir, path), "rb") as file:
+                content = file.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.files_missing += 1
+            return None
+        name = field.storage.get_content_name(
+            field.generate_filename(None, os.path.basename(path)),
+            hashlib.sha256(content).hexdigest())
+        with self._lock:
+            stored = self._storing.get(name)
+            if stored is None:
+                self._storing[name] = Event()
+        if stored is not None:
+            # the same contents are being stored by another thread
+            stored.wait()
+        elif field.storage.exists(name):
+            self._storing[name].set()
+        else:
+            try:
+                field.storage.save(name, ContentFile(content))
+            finally:
+                self._storing[name].set()
+            with self._lock:
+                self.files_stored += 1
+            return name
+        with self._lock:
+            self.files_present += 1
+        return name
+
+    def write(self, cards_data, card_ids, created_ids):
+        """
+        Links media files to created cards (waiting until they are
+        stored), creating rows of media not in the database yet.
+        """
+        # kind: [(card id, side, stored name)]
+        links = {kind: [] for kind in self.media_kinds}
+        # stored name: name of the original file
+        file_names = {}
+        for key, card_data in cards_data.items():
+            if card_ids[key] not in created_ids:
+                continue
+            for side, card_side in self.sides.items():
+                for kind in self.media_kinds:
+                    path = card_data[side][f"{kind}_file_path"]
+                    name = path and self._files[kind, path].result()
+                    if name:
+                        links[kind].append((card_ids[key], card_side, name))
+                        file_names.setdefault(name, os.path.basename(path))
+        image_ids = self._get_media_ids(
+            "image", {name for *_, name in links["image"]}, file_names)
+        CardImage.objects.bulk_create(
+            [CardImage(card_id=card_id, image_id=image_ids[name], side=side)
+             for card_id, side, name in links["image"]],
+            ignore_conflicts=True)
+        sound_ids = self._get_media_ids(
+            "sound", {name for *_, name in links["sound"]}, file_names)
+        cards = {}
+        for card_id, side, name in links["sound"]:
+            card = cards.setdefault(card_id, Card(pk=card_id))
+            setattr(card, f"{side}_audio_id", sound_ids[name])
+        Card.objects.bulk_update(cards.values(),
+                                 ["front_audio", "back_audio"])
+
+    def _get_media_ids(self, kind, names, file_names) -> dict:
+        """
+        Returns ids of rows of the stored files ({name: id}) - created
+        (described with names of the original files) if there are none.
+        """
+        model, field_name = self.media_kinds[kind]
+        media_ids = {}
+        for name, media_id in model.objects.filter(
+                **{f"{field_name}__in": names}).values_list(field_name,
+                                                             "id"):
+            media_ids.setdefault(name, media_id)
+        new_media = model.objects.bulk_create(
+            model(**{field_name: name},
+                  description=file_names[name])
+            for name in names - media_ids.keys())
+        for media in new_media:
+            media_ids[getattr(media, field_name).name] = media.id
+            if model is Image:
+                # bulk_create() sends no post_save signal
+                transaction.on_commit(
+                    lambda pk=media.pk: schedule_image_derivatives(pk))
+        return media_ids
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
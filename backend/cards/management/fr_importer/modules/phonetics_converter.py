@@ -1,3 +1,7 @@
+import re
+from functools import lru_cache
+
+
 class InvalidTokenError(Exception):
     pass
 
@@ -262,49 +266,56 @@ class Token:
 
 
 class PhoneticsConverter:
+    """
+    Converts phonetic spelling (in the notation of TECHLAND_PHONETICS)
+    into html: at each position the longest recognized lexeme is taken
+    (or a single, possibly unrecognized, character).
+    """
     _available_tokens = {tpl[0]: Token(tpl[0], **tpl[1])
                          for tpl in TECHLAND_PHONETICS}
 
+    longest_lexeme = max(len(key) for key in _available_tokens)
+
+    # alternatives are tried in order: multi-character lexemes from
+    # the longest, then any single character
+    _lexeme_pattern = re.compile(
+        "|".join(re.escape(lexeme) for lexeme in sorted(
+            (key for key in _available_tokens if len(key) > 1),
+            key=len, reverse=True)) + "|.",
+        re.DOTALL)
+
     def __init__(self, phonetics):
         self._phonetics = phonetics
-        self._tokens = []
-        self._current = 0
-        self._longest_available_lexeme = self.longest_lexeme
-        self._scan_phonetics()
+        self._tokens = list(self._scan_phonetics(phonetics))
 
     tokens = property(lambda self: tuple(self._tokens))
 
-    longest_lexeme = property(
-        lambda self: max([len(key) for key in self._available_tokens.keys()]))
-
     converted_phonetics = property(
-        lambda self: "".join(token.html_output for token in self.tokens))
-
-    def _scan_token(self, length):
-        end = self._current + length
-        current_char = self._phonetics[self._current:end]
-        self._add_token(current_char)
+        lambda self: self.convert(self._phonetics))
 
-    def _add_token(self, lexeme):
+    @classmethod
+    def _get_token(cls, lexeme) -> Token:
         if len(lexeme) < 2:
-            token = self._available_tokens.get(
+            return cls._available_tokens.get(
                 lexeme, Token(lexeme, "UNRECOGNIZED"))
-        else:
-            token = self._available_tokens[lexeme]
-        self._tokens.append(token)
+        return cls._available_tokens[lexeme]
 
-    def _scan_phonetics(self):
-        while not self.is_at_end():
-            self._scan_tokens()
+    @classmethod
+    @lru_cache(maxsize=4096)
+    def _scan_phonetics(cls, phonetics) -> tuple[Token, ...]:
+        return tuple(cls._get_token(lexeme)
+                     for lexeme in cls._lexeme_pattern.findall(phonetics))
 
-    def _scan_tokens(self):
-        for length in range(self._longest_available_lexeme, 0, -1):
-            try:
-                self._scan_token(length)
-                self._current += length
-                break
-            except KeyError:
-                pass
+    @classmethod
+    @lru_cache(maxsize=4096)
+    def convert(cls, phonetics) -> str:
+        """
+        Returns html of the phonetics (cached - the same phonetic
+        spellings recur in vocabulary decks).
+        """
+        return "".join(token.html_output
+                       for token in cls._scan_phonetics(phonetics))
 
-    def is_at_end(self):
-        return self._current >= len(self._phonetics)
+    @classmethod
+    def convert_many(cls, phonetics_list) -> list[str]:
+        return [cls.convert(phonetics) for phonetics in phonetics_list]
@@ -0,0 +1,138 @@
+"""
+Removal of HTML tags (except a few kept ones, with their contents) from
+card sides - in a single pass over the text, without building a tree.
+
+The output is the same as the one of parsing the text with BeautifulSoup
+(html.parser), unwrapping all but the kept tags and serializing the soup:
+text is escaped, strings of whitespace only are collapsed and kept tags
+left open are closed. Constructs which don't appear in elements.xml files
+(comments, declarations, character references, kept tags with attributes)
+are handed over to BeautifulSoup.
+"""
+
+from html import escape
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from bs4.builder import HTMLTreeBuilder
+from bs4.dammit import EntitySubstitution
+
+KEPT_TAGS = ("strike", "i")
+# strings of these characters only are collapsed into a single one
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+
+class UnsupportedMarkup(Exception):
+    pass
+
+
+class TagStripper(HTMLParser):
+    """
+    Streams text and kept tags of the parsed markup into the output,
+    keeping track of open tags the way BeautifulSoup does.
+    """
+    void_tags = HTMLTreeBuilder.empty_element_tags
+    preserve_whitespace_tags = \
+        HTMLTreeBuilder.DEFAULT_PRESERVE_WHITESPACE_TAGS
+
+    def __init__(self, kept_tags=KEPT_TAGS):
+        super().__init__(convert_charrefs=False)
+        self.kept_tags = kept_tags
+        self.output = []
+        self.data = []
+        self.open_tags = []
+        # void tags closed on opening - their end tags are ignored
+        self.closed_void_tags = []
+
+    def strip(self, text) -> str:
+        self.feed(text)
+        self.close()
+        self._end_data()
+        while self.open_tags:
+            self._pop_tag()
+        return "".join(self.output)
+
+    def handle_starttag(self, tag, attrs, close_void_tag=True):
+        self._end_data()
+        if tag in self.kept_tags:
+            if attrs:
+                raise UnsupportedMarkup(f"attributes of <{tag}>")
+            self.output.append(f"<{tag}>")
+        self.open_tags.append(tag)
+        if close_void_tag and tag in self.void_tags:
+            self._close_tag(tag)
+            self.closed_void_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, close_void_tag=False)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.closed_void_tags:
+            self.closed_void_tags.remove(tag)
+        else:
+            self._close_tag(tag)
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_entityref(self, name):
+        # unknown entities are taken literally (without the semicolon)
+        self.data.append(EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(
+            name, f"&{name}"))
+
+    def _unsupported(self, data):
+        raise UnsupportedMarkup(data)
+
+    handle_charref = handle_comment = handle_decl = handle_pi = \
+        unknown_decl = _unsupported
+
+    def _end_data(self):
+        if not self.data:
+            return
+        data = "".join(self.data)
+        self.data = []
+        if not data.strip(ASCII_SPACES) and not any(
+                tag in self.preserve_whitespace_tags
+                for tag in self.open_tags):
+            data = "\n" if "\n" in data else " "
+        self.output.append(escape(data, quote=False))
+
+    def _close_tag(self, tag):
+        # closes tags opened after the tag as well; end tags of tags which
+        # aren't open are ignored
+        self._end_data()
+        if tag in self.open_tags:
+            while self._pop_tag() != tag:
+                pass
+
+    def _pop_tag(self) -> str:
+        tag = self.open_tags.pop()
+        if tag in self.kept_tags:
+            self.output.append(f"</{tag}>")
+        return tag
+
+
+def strip_tags_with_soup(text: str, kept_tags=KEPT_TAGS) -> str:
+    # from: https://stackoverflow.com/questions/56001921/
+    # removing-tags-from-html-except-specific-ones-but-keep-their-contents
+    # original author: glhr
+    soup = BeautifulSoup(text, "html.parser")
+    for e in soup.find_all():
+        if e.name not in kept_tags:
+            e.unwrap()
+    return str(soup)
+
+
+def strip_tags_except(text: str, kept_tags=KEPT_TAGS) -> str:
+    """
+    Removes tags from the text, except the kept ones.
+    """
+    if "<" not in text and "&" not in text and ">" not in text \
+            and text.strip(ASCII_SPACES):
+        # plain text - nothing to strip or escape
+        return text
+    try:
+        return TagStripper(kept_tags).strip(text)
+    except UnsupportedMarkup:
+        return strip_tags_with_soup(text, kept_tags)
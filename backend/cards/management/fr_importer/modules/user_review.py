@@ -1,5 +1,7 @@
 import datetime
 from datetime import datetime as dt, timedelta
+from itertools import repeat
+from operator import itemgetter
 from typing import Any
 
 
@@ -8,10 +10,13 @@ class UserReview:
     Translates the fr user review fields (from the elements.xml file) for use
     in a local database.
     """
+    max_for_cram = 3
+    ef_max = 4.0
+    ef_min = 1.4
+
     def __init__(self, fr_review: dict, time_of_start: int):
         self._fr_review = fr_review
         self._epoch_time_of_start = time_of_start
-        self.max_for_cram = 3
 
     @property
     def lapses(self) -> int:
@@ -63,14 +68,12 @@ class UserReview:
             decimal_places)
         return self._normalize_e_factor(e_factor)
 
-    @staticmethod
-    def _normalize_e_factor(e_factor) -> float:
-        ef_max = 4.0
-        ef_min = 1.4
-        if e_factor > ef_max:
-            return ef_max
-        elif e_factor < ef_min:
-            return ef_min
+    @classmethod
+    def _normalize_e_factor(cls, e_factor) -> float:
+        if e_factor > cls.ef_max:
+            return cls.ef_max
+        elif e_factor < cls.ef_min:
+            return cls.ef_min
         return e_factor
 
     @property
@@ -101,5 +104,51 @@ class UserReview:
             None  # comment
         ]
 
-    def __getitem__(self, key: str) -> dict:
-        return dict(zip(self.keys(), self.values))[key]
+    # key: property returning the value
+    _properties = {"computed_interval": "current_computed_interval",
+                   "comment": None}
+
+    def __getitem__(self, key: str) -> Any:
+        # only the value of the key is computed
+        if key not in self.keys():
+            raise KeyError(key)
+        attribute = self._properties.get(key, key)
+        return None if attribute is None else getattr(self, attribute)
+
+
+def convert_reviews(fr_reviews: list[dict], time_of_start: int) \
+        -> list[dict]:
+    """
+    Converts fr user review fields of many items at once (as UserReview
+    does for a single one): the fields are taken as columns and each
+    converted field is computed for the whole column.
+    """
+    if not fr_reviews:
+        return []
+    ids, days_to_review, intervals, real_intervals, repetitions, grades = \
+        zip(*map(itemgetter("id", "stmtrpt", "ivl", "rllivl", "rp", "gr"),
+                 fr_reviews))
+    days_reviewed = [days - interval for days, interval
+                     in zip(days_to_review, intervals)]
+    # review dates are days after the time of start - mostly repeated ones
+    start = dt.fromtimestamp(time_of_start)
+    dates = {days: start + timedelta(days=days)
+             for days in {*days_to_review, *days_reviewed}}
+    columns = {
+        "computed_interval": intervals,
+        "lapses": repeat(0),
+        "reviews": repetitions,
+        "total_reviews": repetitions,
+        "last_reviewed": map(dates.__getitem__, days_reviewed),
+        "introduced_on": map(dt.fromtimestamp, ids),
+        "review_date": map(dates.__getitem__, days_to_review),
+        "grade": grades,
+        "easiness_factor": [
+            UserReview._normalize_e_factor(round(interval / real_interval, 2))
+            for interval, real_interval in zip(intervals, real_intervals)],
+        "crammed": [grade < UserReview.max_for_cram for grade in grades],
+        "comment": repeat(None),
+    }
+    keys = UserReview.keys()
+    return [dict(zip(keys, values))
+            for values in zip(*(columns[key] for key in keys))]
@@ -1,10 +1,16 @@
 """
 Tests for CardSide (itself tested through inheriting classes).
 """
-from unittest import TestCase
+from unittest import TestCase, mock
+from xml.etree import ElementTree as ET
 
 from cards.management.fr_importer.modules.card_answer import Answer
 from cards.management.fr_importer.modules.card_question import Question
+from cards.management.fr_importer.modules.card_side import CardSide
+from cards.management.fr_importer.modules.html_formatted_answer import \
+    HTMLFormattedAnswer
+from cards.management.fr_importer.modules.html_formatted_question import \
+    HTMLFormattedQuestion
 
 
 class SoundExtractionTestCase(TestCase):
@@ -160,3 +166,79 @@ class ImageExtractionTestCase(TestCase):
     def test_Answer_image_filename_no_image_tag(self):
         item_answer = Answer(self.answer_no_image)
         self.assertEqual(None, item_answer.image_file_name)
+
+
+class ParsingOnceTestCase(TestCase):
+    """
+    Contents of a side are cleaned once, however many fields are read.
+    """
+
+    @staticmethod
+    def get_strip_tags_calls(side_class, side_contents, fields) -> int:
+        strip_tags = mock.Mock(
+            side_effect=CardSide._strip_tags_except_specific)
+        with mock.patch.object(CardSide, "_strip_tags_except_specific",
+                               strip_tags):
+            side = side_class(side_contents)
+            for _ in range(2):
+                for field in fields:
+                    getattr(side, field)
+                dict(side)
+        return strip_tags.call_count
+
+    def test_answer(self):
+        answer = ("jocular ['d7Ckjul2(r)]\n"
+                  "He, he, he! You will pardon me for being jocular.")
+        fields = ["answer", "phonetics_key", "phonetics_spelling",
+                  "example_sentences"]
+        self.assertEqual(
+            self.get_strip_tags_calls(Answer, answer, fields), 1)
+        self.assertEqual(self.get_strip_tags_calls(
+            HTMLFormattedAnswer, answer, [*fields, "phonetics_block"]), 1)
+
+    def test_question(self):
+        question = "<b>Definition</b> [...]\nExample"
+        self.assertEqual(self.get_strip_tags_calls(
+            HTMLFormattedQuestion, question,
+            ["definition", "examples", "side_contents"]), 1)
+
+    def test_lines(self):
+        question = Question("definition\nexample 1\n\nexample 2")
+
+        self.assertEqual(question._lines,
+                         ("definition", "example 1", "", "example 2"))
+        self.assertEqual(question.examples, ["example 1", "example 2"])
+
+
+class MediaTagsParsingTestCase(TestCase):
+    """
+    Media tags of a side are parsed once for all the fields.
+    """
+    fromstring = "cards.management.fr_importer.modules.card_side." \
+                 "ET.fromstring"
+
+    def test_single_parse(self):
+        answer = Answer("answer\nsentence<img>../obrazy/theatre.jpg</img>"
+                        "<snd>snds/a.mp3</snd>")
+        with mock.patch(self.fromstring,
+                        side_effect=ET.fromstring) as fromstring:
+            mapped = dict(answer)
+            dict(answer)
+
+        self.assertEqual(fromstring.call_count, 1)
+        self.assertEqual(mapped["image_file_name"], "theatre.jpg")
+        self.assertEqual(mapped["sound_file_path"], "snds/a.mp3")
+
+    def test_no_tags(self):
+        """
+        Sides without tags are not parsed at all.
+        """
+        with mock.patch(self.fromstring) as fromstring:
+            mapped = dict(Question("definition\nexample"))
+
+        fromstring.assert_not_called()
+        self.assertIsNone(mapped["image_file_path"])
+
+    def test_unknown_key(self):
+        with self.assertRaises(KeyError):
+            Question("definition")["definition"]
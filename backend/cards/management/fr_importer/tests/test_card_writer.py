@@ -0,0 +1,130 @@
+from datetime import date, datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from cards.management.fr_importer.modules.card_writer import CardWriter
+from cards.models import Card, CardUserData, Category, VisibleCard
+
+
+class CardWriterTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="user")
+        self.introduced_on = datetime(2009, 3, 7, 15, 3, 58)
+
+    def get_card_data(self, number, memorized=True) -> dict:
+        card_data = {"question": {"output_text": f"question {number}"},
+                     "answer": {"output_text": f"answer {number}"}}
+        if memorized:
+            card_data["review_details"] = {
+                "computed_interval": 583, "lapses": 0, "reviews": 6,
+                "total_reviews": 6, "last_reviewed": date(2025, 1, 1),
+                "introduced_on": self.introduced_on,
+                "review_date": date(2026, 8, 9), "grade": 4,
+                "easiness_factor": 2.5, "crammed": False, "comment": None}
+        return card_data
+
+    def write(self, cards_data, **kwargs) -> CardWriter:
+        writer = CardWriter(**kwargs)
+        for card_data in cards_data:
+            writer.add(card_data)
+        writer.flush()
+        return writer
+
+    def test_batches(self):
+        reports = []
+        writer = self.write([self.get_card_data(number)
+                             for number in range(5)],
+                            batch_size=2, report=reports.append)
+
+        self.assertEqual(writer.batches, 3)
+        self.assertEqual(Card.objects.count(), 5)
+        self.assertEqual(len(reports), 3)
+        self.assertIn("items/s", reports[-1])
+
+    def test_queries_per_batch(self):
+        """
+        The number of queries depends on the number of batches only.
+        """
+        cards_data = [self.get_card_data(number) for number in range(20)]
+        # in each batch: cards, their ids, users, visible cards, memorized
+        # cards, review data (and the savepoint)
+        with self.assertNumQueries(16):
+            self.write(cards_data, user=self.user, batch_size=10)
+
+    def test_queries_reimporting_into_category(self):
+        """
+        Existing cards added to the category don't add queries per card.
+        """
+        category = Category.objects.create(name="category")
+        queries = []
+        for cards_number in (5, 20):
+            cards_data = [self.get_card_data(f"{cards_number}-{number}")
+                          for number in range(cards_number)]
+            self.write(cards_data)
+            with CaptureQueriesContext(connection) as context:
+                self.write(cards_data, category=category,
+                           batch_size=cards_number)
+            queries.append(len(context.captured_queries))
+
+        self.assertEqual(queries[0], queries[1])
+
+    def test_review_data(self):
+        writer = self.write([self.get_card_data(1),
+                             self.get_card_data(2, memorized=False)],
+                            user=self.user)
+        review_data = CardUserData.objects.get(user=self.user)
+
+        self.assertEqual(writer.memorized, 1)
+        self.assertEqual(review_data.card.front, "question 1")
+        self.assertEqual(review_data.review_date, date(2026, 8, 9))
+        self.assertEqual(review_data.introduced_on,
+                         self.introduced_on.astimezone())
+        # review data created elsewhere is introduced now again
+        self.assertTrue(CardUserData._meta.get_field(
+            "introduced_on").auto_now_add)
+
+    def test_duplicates(self):
+        """
+        Duplicated and already existing cards are written once.
+        """
+        existing_card = Card.objects.create(front="question 1",
+                                            back="answer 1")
+        writer = self.write([self.get_card_data(1), self.get_card_data(2),
+                             self.get_card_data(2)], user=self.user)
+        self.write([self.get_card_data(2)], user=self.user)
+
+        self.assertEqual(writer.cards_created, 1)
+        self.assertEqual(Card.objects.count(), 2)
+        self.assertEqual(CardUserData.objects.count(), 2)
+        self.assertTrue(CardUserData.objects.filter(
+            card=existing_card, user=self.user).exists())
+
+    def test_visible_cards(self):
+        # (new users have root categories selected)
+        other_user = get_user_model().objects.create(username="other user")
+        category = Category.objects.create(name="category")
+        self.user.selected_categories.add(category)
+        self.write([self.get_card_data(1)], category=category)
+        self.write([self.get_card_data(2)])
+        card_1, card_2 = Card.objects.order_by("front")
+
+        self.assertEqual(list(card_1.categories.all()), [category])
+        self.assertTrue(VisibleCard.objects.filter(
+            user=self.user, card=card_1).exists())
+        self.assertFalse(VisibleCard.objects.filter(
+            user=other_user, card=card_1).exists())
+        self.assertEqual(VisibleCard.objects.filter(card=card_2).count(), 2)
+
+    def test_existing_card_added_to_category(self):
+        # (new users have root categories selected)
+        get_user_model().objects.create(username="other user")
+        category = Category.objects.create(name="category")
+        self.user.selected_categories.add(category)
+        self.write([self.get_card_data(1)])
+        self.write([self.get_card_data(1)], category=category)
+
+        self.assertEqual(list(VisibleCard.objects.values_list(
+            "user", flat=True)), [self.user.id])
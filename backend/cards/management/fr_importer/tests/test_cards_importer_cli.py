@@ -1,8 +1,19 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
 from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
 from django.core.management import call_command
 
+from cards.management.fr_importer.modules import item_formatter
+from cards.management.fr_importer.modules.card_writer import CardWriter
+from cards.models import Card, CardImage, CardUserData, Category
+
+
 class CLIImportingMemorizedCardsTestCase(TestCase):
     """
     Importing cards and their user review-data.
@@ -38,3 +49,163 @@ class CLIImportingMemorizedCardsTestCase(TestCase):
 
         self.assertEqual(self.get_stripped_command_output(),
                          expected_command_output)
+
+
+class CLIImportingElementsFileTestCase(TestCase):
+    command = "import_fr_memorized_cards"
+    time_of_start = 1186655166
+    elements_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
+<fullrecall core_version="9" time_of_start="{time_of_start}">
+<item id="1236435838" tmtrpt="6574" stmtrpt="6574" livl="1274" rllivl="1764"
+ ivl="583" rp="6" gr="4"><q>definition
+example sentence</q><a>answer</a></item>
+<item id="1236435839" tmtrpt="6574" stmtrpt="6574" livl="1274" rllivl="1764"
+ ivl="583" rp="6" gr="2"><q>definition 2</q><a>answer 2</a></item>
+<item><q>pending definition</q><a>pending answer</a></item>
+<item><q></q><a>no question</a></item>
+</fullrecall>
+"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="user")
+        self.command_output = StringIO()
+        file_descriptor, self.file_path = tempfile.mkstemp(suffix=".xml")
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+            file.write(self.elements_xml)
+        self.addCleanup(os.remove, self.file_path)
+        self.checkpoint_path = f"{self.file_path}.checkpoint"
+        self.addCleanup(lambda: os.path.exists(self.checkpoint_path)
+                        and os.remove(self.checkpoint_path))
+
+    def import_file(self, **options):
+        call_command(self.command, stdout=self.command_output,
+                     inputfile=self.file_path, **options)
+
+    def test_importing_cards(self):
+        self.import_file(user="user")
+
+        self.assertEqual(Card.objects.count(), 3)
+        self.assertTrue(Card.objects.filter(
+            front__contains="example sentence",
+            back__contains="answer").exists())
+        self.assertIn("3 cards imported (3 new, 2 memorized, 1 skipped)",
+                      self.command_output.getvalue())
+
+    def test_review_data(self):
+        self.import_file(user="user")
+        review_data = CardUserData.objects.get(
+            user=self.user, card__front__contains="example sentence")
+        start = datetime.fromtimestamp(self.time_of_start)
+
+        self.assertEqual(review_data.review_date,
+                         (start + timedelta(days=6574)).date())
+        self.assertEqual(review_data.introduced_on,
+                         datetime.fromtimestamp(1236435838).astimezone())
+        self.assertEqual(review_data.computed_interval, 583)
+        self.assertFalse(review_data.crammed)
+        self.assertTrue(CardUserData.objects.get(
+            user=self.user, card__front__contains="definition 2").crammed)
+
+    def test_worker_processes(self):
+        self.import_file(user="user", workers=2, chunk_size=1)
+
+        self.assertEqual(Card.objects.count(), 3)
+        self.assertEqual(CardUserData.objects.count(), 2)
+
+    def test_no_user(self):
+        self.import_file()
+
+        self.assertEqual(Card.objects.count(), 3)
+        self.assertFalse(CardUserData.objects.exists())
+
+    def test_reimporting(self):
+        """
+        Cards and review data already imported are not duplicated.
+        """
+        self.import_file(user="user")
+        self.import_file(user="user")
+
+        self.assertEqual(Card.objects.count(), 3)
+        self.assertEqual(CardUserData.objects.count(), 2)
+        self.assertIn("3 cards imported (0 new, 0 memorized, 1 skipped)",
+                      self.command_output.getvalue())
+
+    def test_category(self):
+        self.import_file(category="imported", batch_size=2)
+
+        self.assertEqual(
+            Category.objects.get(name="imported").cards.count(), 3)
+        self.assertIn("2 items written", self.command_output.getvalue())
+
+    def test_checkpoint_removed_after_import(self):
+        self.import_file(user="user", batch_size=1)
+
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_resuming(self):
+        write_batch = CardWriter._write_batch
+
+        def fail_on_second_batch(writer, batch):
+            if writer.batches == 1:
+                raise RuntimeError("connection lost")
+            write_batch(writer, batch)
+
+        with mock.patch.object(CardWriter, "_write_batch",
+                               fail_on_second_batch), \
+                self.assertRaises(RuntimeError):
+            self.import_file(user="user", batch_size=1)
+        self.assertTrue(os.path.exists(self.checkpoint_path))
+        self.assertEqual(Card.objects.count(), 1)
+
+        with mock.patch.object(item_formatter, "HtmlFormattedCard",
+                               wraps=item_formatter.HtmlFormattedCard) \
+                as format_item:
+            self.import_file(user="user", batch_size=1, resume=True,
+                             workers=0)
+
+        # items imported before aren't formatted again
+        self.assertEqual(format_item.call_count, 3)
+        self.assertEqual(Card.objects.count(), 3)
+        self.assertEqual(CardUserData.objects.count(), 2)
+        output = self.command_output.getvalue()
+        self.assertIn("resuming the import after 1 items", output)
+        self.assertIn("3 cards imported (3 new, 2 memorized, 1 skipped)",
+                      output)
+
+    def test_resuming_without_checkpoint(self):
+        self.import_file(resume=True)
+
+        self.assertEqual(Card.objects.count(), 3)
+        self.assertIn("importing from the start",
+                      self.command_output.getvalue())
+
+    def test_dry_run(self):
+        self.import_file(user="user", category="imported", dry_run=True)
+
+        self.assertFalse(Card.objects.exists())
+        self.assertFalse(Category.objects.filter(name="imported").exists())
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+        output = self.command_output.getvalue()
+        self.assertIn("3 cards formatted (1 skipped)", output)
+        self.assertIn("reading: ", output)
+        self.assertIn("formatting: ", output)
+
+    def test_media_files(self):
+        media_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_dir)
+        os.mkdir(os.path.join(media_dir, "obrazy"))
+        with open(os.path.join(media_dir, "obrazy", "theatre.jpg"),
+                  "wb") as file:
+            file.write(b"image")
+        with open(self.file_path, "w", encoding="utf-8") as file:
+            file.write(self.elements_xml.replace(
+                "<q>definition 2</q>",
+                "<q>definition 2<img>obrazy/theatre.jpg</img></q>"))
+
+        with override_settings(MEDIA_ROOT=media_dir):
+            self.import_file(media_dir=media_dir)
+
+        self.assertTrue(CardImage.objects.filter(
+            card__front__contains="definition 2", side="front").exists())
+        self.assertIn("1 media files stored (0 already present, 0 missing)",
+                      self.command_output.getvalue())
@@ -0,0 +1,110 @@
+import unittest
+from io import BytesIO
+from unittest import mock
+from xml.etree import ElementTree as ET
+
+from cards.management.fr_importer.modules.elements_reader import \
+    ElementsReader
+from cards.management.fr_importer.modules.html_formatted_card import \
+    HtmlFormattedCard
+from cards.management.fr_importer.modules.html_memorized_card import \
+    HtmlFormattedMemorizedCard
+from cards.management.fr_importer.modules.item import Item
+
+
+class ItemTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.review_details = {"id": 1236435838, "tmtrpt": 6574,
+                              "stmtrpt": 6574, "livl": 1274, "rllivl": 1764,
+                              "ivl": 583, "rp": 6, "gr": 4}
+        attributes = " ".join(f'{key}="{value}"'
+                              for key, value in cls.review_details.items())
+        cls.question_text = ("<i>definition</i>\nexample"
+                             "<img>../obrazy/theatre.jpg</img>")
+        cls.answer_text = "answer &amp; more\nsentence<snd>snds/a.mp3</snd>"
+        cls.item = Item(ET.fromstring(
+            f"<item {attributes}><q>{cls.question_text}</q>"
+            f"<a>{cls.answer_text}</a></item>"))
+        cls.pending_item = Item(ET.fromstring(
+            "<item><q>question</q><a>answer</a></item>"))
+
+    def test_question_text(self):
+        """
+        Contents of the <q> tag - as they are in the elements.xml file.
+        """
+        self.assertEqual(self.item.question_text, self.question_text)
+
+    def test_answer_text(self):
+        self.assertEqual(self.item.answer_text, self.answer_text)
+
+    def test_sides(self):
+        self.assertEqual(self.item.question.image_file_path,
+                         "../obrazy/theatre.jpg")
+        self.assertEqual(self.item.answer.sound_file_path, "snds/a.mp3")
+
+    def test_review_details(self):
+        self.assertTrue(self.item.memorized)
+        self.assertEqual(self.item.review_details, self.review_details)
+
+    def test_pending_item(self):
+        self.assertFalse(self.pending_item.memorized)
+        self.assertEqual(dict(self.pending_item),
+                         {"question": "question", "answer": "answer"})
+
+    def test_missing_keys(self):
+        for key in ("review_details", "question_text", "_answer_text"):
+            with self.subTest(key=key), self.assertRaises(KeyError):
+                self.pending_item[key]
+
+    def test_formatted_card(self):
+        self.assertIsInstance(
+            self.item.get_formatted_card(1186655166),
+            HtmlFormattedMemorizedCard)
+        pending_card = self.pending_item.get_formatted_card(1186655166)
+        self.assertIsInstance(pending_card, HtmlFormattedCard)
+        self.assertNotIsInstance(pending_card, HtmlFormattedMemorizedCard)
+
+
+class ElementsReaderTestCase(unittest.TestCase):
+    elements_xml = (
+        b'<?xml version="1.0" encoding="UTF-8"?>\n'
+        b'<fullrecall core_version="9" time_of_start="1186655166">\n'
+        b'<item id="1" tmtrpt="5" stmtrpt="5" livl="3" rllivl="3" ivl="3" '
+        b'rp="2" gr="4"><q>question 1</q><a>answer 1</a>\n'
+        b'  <item><q>nested question</q><a>nested answer</a></item>\n'
+        b'</item>\n'
+        b'<item><q>question 2</q><a>answer \xc5\xbc</a></item>\n'
+        b'</fullrecall>\n')
+
+    def test_items(self):
+        reader = ElementsReader(BytesIO(self.elements_xml))
+        items = list(reader)
+
+        self.assertEqual(reader.time_of_start, 1186655166)
+        self.assertEqual([item.question_text for item in items],
+                         ["nested question", "question 1", "question 2"])
+        self.assertEqual(items[2].answer_text, "answer ż")
+        self.assertEqual([item.memorized for item in items],
+                         [False, True, False])
+
+    def test_items_discarded(self):
+        """
+        Items read are removed from the tree being built, so it does not
+        grow with the file.
+        """
+        elements = []
+        original_iterparse = ET.iterparse
+
+        def iterparse(*args, **kwargs):
+            for event, element in original_iterparse(*args, **kwargs):
+                elements.append(element)
+                yield event, element
+
+        with mock.patch("cards.management.fr_importer.modules."
+                        "elements_reader.ET.iterparse", iterparse):
+            list(ElementsReader(BytesIO(self.elements_xml)))
+        root = elements[0]
+
+        self.assertEqual(root.tag, "fullrecall")
+        self.assertEqual(len(root), 0)
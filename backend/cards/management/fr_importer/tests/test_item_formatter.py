@@ -0,0 +1,95 @@
+import unittest
+from unittest import mock
+
+from cards.management.fr_importer.modules import item_formatter
+from cards.management.fr_importer.modules.item_formatter import \
+    ItemFormatter
+
+
+class FakeReader:
+    """
+    Iterates over items (dicts), counting items read.
+    """
+    time_of_start = 1186655166
+
+    def __init__(self, items):
+        self.items = items
+        self.read = 0
+
+    def __iter__(self):
+        for item in self.items:
+            self.read += 1
+            yield item
+
+
+class ItemFormatterTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        review_details = {"id": 1236435838, "tmtrpt": 6574, "stmtrpt": 6574,
+                          "livl": 1274, "rllivl": 1764, "ivl": 583, "rp": 6,
+                          "gr": 4}
+        cls.items = [{"question": f"question {number}",
+                      "answer": f"answer {number}",
+                      "review_details": review_details}
+                     for number in range(20)]
+        cls.items[5] = {"question": "", "answer": "no question"}
+        cls.items[6] = {"question": "pending question",
+                        "answer": "pending answer"}
+
+    def test_formatting_in_process(self):
+        cards = list(ItemFormatter(workers=0, chunk_size=3).format(
+            FakeReader(self.items)))
+
+        self.assertEqual(len(cards), 20)
+        self.assertIn("question 0", cards[0][0]["question"]["output_text"])
+        self.assertIn("review_details", cards[0][0])
+        self.assertNotIn("review_details", cards[6][0])
+
+    def test_errors(self):
+        cards = list(ItemFormatter(workers=0).format(FakeReader(self.items)))
+        card, error = cards[5]
+
+        self.assertIsNone(card)
+        self.assertIn("missing obligatory argument", error)
+
+    def test_worker_processes(self):
+        """
+        Cards formatted in worker processes are the same and in the same
+        order.
+        """
+        in_process = list(ItemFormatter(workers=0).format(
+            FakeReader(self.items)))
+        in_workers = list(ItemFormatter(workers=2, chunk_size=3).format(
+            FakeReader(self.items)))
+
+        self.assertEqual(in_workers, in_process)
+
+    def test_worker_pool(self):
+        """
+        Workers are spawned (not forked) and there are no more of them
+        than chunks of items.
+        """
+        with mock.patch.object(item_formatter, "ProcessPoolExecutor",
+                               wraps=item_formatter.ProcessPoolExecutor) \
+                as executor:
+            cards = list(ItemFormatter(workers=8, chunk_size=15).format(
+                FakeReader(self.items)))
+
+        self.assertEqual(len(cards), 20)
+        executor.assert_called_once_with(
+            max_workers=2, mp_context=item_formatter.mp_context)
+        self.assertEqual(item_formatter.mp_context.get_start_method(),
+                         "spawn")
+
+    def test_bounded_reading(self):
+        """
+        Items are read only a few chunks ahead of cards consumed.
+        """
+        reader = FakeReader(self.items)
+        formatter = ItemFormatter(workers=1, chunk_size=2,
+                                  max_pending_chunks=2)
+        cards = formatter.format(reader)
+        next(cards)
+
+        self.assertLessEqual(reader.read, 2 * 2 + 1)
+        cards.close()
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from cards.management.fr_importer.modules.card_writer import CardWriter
+from cards.management.fr_importer.modules.media_importer import \
+    MediaImporter
+from cards.models import Card, CardImage, Image, Sound
+
+
+class MediaImporterTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_root_setting = override_settings(MEDIA_ROOT=media_root)
+        media_root_setting.enable()
+        self.addCleanup(media_root_setting.disable)
+        self.media_root = media_root
+        self.media_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_dir)
+        self.make_file("obrazy/theatre.jpg", b"image")
+        self.make_file("obrazy/copy of theatre.jpg", b"image")
+        self.make_file("snds/a.mp3", b"sound")
+
+    def make_file(self, path, content):
+        file_path = os.path.join(self.media_dir, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as file:
+            file.write(content)
+
+    @staticmethod
+    def get_side(text, image=None, sound=None) -> dict:
+        return {"output_text": text, "image_file_path": image,
+                "sound_file_path": sound}
+
+    def write(self, cards_data) -> MediaImporter:
+        media = MediaImporter(self.media_dir, workers=2)
+        writer = CardWriter(media=media, batch_size=2)
+        for card_data in cards_data:
+            writer.add(card_data)
+        writer.flush()
+        media.close()
+        return media
+
+    def test_importing_media(self):
+        media = self.write([
+            {"question": self.get_side("question 1", "obrazy/theatre.jpg"),
+             "answer": self.get_side("answer 1", sound="snds/a.mp3")},
+            {"question": self.get_side("question 2",
+                                       "obrazy/copy of theatre.jpg",
+                                       "snds/a.mp3"),
+             "answer": self.get_side("answer 2", "obrazy/missing.jpg")},
+        ])
+        first_card = Card.objects.get(front="question 1")
+        second_card = Card.objects.get(front="question 2")
+
+        # files with the same contents are stored once
+        self.assertEqual(media.files_stored, 2)
+        self.assertEqual(media.files_present, 1)
+        self.assertEqual(media.files_missing, 1)
+        self.assertEqual(len(os.listdir(
+            os.path.join(self.media_root, "images"))), 1)
+        image = Image.objects.get()
+        self.assertEqual(image.description, "theatre.jpg")
+        self.assertEqual(CardImage.objects.filter(
+            image=image, side="front").count(), 2)
+        sound = Sound.objects.get()
+        self.assertEqual(first_card.back_audio, sound)
+        self.assertIsNone(first_card.front_audio)
+        self.assertEqual(second_card.front_audio, sound)
+        with sound.sound_file.open("rb") as sound_file:
+            self.assertEqual(sound_file.read(), b"sound")
+
+    def test_files_already_present(self):
+        self.write([{"question": self.get_side("question 1",
+                                               "obrazy/theatre.jpg"),
+                     "answer": self.get_side("answer 1")}])
+        media = self.write([{"question": self.get_side(
+            "question 2", "obrazy/copy of theatre.jpg"),
+            "answer": self.get_side("answer 2")}])
+
+        self.assertEqual(media.files_stored, 0)
+        self.assertEqual(media.files_present, 1)
+        self.assertEqual(Image.objects.count(), 1)
+        self.assertEqual(CardImage.objects.count(), 2)
+
+    def test_existing_cards(self):
+        """
+        Media of cards which are already in the database are not linked
+        again.
+        """
+        card_data = {"question": self.get_side("question 1",
+                                               "obrazy/theatre.jpg"),
+                     "answer": self.get_side("answer 1")}
+        self.write([card_data])
+        CardImage.objects.all().delete()
+        self.write([card_data])
+
+        self.assertFalse(CardImage.objects.exists())
@@ -123,3 +123,25 @@ class ConvertPhoneticsTestCase(TestCase):
                                    ' - our - as in sour">aʊə</span>')
         self.assertEqual(converter.converted_phonetics,
                          expected_html_phonetics)
+
+    def test_longest_match(self):
+        """
+        At each position the longest lexeme is recognized - also at the end
+        of the phonetics and among unrecognized characters.
+        """
+        converter = PhoneticsConverter("ju2rju:j2璃ju\nE2")
+        tokens = [token.lexeme for token in converter.tokens]
+
+        self.assertEqual(tokens, ["ju2r", "ju:", "j2", "璃", "ju", "\n",
+                                  "E2"])
+
+    def test_convert(self):
+        self.assertEqual(PhoneticsConverter.convert("A(e)t3Ia2(r)"),
+                         PhoneticsConverter("A(e)t3Ia2(r)")
+                         .converted_phonetics)
+
+    def test_convert_many(self):
+        phonetics = ["A(e)", "t3I", "A(e)"]
+        self.assertEqual(PhoneticsConverter.convert_many(phonetics),
+                         [PhoneticsConverter(spelling).converted_phonetics
+                          for spelling in phonetics])
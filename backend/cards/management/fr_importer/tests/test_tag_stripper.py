@@ -0,0 +1,39 @@
+from unittest import TestCase, mock
+
+from cards.management.fr_importer.modules.tag_stripper import \
+    TagStripper, strip_tags_except, strip_tags_with_soup
+
+
+class TagStripperTestCase(TestCase):
+    def test_plain_text(self):
+        text = "łódź\nkey [p@'tenS(e)l]"
+        with mock.patch.object(TagStripper, "feed") as feed:
+            self.assertEqual(strip_tags_except(text), text)
+        feed.assert_not_called()
+
+    def test_kept_tags(self):
+        self.assertEqual(strip_tags_except(
+            "<b>Definition</b><br><i>idiom</i> <STRIKE>old</STRIKE>"),
+            "Definition<i>idiom</i> <strike>old</strike>")
+
+    def test_unclosed_tags(self):
+        self.assertEqual(strip_tags_except("<b><i>open</b> text"),
+                         "<i>open</i> text")
+
+    def test_escaping(self):
+        self.assertEqual(strip_tags_except("A &amp; B &lt;tag&gt; & c > d"),
+                         "A &amp; B &lt;tag&gt; &amp; c &gt; d")
+
+    def test_whitespace_between_tags(self):
+        self.assertEqual(strip_tags_except("a<br>  \n <br>b<p>  </p>c"),
+                         "a\nb c")
+
+    def test_same_as_beautiful_soup(self):
+        # including constructs handed over to BeautifulSoup
+        texts = ["<i class='x'>a</i>", "<!-- comment -->a", "&#39;&#x41;",
+                 "<br/></br><i>a</br>b", "<pre>  </pre>", "&nbsp;&foo;",
+                 "<script>a < b</script>", "a <", "<i/>", "   ", ""]
+        for text in texts:
+            with self.subTest(text=text):
+                self.assertEqual(strip_tags_except(text),
+                                 strip_tags_with_soup(text))
@@ -3,7 +3,8 @@ import pprint
 import unittest
 from datetime import datetime, timedelta
 
-from cards.management.fr_importer.modules.user_review import UserReview
+from cards.management.fr_importer.modules.user_review import UserReview, \
+    convert_reviews
 
 
 class UserReviewTestCase(unittest.TestCase):
@@ -112,3 +113,30 @@ class UserReviewTestCase(unittest.TestCase):
         self.assertRaises(ValueError,
                           lambda: UserReview(
                               user_review, self.time_of_start).easiness_factor)
+
+
+class ConvertReviewsTestCase(unittest.TestCase):
+    time_of_start = 1186655166
+
+    def test_same_as_user_review(self):
+        fr_reviews = [
+            {"id": 1236435838 + number, "tmtrpt": 6574,
+             "stmtrpt": 6574 - number % 3, "livl": 1274, "rllivl": rllivl,
+             "ivl": ivl, "rp": number, "gr": number % 6}
+            for number, (rllivl, ivl) in enumerate(
+                [(1764, 583), (673, 1397), (67, 1397), (271, 33),
+                 (10, 0), (583, 583)])]
+
+        self.assertEqual(
+            convert_reviews(fr_reviews, self.time_of_start),
+            [dict(UserReview(fr_review, self.time_of_start))
+             for fr_review in fr_reviews])
+
+    def test_no_reviews(self):
+        self.assertEqual(convert_reviews([], self.time_of_start), [])
+
+    def test_unknown_key(self):
+        review = UserReview({}, self.time_of_start)
+
+        with self.assertRaises(KeyError):
+            review["ivl"]
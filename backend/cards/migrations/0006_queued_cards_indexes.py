@@ -0,0 +1,21 @@
+# Generated by Django 4.1.5 on 2026-10-19 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0005_alter_carduserdata_last_reviewed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['created_on', 'id'], name='card_created_on_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carduserdata',
+            index=models.Index(fields=['user', 'card'], name='carduserdata_user_card_idx'),
+        ),
+    ]
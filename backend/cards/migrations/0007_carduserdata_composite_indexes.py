@@ -0,0 +1,41 @@
+# Generated by Django 4.1.5 on 2026-10-19 03:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cards', '0006_queued_cards_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carduserdata',
+            index=models.Index(fields=['user', 'review_date'], name='carduserdata_user_review_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carduserdata',
+            index=models.Index(fields=['user', 'introduced_on', 'id'], name='carduserdata_user_intro_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carduserdata',
+            index=models.Index(condition=models.Q(('crammed', True)), fields=['user', 'introduced_on'], name='carduserdata_user_crammed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carduserdata',
+            index=models.Index(fields=['user', 'grade'], name='carduserdata_user_grade_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carduserdata',
+            index=models.Index(fields=['user', 'easiness_factor'], name='carduserdata_user_ef_idx'),
+        ),
+        migrations.AlterField(
+            model_name='carduserdata',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
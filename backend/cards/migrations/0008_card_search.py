@@ -0,0 +1,77 @@
+# Generated by Django 4.1.5 on 2026-10-19 03:23
+
+import re
+from html import unescape
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+import django.db.models.functions.text
+from django.db.models import Value
+
+# frozen copies of cards.utils.helpers.get_search_text() and
+# get_search_vector() - the migration doesn't follow later changes of them
+markup_pattern = re.compile(r"<[^>]*>|{%.*?%}|{{.*?}}|{#.*?#}", re.DOTALL)
+
+
+def get_search_text(text):
+    return " ".join(unescape(markup_pattern.sub(" ", text)).split())
+
+
+def get_search_vector(front, back, template_body):
+    return (SearchVector(Value(front), weight="A", config="english")
+            + SearchVector(Value(back), weight="B", config="english")
+            + SearchVector(Value(template_body), weight="C",
+                           config="english"))
+
+
+def set_search_fields(apps, schema_editor):
+    Card = apps.get_model("cards", "Card")
+    batch_size = 1000
+    batch = []
+    for card in Card.objects.select_related("template") \
+            .iterator(chunk_size=batch_size):
+        template_body = card.template.body if card.template else ""
+        front, back, template_text = (get_search_text(text) for text in
+                                      (card.front, card.back, template_body))
+        card.search_text = "\n".join(
+            text for text in (front, back, template_text) if text)
+        card.search_vector = get_search_vector(front, back, template_text)
+        batch.append(card)
+        if len(batch) == batch_size:
+            Card.objects.bulk_update(batch, ["search_text", "search_vector"])
+            batch = []
+    if batch:
+        Card.objects.bulk_update(batch, ["search_text", "search_vector"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0007_carduserdata_composite_indexes'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddField(
+            model_name='card',
+            name='search_text',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(set_search_fields, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='card',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='card_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('search_text'), name='gin_trgm_ops'), name='card_search_text_trgm_idx'),
+        ),
+    ]
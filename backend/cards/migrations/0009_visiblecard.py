@@ -0,0 +1,63 @@
+# Generated by Django 4.1.5 on 2026-10-19 03:27
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_visible_cards(apps, schema_editor):
+    Card = apps.get_model("cards", "Card")
+    Category = apps.get_model("cards", "Category")
+    VisibleCard = apps.get_model("cards", "VisibleCard")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    sub_categories = defaultdict(list)
+    for category_id, parent_id in Category.objects.values_list("id",
+                                                               "parent_id"):
+        sub_categories[parent_id].append(category_id)
+
+    def get_tree(category_id):
+        tree = []
+        categories = [category_id]
+        while categories:
+            category = categories.pop()
+            tree.append(category)
+            categories.extend(sub_categories[category])
+        return tree
+
+    uncategorized_ids = set(Card.objects.filter(categories__isnull=True)
+                            .values_list("id", flat=True))
+    for user in User.objects.all():
+        category_ids = [tree_category for category in
+                        user.selected_categories.values_list("id", flat=True)
+                        for tree_category in get_tree(category)]
+        card_ids = uncategorized_ids | set(
+            Card.objects.filter(categories__in=category_ids)
+            .values_list("id", flat=True))
+        VisibleCard.objects.bulk_create(
+            (VisibleCard(user=user, card_id=card_id) for card_id in card_ids),
+            batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cards', '0008_card_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisibleCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cards.card')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'card')},
+            },
+        ),
+        migrations.RunPython(fill_visible_cards, migrations.RunPython.noop),
+    ]
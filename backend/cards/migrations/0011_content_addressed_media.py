@@ -0,0 +1,24 @@
+# Generated by Django 4.1.5 on 2026-10-19 03:47
+
+import cards.utils.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0010_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='image',
+            field=models.ImageField(storage=cards.utils.storage.ContentAddressedStorage(), upload_to='images/'),
+        ),
+        migrations.AlterField(
+            model_name='sound',
+            name='sound_file',
+            field=models.FileField(storage=cards.utils.storage.ContentAddressedStorage(), upload_to='sounds/'),
+        ),
+    ]
@@ -1,16 +1,26 @@
 import datetime
 import uuid
+from collections import defaultdict
 from datetime import date
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.db.models import CheckConstraint, Q, F
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import CheckConstraint, Q, F, Exists, OuterRef
+from django.db.models.functions import Upper
+from django.db.models.signals import m2m_changed, post_delete, \
+    post_save, pre_delete
 from treebeard.al_tree import AL_Node
 from django.db.utils import IntegrityError
 from django.urls import reverse
+from django.utils import timezone
 from .apps import CardsConfig
 from .utils.exceptions import CardReviewDataExists, ReviewBeforeDue, \
     CardsDistributionRangeExceeded
-from .utils.helpers import today, validate_grade
+from .utils.helpers import today, validate_grade, get_search_text, \
+    get_search_vector
+from .utils import image_derivatives
+from .utils.storage import content_addressed_storage
 from .utils.supermemo2 import SM2
 from wsra.settings import ENVIRONMENT
 
@@ -33,6 +43,13 @@ class CardTemplate(models.Model):
     description = models.TextField()
     body = models.TextField()
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding:
+            # the body is a part of the cards' search text
+            Card.update_search_fields(self.cards.select_related("template"))
+
     def __str__(self):
         return f"<{self.title}>"
 
@@ -51,8 +68,10 @@ class CardUserData(models.Model):
 
     card = models.ForeignKey("Card", on_delete=models.CASCADE,
                              null=False)
+    # no single-column index: all the composite indexes
+    # (see Meta.indexes) begin with the user
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE,
-                             null=False)
+                             null=False, db_index=False)
     computed_interval = models.IntegerField(default=0)
     current_real_interval = property(fget=get_real_interval)
     lapses = models.IntegerField(default=0)
@@ -108,16 +127,13 @@ class CardUserData(models.Model):
         """
         # this method is executed in API tests only
         cls.check_distribution_days_range(days_range)
-        selected_categories = user.get_user_categories_trees()
+        user_cards = cls._get_user_categorized_cards(user)
         dates = [date.today() + datetime.timedelta(days=days)
                  for days in range(1, days_range + 1)]
 
         return {
-            str(review_date): cls.objects.filter(
-                user=user,
-                review_date=review_date,
-                card__categories__in=selected_categories
-            ).distinct().count()
+            str(review_date): user_cards.filter(
+                review_date=review_date).count()
             for review_date in dates
         }
 
@@ -125,21 +141,35 @@ class CardUserData(models.Model):
     def get_cards_memorization_distribution(cls, user, days_range=3):
         # this method is executed in API tests only
         cls.check_distribution_days_range(days_range)
-        selected_categories = user.get_user_categories_trees()
+        user_cards = cls._get_user_categorized_cards(user)
         dates = [date.today() - datetime.timedelta(days=days)
                  for days in range(days_range)]
 
+        def day_start(day):
+            return timezone.make_aware(
+                datetime.datetime.combine(day, datetime.time.min))
+
+        # a range (instead of __day/__month/__year lookups) can be
+        # resolved by the (user, introduced_on) index
         return {
-            str(introduction_date): cls.objects.filter(
-                user=user,
-                introduced_on__day=introduction_date.day,
-                introduced_on__month=introduction_date.month,
-                introduced_on__year=introduction_date.year,
-                card__categories__in=selected_categories
-            ).distinct().count()
+            str(introduction_date): user_cards.filter(
+                introduced_on__gte=day_start(introduction_date),
+                introduced_on__lt=day_start(
+                    introduction_date + datetime.timedelta(days=1))
+            ).count()
             for introduction_date in dates
         }
 
+    @classmethod
+    def _get_user_categorized_cards(cls, user):
+        """Returns review data of cards visible to the user, excluding
+        cards without categories.
+        """
+        categorized = Card.categories.through.objects.filter(
+            card=OuterRef("card"))
+        return cls.objects.filter(VisibleCard.is_visible(user, "card"),
+                                  Exists(categorized), user=user)
+
     @classmethod
     def check_distribution_days_range(cls, days_range):
         if days_range > cls.MAX_DISTRIBUTION_RANGE:
@@ -230,6 +260,29 @@ class CardUserData(models.Model):
 
     class Meta:
         unique_together = ("card", "user",)
+        indexes = [
+            # (user, card) ordering serves the queued cards anti-join
+            # (unique_together above is indexed in (card, user) order)
+            models.Index(fields=["user", "card"],
+                         name="carduserdata_user_card_idx"),
+            # outstanding cards, reviews distribution, scheduling reviews
+            models.Index(fields=["user", "review_date"],
+                         name="carduserdata_user_review_idx"),
+            # memorized/outstanding cards ordering (and keyset pagination),
+            # memorization distribution
+            models.Index(fields=["user", "introduced_on", "id"],
+                         name="carduserdata_user_intro_idx"),
+            # cram queue - only a small part of the cards is crammed
+            models.Index(fields=["user", "introduced_on"],
+                         condition=Q(crammed=True),
+                         name="carduserdata_user_crammed_idx"),
+            # grades distribution, retention score
+            models.Index(fields=["user", "grade"],
+                         name="carduserdata_user_grade_idx"),
+            # e-factor distribution
+            models.Index(fields=["user", "easiness_factor"],
+                         name="carduserdata_user_ef_idx"),
+        ]
 
     def __str__(self):
         return f"CardUserData(user='{str(self.user)}' " \
@@ -264,9 +317,25 @@ class Card(models.Model):
                                    null=True,
                                    blank=True,
                                    related_name="cards_back")
+    # front, back and template body without markup - set on save()
+    search_text = models.TextField(default="", editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         unique_together = ("front", "back",)
+        indexes = [
+            # lets ordered card lists (and the queued cards anti-join)
+            # stop after the first page instead of sorting whole table
+            models.Index(fields=["created_on", "id"],
+                         name="card_created_on_id_idx"),
+            # full-text search
+            GinIndex(fields=["search_vector"],
+                     name="card_search_vector_idx"),
+            # searching for partial words: icontains lookups
+            # compare UPPER(search_text)
+            GinIndex(OpClass(Upper("search_text"), name="gin_trgm_ops"),
+                     name="card_search_text_trgm_idx"),
+        ]
 
     @staticmethod
     def _make_images_getter(side: str):
@@ -289,6 +358,54 @@ class Card(models.Model):
     front_images = property(fget=_make_images_getter("front"))
     back_images = property(fget=_make_images_getter("back"))
 
+    def set_search_fields(self):
+        """Sets search_text and search_vector (as an expression evaluated
+        by the database on saving) from the card's front, back and template.
+        """
+        template_body = self.template.body if self.template else ""
+        front, back, template_text = (get_search_text(text) for text in
+                                      (self.front, self.back, template_body))
+        self.search_text = "\n".join(
+            text for text in (front, back, template_text) if text)
+        self.search_vector = get_search_vector(front, back, template_text)
+
+    @classmethod
+    def update_search_fields(cls, cards, batch_size=1000):
+        """Recomputes search fields of the cards from the queryset
+        (e.g. after their template has changed).
+        """
+        fields = ["search_text", "search_vector"]
+        batch = []
+        for card in cards.iterator(chunk_size=batch_size):
+            card.set_search_fields()
+            batch.append(card)
+            if len(batch) == batch_size:
+                cls.objects.bulk_update(batch, fields)
+                batch = []
+        if batch:
+            cls.objects.bulk_update(batch, fields)
+
+    def save(self, *args, **kwargs):
+        self.set_search_fields()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"],
+                                       "search_text", "search_vector"}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def get_queued_cards(cls, user):
+        """Returns cards that are neither memorized nor ignored by the user.
+        Both conditions are NOT EXISTS anti-joins (rather than NOT IN
+        subqueries generated by exclude()), so the query can use
+        the (user, card) indexes.
+        """
+        ignored_cards = get_user_model().ignored_cards.through
+        memorized = CardUserData.objects.filter(user=user,
+                                                card=OuterRef("pk"))
+        ignored = ignored_cards.objects.filter(user=user,
+                                               card=OuterRef("pk"))
+        return cls.objects.filter(~Exists(memorized), ~Exists(ignored))
+
     def memorize(self, user, grade: int = 4) -> CardUserData:
         """Generate initial review data for a particular user and (this) card
         and put it into CardUserData.
@@ -368,6 +485,162 @@ class Card(models.Model):
         return serialized
 
 
+class VisibleCard(models.Model):
+    """Cards visible to the user: cards from trees of the categories
+    selected by the user and cards without categories.
+
+    The table is maintained when the user's selected categories, cards'
+    categories or the categories tree change (see the signal handlers
+    below), so lists of cards are filtered with a single indexed table
+    instead of expanding the category trees on each request.
+    """
+    # no single-column index: the unique (user, card) index begins
+    # with the user
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE,
+                             db_index=False)
+    card = models.ForeignKey(Card, on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ("user", "card",)
+
+    batch_size = 1000
+
+    @classmethod
+    def is_visible(cls, user, card_field="pk") -> Exists:
+        """Returns condition for filtering cards (or - with card_field,
+        e.g. "card" - objects related to cards) visible to the user.
+        """
+        return Exists(cls.objects.filter(user=user,
+                                         card=OuterRef(card_field)))
+
+    @staticmethod
+    def compute_visible_cards(user):
+        """Returns queryset of cards visible to the user computed from
+        the user's selected categories.
+        """
+        user_categories = user.get_user_categories_trees()
+        return Card.objects.filter(
+            Q(categories__in=user_categories) |
+            Q(categories__isnull=True)).distinct()
+
+    @classmethod
+    def rebuild(cls, user):
+        """Updates cards visible to the user - only the differences
+        are written.
+        """
+        visible_ids = set(cls.compute_visible_cards(user)
+                          .values_list("id", flat=True))
+        stored_ids = set(cls.objects.filter(user=user)
+                         .values_list("card_id", flat=True))
+        cls._delete_in_batches(user=user, card_ids=stored_ids - visible_ids)
+        cls.objects.bulk_create(
+            (cls(user=user, card_id=card_id)
+             for card_id in visible_ids - stored_ids),
+            batch_size=cls.batch_size, ignore_conflicts=True)
+
+    @classmethod
+    def rebuild_all(cls):
+        for user in get_user_model().objects.all():
+            cls.rebuild(user)
+
+    @classmethod
+    def update_cards(cls, card_ids, users=None):
+        """Updates users the cards are visible to (e.g. after
+        the cards' categories have changed) - only of the users (queryset),
+        if given. The number of queries doesn't depend on the number of
+        cards, and rows of categorized cards are read only for users who
+        selected one of their categories (or the categories' ancestors).
+        """
+        if users is None:
+            users = get_user_model().objects.all()
+        card_ids = set(card_ids)
+        if not card_ids:
+            return
+        card_categories = defaultdict(set)
+        for card_id, category_id in Card.categories.through.objects.filter(
+                card_id__in=card_ids).values_list("card_id", "category_id"):
+            card_categories[card_id].add(category_id)
+        # category: the category and its ancestors
+        parents = Category.get_parents(set().union(*card_categories.values()))
+        trees = {}
+        for category_id in set().union(*card_categories.values()):
+            tree = trees[category_id] = set()
+            ancestor_id = category_id
+            while ancestor_id is not None:
+                tree.add(ancestor_id)
+                ancestor_id = parents[ancestor_id]
+        tree_category_ids = set().union(*trees.values())
+        category_users = defaultdict(set)
+        for user_id, category_id in users.filter(
+                selected_categories__in=tree_category_ids) \
+                .values_list("id", "selected_categories"):
+            category_users[category_id].add(user_id)
+        # (user id, card id) of categorized cards visible to users
+        visible = set()
+        for card_id, category_ids in card_categories.items():
+            visible.update((user_id, card_id) for user_id in set().union(*(
+                category_users[tree_category_id]
+                for category_id in category_ids
+                for tree_category_id in trees[category_id])))
+        categorized_cards = cls.objects.filter(
+            card_id__in=card_categories.keys(), user__in=users)
+        # users who selected none of the categories see none of the cards
+        categorized_cards.exclude(
+            user__selected_categories__in=tree_category_ids).delete()
+        stored = {(user_id, card_id): visible_card_id
+                  for visible_card_id, user_id, card_id
+                  in categorized_cards.filter(
+                      user_id__in=set().union(*category_users.values()))
+                  .values_list("id", "user_id", "card_id")}
+        outdated_ids = [visible_card_id for key, visible_card_id
+                        in stored.items() if key not in visible]
+        for start in range(0, len(outdated_ids), cls.batch_size):
+            cls.objects.filter(
+                id__in=outdated_ids[start:start + cls.batch_size]).delete()
+        new_visible = visible - stored.keys()
+        uncategorized_ids = card_ids - card_categories.keys()
+        if uncategorized_ids:
+            # cards without categories are visible to every user
+            new_visible.update(
+                (user_id, card_id)
+                for user_id in users.values_list("id", flat=True)
+                for card_id in uncategorized_ids)
+        cls.objects.bulk_create(
+            (cls(user_id=user_id, card_id=card_id)
+             for user_id, card_id in new_visible),
+            batch_size=cls.batch_size, ignore_conflicts=True)
+
+    @classmethod
+    def add_new_cards(cls, card_ids, categories=()):
+        """Makes new cards - all in the same categories - visible to
+        the users (e.g. cards created with bulk operations).
+        """
+        users = get_user_model().objects.all()
+        if categories:
+            selected_categories = {
+                tree_category for category in categories
+                for tree_category in (category, *category.get_ancestors())}
+            users = users.filter(
+                selected_categories__in=selected_categories).distinct()
+        user_ids = list(users.values_list("id", flat=True))
+        cls.objects.bulk_create(
+            (cls(user_id=user_id, card_id=card_id)
+             for user_id in user_ids for card_id in card_ids),
+            batch_size=cls.batch_size, ignore_conflicts=True)
+
+    @classmethod
+    def _delete_in_batches(cls, user, card_ids):
+        card_ids = list(card_ids)
+        for start in range(0, len(card_ids), cls.batch_size):
+            cls.objects.filter(
+                user=user,
+                card_id__in=card_ids[start:start + cls.batch_size]).delete()
+
+    def __str__(self):
+        return f"VisibleCard(user='{str(self.user)}' " \
+               f"card='{str(self.card)}')"
+
+
 class Category(AL_Node):
     id = models.UUIDField(
         primary_key=True,
@@ -388,6 +661,44 @@ class Category(AL_Node):
     class Meta:
         unique_together = ("name", "parent")
 
+    def save(self, *args, **kwargs):
+        former = None if self._state.adding else Category.objects.filter(
+            pk=self.pk).exclude(parent_id=self.parent_id).first()
+        # ancestors before moving the category
+        former_ancestors = [former.parent, *former.parent.get_ancestors()] \
+            if former is not None and former.parent is not None else []
+        super().save(*args, **kwargs)
+        if former is not None:
+            self._update_visible_cards(former_ancestors)
+
+    def _update_visible_cards(self, former_ancestors):
+        """Updates visibility of cards in the moved category's tree to
+        users who selected a category of the tree or its former or new
+        ancestors (selected trees of other users haven't changed).
+        """
+        tree = Category.get_tree(self)
+        users = get_user_model().objects.filter(
+            selected_categories__in=[*tree, *former_ancestors,
+                                     *self.get_ancestors()]).distinct()
+        VisibleCard.update_cards(
+            Card.objects.filter(categories__in=tree)
+            .values_list("id", flat=True).distinct(),
+            users=users)
+
+    @classmethod
+    def get_parents(cls, category_ids) -> dict:
+        """Returns {category id: parent id} of the categories and their
+        ancestors - read level by level, not the whole table.
+        """
+        parents = {}
+        category_ids = set(category_ids)
+        while category_ids:
+            level = dict(cls.objects.filter(id__in=category_ids)
+                         .values_list("id", "parent_id"))
+            parents.update(level)
+            category_ids = set(filter(None, level.values())) - parents.keys()
+        return parents
+
     def __str__(self):
         return f"<{self.name}>"
 
@@ -398,13 +709,42 @@ class Image(models.Model):
         default=uuid.uuid4,
         editable=False,
     )
-    image = models.ImageField(upload_to="images/")
+    image = models.ImageField(upload_to="images/",
+                              storage=content_addressed_storage)
     description = models.CharField(max_length=1000)
     cards = models.ManyToManyField("Card", through="CardImage")
+    # resized variants of the image - generated in the background after
+    # saving (see cards.utils.image_derivatives), the original image
+    # being the first: [{"name": ..., "width": ..., "format": ...}]
+    derivatives = models.JSONField(default=list, blank=True, editable=False)
 
     def __str__(self):
         return str(self.image)
 
+    @property
+    def derivatives_outdated(self) -> bool:
+        return not self.derivatives \
+            or self.derivatives[0]["name"] != self.image.name
+
+    def _get_srcset(self, webp: bool) -> str:
+        if self.derivatives_outdated:
+            return ""
+        storage = self.image.storage
+        return ", ".join(
+            f"{storage.url(derivative['name'])} {derivative['width']}w"
+            for derivative in self.derivatives
+            if (derivative["format"] == image_derivatives.webp) == webp)
+
+    @property
+    def srcset(self) -> str:
+        """srcset of variants in the original format.
+        """
+        return self._get_srcset(webp=False)
+
+    @property
+    def webp_srcset(self) -> str:
+        return self._get_srcset(webp=True)
+
 
 class CardImage(models.Model):
     card = models.ForeignKey(Card, on_delete=models.CASCADE)
@@ -429,8 +769,70 @@ class Sound(models.Model):
         default=uuid.uuid4,
         editable=False,
     )
-    sound_file = models.FileField(upload_to="sounds/")
+    sound_file = models.FileField(upload_to="sounds/",
+                                  storage=content_addressed_storage)
     description = models.CharField(max_length=1000)
 
     def __str__(self):
         return str(self.sound_file)
+
+
+def update_visible_new_card(sender, instance, created, **kwargs):
+    """A new card has no categories - it is visible to every user.
+    """
+    if created:
+        VisibleCard.add_new_cards([instance.pk])
+
+
+def update_visible_cards_categories(sender, instance, action, reverse,
+                                    pk_set, **kwargs):
+    """Updates visibility of cards when their categories change.
+    """
+    if reverse and action == "pre_clear":
+        instance._cleared_card_ids = list(
+            instance.cards.values_list("id", flat=True))
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        card_ids = [instance.pk]
+    elif action == "post_clear":
+        card_ids = instance._cleared_card_ids
+    else:
+        card_ids = pk_set
+    VisibleCard.update_cards(card_ids)
+
+
+def save_deleted_category_relations(sender, instance, **kwargs):
+    instance._deleted_card_ids = list(
+        instance.cards.values_list("id", flat=True))
+    instance._deleted_user_ids = list(
+        instance.category_users.values_list("id", flat=True))
+
+
+def update_visible_cards_deleted_category(sender, instance, **kwargs):
+    """Relations of a deleted category are removed without
+    the m2m_changed signal.
+    """
+    for user in get_user_model().objects.filter(
+            id__in=instance._deleted_user_ids):
+        VisibleCard.rebuild(user)
+    VisibleCard.update_cards(instance._deleted_card_ids)
+
+
+def generate_image_derivatives(sender, instance, **kwargs):
+    """Schedules generation of derivatives of a new or changed image
+    (after the transaction commits, so that it is visible to other
+    threads).
+    """
+    if instance.derivatives_outdated:
+        transaction.on_commit(
+            lambda: image_derivatives.schedule_image_derivatives(
+                instance.pk))
+
+
+post_save.connect(update_visible_new_card, sender=Card)
+post_save.connect(generate_image_derivatives, sender=Image)
+m2m_changed.connect(update_visible_cards_categories,
+                    sender=Card.categories.through)
+pre_delete.connect(save_deleted_category_relations, sender=Category)
+post_delete.connect(update_visible_cards_deleted_category, sender=Category)
@@ -7,22 +7,48 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
 from django.db.models.deletion import ProtectedError
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+import PIL.Image
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
+from django.utils.http import http_date
 from .models import (Card, CardTemplate, Category, CardUserData,
-                     Image, CardImage, Sound)
+                     Image, CardImage, Sound, VisibleCard)
 from faker import Faker
 from django.core.files.uploadedfile import SimpleUploadedFile
+from .utils.storage import content_addressed_storage, \
+    is_content_addressed
 from .utils.exceptions import CardReviewDataExists, ReviewBeforeDue
-from .utils.helpers import today
+from .utils.helpers import hash_file_sha256, today
 import datetime
 
 fake = Faker()
 
 
 class HelpersMixin:
-    @staticmethod
-    def get_image_instance():
+    media_root = None
+
+    def use_temporary_media_root(self) -> str:
+        """Stores media files saved by the test in a temporary MEDIA_ROOT
+        (removed after the test), instead of the project's media directory.
+        """
+        if self.media_root is None:
+            self.media_root = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, self.media_root)
+            media_root_setting = override_settings(MEDIA_ROOT=self.media_root)
+            media_root_setting.enable()
+            self.addCleanup(media_root_setting.disable)
+            self.addCleanup(setattr, self, "media_root", None)
+        return self.media_root
+
+    def get_image_instance(self):
+        self.use_temporary_media_root()
         small_gif = (
             b'\x47\x49\x46\x38\x39\x61\x01\x00\x01'
             b'\x00\x00\x00\x00\x21\xf9\x04'
@@ -64,8 +90,8 @@ class HelpersMixin:
             cards.append(card)
         return cards
 
-    @staticmethod
-    def add_soundfile_to_database():
+    def add_soundfile_to_database(self):
+        self.use_temporary_media_root()
         placeholder_audio = (
             b'MM\x00*\x00\x00\x00\x08\x00\x03\x01\x00\x00'
             b'\x03\x00\x00\x00\x01\x00\x01\x00\x00\x01'
@@ -84,6 +110,15 @@ class HelpersMixin:
         return database_audio_entry, file_name
 
 
+class TemporaryMediaRootMixin(HelpersMixin):
+    """Stores all media files of the test in a temporary MEDIA_ROOT.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.use_temporary_media_root()
+
+
 class FakeUsersCards(TestCase):
     user_model = get_user_model()
 
@@ -295,6 +330,49 @@ class TemplateCardRelationshipTests(TemplateModelTests, CardModelTests):
             lambda: CardTemplate.objects.get(title=self.template_title))
 
 
+class CardSearchFieldsTests(TestCase):
+    def setUp(self):
+        self.template = CardTemplate.objects.create(
+            title="search template",
+            description="search template's description",
+            body="{% block content %}<p>{{ card.front|safe }}</p>"
+                 "<p>Template&apos;s text</p>{% endblock content %}")
+        self.card = Card.objects.create(
+            front="<p>Question <b>text</b></p>",
+            back="<div class=\"answer\">Answer&nbsp;text</div>",
+            template=self.template)
+
+    def test_search_text_without_markup(self):
+        self.card.refresh_from_db()
+
+        self.assertEqual(self.card.search_text,
+                         "Question text\nAnswer text\nTemplate's text")
+
+    def test_search_vector_weights(self):
+        self.card.refresh_from_db()
+
+        self.assertIn("'question':1A", self.card.search_vector)
+        self.assertIn("'answer':3B", self.card.search_vector)
+        self.assertIn("'templat':5C", self.card.search_vector)
+
+    def test_search_fields_saved_with_update_fields(self):
+        self.card.front = "Changed question"
+        self.card.save(update_fields=["front"])
+        self.card.refresh_from_db()
+
+        self.assertTrue(self.card.search_text.startswith(
+            "Changed question\n"))
+
+    def test_template_change_updates_cards(self):
+        self.template.body = "<p>Changed template</p>"
+        self.template.save()
+        self.card.refresh_from_db()
+
+        self.assertEqual(self.card.search_text,
+                         "Question text\nAnswer text\nChanged template")
+        self.assertIn("'chang':5C", self.card.search_vector)
+
+
 class CategoryTests(TestCase):
     def setUp(self):
         CATEGORY_NAME_LEN = 20
@@ -420,6 +498,133 @@ class CategoryJoinsTests(TestCase):
                          user.username)
 
 
+class VisibleCardsTests(TestCase, HelpersMixin):
+    def setUp(self):
+        self.parent_category = self.create_category("parent category")
+        self.sub_category = Category.objects.create(
+            name="sub category", parent=self.parent_category)
+        self.other_category = self.create_category("other category")
+        self.user, self.other_user = self.make_fake_users(2)
+        self.user.selected_categories.set([self.parent_category])
+        self.other_user.selected_categories.set([self.other_category])
+        self.card, self.uncategorized_card = self.make_fake_cards(2)
+        self.card.categories.add(self.sub_category)
+
+    @staticmethod
+    def get_visible_cards(user):
+        return set(Card.objects.filter(VisibleCard.is_visible(user)))
+
+    def assertVisibleCardsComputed(self):
+        for user in (self.user, self.other_user):
+            self.assertEqual(self.get_visible_cards(user),
+                             set(VisibleCard.compute_visible_cards(user)))
+
+    def test_card_categories(self):
+        self.assertEqual(self.get_visible_cards(self.user),
+                         {self.card, self.uncategorized_card})
+        self.assertEqual(self.get_visible_cards(self.other_user),
+                         {self.uncategorized_card})
+
+    def test_new_user(self):
+        user = self.make_fake_users(1)[0]
+
+        self.assertEqual(self.get_visible_cards(user),
+                         set(VisibleCard.compute_visible_cards(user)))
+
+    def test_selected_categories_changed(self):
+        self.user.selected_categories.set([self.other_category])
+        self.other_user.selected_categories.add(self.sub_category)
+
+        self.assertEqual(self.get_visible_cards(self.user),
+                         {self.uncategorized_card})
+        self.assertEqual(self.get_visible_cards(self.other_user),
+                         {self.card, self.uncategorized_card})
+
+    def test_category_users_changed(self):
+        self.sub_category.category_users.add(self.other_user)
+        self.assertVisibleCardsComputed()
+        self.parent_category.category_users.clear()
+        self.assertVisibleCardsComputed()
+
+    def test_category_users_cleared(self):
+        """Only users who selected the category are rebuilt.
+        """
+        with mock.patch.object(VisibleCard, "rebuild",
+                               wraps=VisibleCard.rebuild) as rebuild:
+            self.parent_category.category_users.clear()
+
+        self.assertEqual([call.args for call in rebuild.call_args_list],
+                         [(self.user,)])
+        self.assertVisibleCardsComputed()
+
+    def test_cards_categories_changed(self):
+        self.uncategorized_card.categories.add(self.other_category)
+        self.assertVisibleCardsComputed()
+        self.card.categories.remove(self.sub_category)
+        self.assertVisibleCardsComputed()
+        self.other_category.cards.clear()
+        self.assertVisibleCardsComputed()
+        self.sub_category.cards.add(self.card, self.uncategorized_card)
+        self.assertVisibleCardsComputed()
+
+    def test_new_card(self):
+        """A new card is added for every user without reading categories.
+        """
+        with mock.patch.object(VisibleCard, "update_cards") as update_cards:
+            card = self.make_fake_cards(1)[0]
+
+        update_cards.assert_not_called()
+        self.assertIn(card, self.get_visible_cards(self.user))
+        self.assertIn(card, self.get_visible_cards(self.other_user))
+
+    def test_card_categorized(self):
+        """Only parents of the card's categories are read.
+        """
+        with mock.patch.object(Category, "get_parents",
+                               wraps=Category.get_parents) as get_parents:
+            self.uncategorized_card.categories.add(self.sub_category)
+
+        get_parents.assert_called_once_with({self.sub_category.id})
+        self.assertEqual(
+            Category.get_parents({self.sub_category.id}),
+            {self.sub_category.id: self.parent_category.id,
+             self.parent_category.id: None})
+        self.assertVisibleCardsComputed()
+
+    def test_category_moved(self):
+        self.sub_category.move(self.other_category, "sorted-child")
+
+        self.assertEqual(self.get_visible_cards(self.user),
+                         {self.uncategorized_card})
+        self.assertEqual(self.get_visible_cards(self.other_user),
+                         {self.card, self.uncategorized_card})
+
+    def test_category_moved_incrementally(self):
+        """Only cards of the moved tree are updated - no user is rebuilt.
+        """
+        sub_sub_category = Category.objects.create(
+            name="sub sub category", parent=self.sub_category)
+        self.uncategorized_card.categories.add(sub_sub_category)
+        with mock.patch.object(VisibleCard, "rebuild") as rebuild:
+            self.sub_category.move(self.other_category, "sorted-child")
+            self.assertVisibleCardsComputed()
+            sub_sub_category.parent = None
+            sub_sub_category.save()
+            self.assertVisibleCardsComputed()
+
+        rebuild.assert_not_called()
+
+    def test_category_deleted(self):
+        self.card.categories.set([self.other_category, self.sub_category])
+        self.other_category.delete()
+        self.assertVisibleCardsComputed()
+        self.card.categories.clear()
+        self.sub_category.delete()
+
+        self.assertVisibleCardsComputed()
+        self.assertIn(self.card, self.get_visible_cards(self.other_user))
+
+
 class CramQueueTests(TestCase, HelpersMixin):
     def setUp(self):
         self.card_1, self.card_2, self.card_3 = self.make_fake_cards(3)
@@ -1134,10 +1339,12 @@ class SoundFiles(HelpersMixin, TestCase):
          self.audio_filename) = self.add_soundfile_to_database()
 
     def test_adding_audio_to_database(self):
-        filename_no_extension = self.audio_filename.split(".")[0]
+        # files are stored under their contents hash
+        with self.sound.sound_file.open("rb") as sound_file:
+            content_hash = hash_file_sha256(sound_file)
         file_retrieved_from_db = Sound.objects.filter(
-            sound_file__contains=filename_no_extension).first()
-        self.assertTrue(file_retrieved_from_db)
+            sound_file=f"sounds/{content_hash}.mp3").first()
+        self.assertEqual(file_retrieved_from_db, self.sound)
 
 
 class SoundsInCards(HelpersMixin, TestCase):
@@ -1252,3 +1459,318 @@ class ImageTests(HelpersMixin, TestCase):
 
     def test_image_embedding_in_templates(self):
         pass
+
+
+class MediaFilesServing(TemporaryMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.sound, _ = self.add_soundfile_to_database()
+        self.url = self.sound.sound_file.url
+        with self.sound.sound_file.open("rb") as sound_file:
+            self.content = sound_file.read()
+
+    def get(self, **headers):
+        return self.client.get(self.url, **{
+            "HTTP_" + header.upper(): value
+            for header, value in headers.items()})
+
+    @staticmethod
+    def get_content(response):
+        return b"".join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_content(response), self.content)
+        self.assertEqual(response.headers["Content-Type"], "audio/mpeg")
+        self.assertEqual(response.headers["Accept-Ranges"], "bytes")
+        self.assertIn("ETag", response.headers)
+        self.assertIn("Last-Modified", response.headers)
+        self.assertIn("max-age", response.headers["Cache-Control"])
+
+    def test_byte_range(self):
+        response = self.get(Range="bytes=2-9")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.get_content(response), self.content[2:10])
+        self.assertEqual(response.headers["Content-Length"], "8")
+        self.assertEqual(response.headers["Content-Range"],
+                         f"bytes 2-9/{len(self.content)}")
+
+    def test_open_and_suffix_byte_ranges(self):
+        open_range = self.get(Range="bytes=10-")
+        suffix_range = self.get(Range="bytes=-4")
+
+        self.assertEqual(self.get_content(open_range), self.content[10:])
+        self.assertEqual(self.get_content(suffix_range), self.content[-4:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range=f"bytes={len(self.content)}-")
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers["Content-Range"],
+                         f"bytes */{len(self.content)}")
+
+    def test_multiple_ranges_ignored(self):
+        response = self.get(Range="bytes=0-1,4-5")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_content(response), self.content)
+
+    def test_if_range_not_matching(self):
+        response = self.get(Range="bytes=2-9", If_Range='"outdated"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_content(response), self.content)
+
+    def test_if_none_match(self):
+        etag = self.get().headers["ETag"]
+        response = self.get(If_None_Match=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+
+    def test_if_modified_since(self):
+        last_modified = self.get().headers["Last-Modified"]
+        not_modified = self.get(If_Modified_Since=last_modified)
+        modified = self.get(If_Modified_Since=http_date(0))
+
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(modified.status_code, 200)
+
+    @override_settings(MEDIA_SENDFILE_HEADER="X-Accel-Redirect",
+                       MEDIA_ACCEL_REDIRECT_PREFIX="/protected-media/")
+    def test_x_accel_redirect(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Accel-Redirect"],
+                         "/protected-media/" + self.sound.sound_file.name)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["Content-Type"], "audio/mpeg")
+
+    @override_settings(MEDIA_SENDFILE_HEADER="X-Sendfile")
+    def test_x_sendfile(self):
+        response = self.get()
+
+        self.assertEqual(response.headers["X-Sendfile"],
+                         self.sound.sound_file.path)
+        self.assertEqual(response.content, b"")
+
+    def test_missing_file_and_path_outside_media_root(self):
+        self.assertEqual(self.client.get("/media/sounds/missing.mp3")
+                         .status_code, 404)
+        self.assertEqual(self.client.get("/media/../manage.py")
+                         .status_code, 404)
+
+    def test_unsafe_method(self):
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+
+@override_settings(IMAGE_DERIVATIVE_WIDTHS=[320, 640, 1280],
+                   IMAGE_DERIVATIVE_WORKERS=0)
+class ImageDerivatives(TemporaryMediaRootMixin, TestCase):
+    @staticmethod
+    def make_png(width, height):
+        content = BytesIO()
+        PIL.Image.new("RGB", (width, height), "orange").save(content, "PNG")
+        return SimpleUploadedFile(name=fake.file_name(extension="png"),
+                                  content=content.getvalue(),
+                                  content_type="image/png")
+
+    def save_image(self, width=800, height=400):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(image=self.make_png(width, height),
+                                         description=fake.text(20))
+        image.refresh_from_db()
+        return image
+
+    def test_derivatives_generated(self):
+        image = self.save_image()
+        derivatives = [(derivative["width"], derivative["format"])
+                       for derivative in image.derivatives]
+
+        self.assertEqual(derivatives, [(800, None),
+                                       (320, "PNG"), (320, "WEBP"),
+                                       (640, "PNG"), (640, "WEBP"),
+                                       (800, "WEBP")])
+        self.assertEqual(image.derivatives[0]["name"], image.image.name)
+        for derivative in image.derivatives[1:]:
+            with image.image.storage.open(derivative["name"]) as file, \
+                    PIL.Image.open(file) as derivative_image:
+                self.assertEqual(derivative_image.size,
+                                 (derivative["width"],
+                                  derivative["width"] // 2))
+                self.assertEqual(derivative_image.format,
+                                 derivative["format"])
+
+    def test_image_narrower_than_widths(self):
+        image = self.save_image(200, 100)
+
+        self.assertEqual([(derivative["width"], derivative["format"])
+                          for derivative in image.derivatives],
+                         [(200, None), (200, "WEBP")])
+
+    def test_srcset(self):
+        image = self.save_image()
+        url = image.image.storage.url
+
+        self.assertEqual(image.srcset,
+                         f"{image.image.url} 800w, "
+                         f"{url(image.derivatives[1]['name'])} 320w, "
+                         f"{url(image.derivatives[3]['name'])} 640w")
+        self.assertEqual(image.webp_srcset,
+                         f"{url(image.derivatives[2]['name'])} 320w, "
+                         f"{url(image.derivatives[4]['name'])} 640w, "
+                         f"{url(image.derivatives[5]['name'])} 800w")
+
+    def test_no_srcset_for_outdated_derivatives(self):
+        image = self.save_image()
+        image.image = self.make_png(100, 100)
+
+        self.assertTrue(image.derivatives_outdated)
+        self.assertEqual(image.srcset, "")
+        self.assertEqual(image.webp_srcset, "")
+
+    def test_card_templates_srcset(self):
+        image = self.save_image()
+        card = self.make_fake_cards(1)[0]
+        CardImage.objects.create(card=card, image=image, side="front")
+        CardImage.objects.create(card=card, image=image, side="back")
+        for template in ("_card_question_image.html",
+                         "_card_answer_image.html"):
+            rendering = render_to_string(template, {"card": card})
+
+            self.assertIn(f'srcset="{image.srcset}"', rendering)
+            self.assertIn(f'srcset="{image.webp_srcset}"', rendering)
+            self.assertIn(f'src="{image.image.url}"', rendering)
+
+
+@override_settings(IMAGE_DERIVATIVE_WIDTHS=[320],
+                   IMAGE_DERIVATIVE_WORKERS=0)
+class ImageDerivativesBackfill(TemporaryMediaRootMixin, TransactionTestCase):
+    def test_command_generates_missing_derivatives(self):
+        for _ in range(3):
+            self.get_image_instance()
+        Image.objects.update(derivatives=[])
+        output = StringIO()
+        call_command("generate_image_derivatives", workers=2, stdout=output)
+
+        self.assertIn("Derivatives of 3 images", output.getvalue())
+        for image in Image.objects.all():
+            self.assertFalse(image.derivatives_outdated)
+
+
+class ContentAddressedMedia(TemporaryMediaRootMixin, TestCase):
+    def test_identical_files_shared(self):
+        sound_1, _ = self.add_soundfile_to_database()
+        sound_2, _ = self.add_soundfile_to_database()
+
+        self.assertEqual(sound_1.sound_file.name, sound_2.sound_file.name)
+        self.assertTrue(is_content_addressed(sound_1.sound_file.name))
+
+    def test_immutable_cache_headers(self):
+        sound, _ = self.add_soundfile_to_database()
+        response = self.client.get(sound.sound_file.url)
+        b"".join(response.streaming_content)
+
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        self.assertIn("max-age=31536000", response.headers["Cache-Control"])
+
+    def test_dedupe_media(self):
+        storage = content_addressed_storage
+        sounds = [self.add_soundfile_to_database()[0] for _ in range(2)]
+        content_name = sounds[0].sound_file.name
+        # files stored before content addressing
+        former_names = [storage.path(f"sounds/former-{number}.mp3")
+                        for number in range(2)]
+        for sound, former_name in zip(sounds, former_names):
+            shutil.copyfile(storage.path(content_name), former_name)
+            Sound.objects.filter(pk=sound.pk).update(
+                sound_file=os.path.relpath(former_name, storage.location))
+        image = self.get_image_instance()
+        image_name = image.image.name
+        former_image_name = "images/former.gif"
+        shutil.copyfile(storage.path(image_name),
+                        storage.path(former_image_name))
+        Image.objects.filter(pk=image.pk).update(
+            image=former_image_name,
+            derivatives=[{"name": former_image_name, "width": 1,
+                          "format": None}])
+        call_command("dedupe_media", stdout=StringIO())
+
+        self.assertEqual(
+            set(Sound.objects.values_list("sound_file", flat=True)),
+            {content_name})
+        image.refresh_from_db()
+        self.assertEqual(image.image.name, image_name)
+        self.assertFalse(image.derivatives_outdated)
+        for former_name in former_names:
+            self.assertFalse(os.path.exists(former_name))
+        self.assertFalse(storage.exists(former_image_name))
+
+
+class DeleteUnusedMedia(TemporaryMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.sound, _ = self.add_soundfile_to_database()
+        self.used_file = self.sound.sound_file.path
+        self.unused_files = [
+            self.make_file("sounds", "unused.mp3"),
+            self.make_file("other", "nested", "unused.txt")]
+
+    def make_file(self, *path):
+        file_path = os.path.join(self.media_root, *path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as file:
+            file.write(b"unused")
+        return file_path
+
+    def delete_unused_media(self, *args):
+        output = StringIO()
+        call_command("delete_unused_media", *args, "--workers=2",
+                     "--batch-size=1", stdout=output)
+        return output.getvalue()
+
+    def test_deleting_unused_files(self):
+        output = self.delete_unused_media()
+
+        self.assertTrue(os.path.exists(self.used_file))
+        for unused_file in self.unused_files:
+            self.assertFalse(os.path.exists(unused_file))
+        # directories left empty are deleted
+        self.assertFalse(os.path.exists(
+            os.path.join(self.media_root, "other")))
+        self.assertIn("2 of 3 files deleted", output)
+
+    def test_dry_run(self):
+        output = self.delete_unused_media("--dry-run")
+
+        for unused_file in self.unused_files:
+            self.assertTrue(os.path.exists(unused_file))
+            self.assertIn(os.path.relpath(unused_file, self.media_root),
+                          output)
+        self.assertIn("2 of 3 files would be deleted", output)
+
+    def test_older_than(self):
+        old_file, new_file = self.unused_files
+        two_days_ago = datetime.datetime.now().timestamp() - 2 * 24 * 3600
+        os.utime(old_file, (two_days_ago, two_days_ago))
+        self.delete_unused_media("--older-than=1")
+
+        self.assertFalse(os.path.exists(old_file))
+        self.assertTrue(os.path.exists(new_file))
+        self.assertTrue(os.path.exists(self.used_file))
+
+    def test_image_derivatives_kept(self):
+        image = self.get_image_instance()
+        derivative = self.make_file("images", "derivatives", "image.webp")
+        Image.objects.filter(pk=image.pk).update(derivatives=[
+            {"name": image.image.name, "width": 1, "format": None},
+            {"name": "images/derivatives/image.webp", "width": 1,
+             "format": "WEBP"}])
+        self.delete_unused_media()
+
+        self.assertTrue(os.path.exists(image.image.path))
+        self.assertTrue(os.path.exists(derivative))
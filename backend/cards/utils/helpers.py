@@ -1,16 +1,51 @@
 import hashlib
+import re
 from datetime import datetime
 from functools import reduce
+from html import unescape
+
+from django.contrib.postgres.search import SearchVector
+from django.db.models import Value
 
 from ..apps import CardsConfig
 
 encoding = CardsConfig.default_encoding
+search_config = CardsConfig.search_config
+
+# html tags and Django template tags, variables and comments
+markup_pattern = re.compile(r"<[^>]*>|{%.*?%}|{{.*?}}|{#.*?#}", re.DOTALL)
 
 
 def hash_sha256(string_for_hashing):
     return hashlib.sha256(bytes(string_for_hashing, encoding)).hexdigest()
 
 
+def hash_file_sha256(file):
+    """Hashes contents of the (Django) File, reading it in chunks.
+    """
+    file_hash = hashlib.sha256()
+    for chunk in file.chunks():
+        file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_search_text(text: str) -> str:
+    """Returns text content of the card's side or template body - without
+    markup and with collapsed whitespace.
+    """
+    return " ".join(unescape(markup_pattern.sub(" ", text)).split())
+
+
+def get_search_vector(front: str, back: str, template_body: str):
+    """Returns weighted (front, back, template) search vector expression
+    for texts returned by get_search_text().
+    """
+    return (SearchVector(Value(front), weight="A", config=search_config)
+            + SearchVector(Value(back), weight="B", config=search_config)
+            + SearchVector(Value(template_body), weight="C",
+                           config=search_config))
+
+
 def today():
     return datetime.now().date()
 
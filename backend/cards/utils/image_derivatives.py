@@ -0,0 +1,140 @@
+"""
+Generation of resized variants (derivatives) of card images:
+for each of settings.IMAGE_DERIVATIVE_WIDTHS narrower than the original -
+in the original format and in WebP (which is also generated at the original
+width).
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+import PIL.Image
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+derivatives_dir = "images/derivatives"
+webp = "WEBP"
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_derivative_name(image_name, width, image_format) -> str:
+    stem, extension = os.path.splitext(os.path.basename(image_name))
+    if image_format == webp:
+        extension = ".webp"
+    return f"{derivatives_dir}/{stem}-{width}w{extension}"
+
+
+def _encode(image, image_format) -> bytes:
+    if image_format == webp:
+        options = {"quality": settings.IMAGE_DERIVATIVE_WEBP_QUALITY}
+    else:
+        options = {"optimize": True} \
+            if image_format in ("JPEG", "PNG") else {}
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    output = BytesIO()
+    image.save(output, format=image_format, **options)
+    return output.getvalue()
+
+
+def make_derivatives(image_file, widths) \
+        -> tuple[int, list[tuple[int, str, bytes]]]:
+    """Returns width of the image and its resized, encoded variants:
+    (width, format, content).
+    """
+    with PIL.Image.open(image_file) as image:
+        original_width, original_height = image.size
+        original_format = image.format
+        if getattr(image, "is_animated", False):
+            # resizing would keep only the first frame
+            return original_width, []
+        image.load()
+        derivatives = []
+        for width in sorted(set(widths) | {original_width}):
+            if width > original_width:
+                continue
+            if width == original_width:
+                resized = image
+            else:
+                height = max(round(original_height * width / original_width),
+                             1)
+                resized = image.resize((width, height),
+                                       PIL.Image.Resampling.LANCZOS)
+            formats = (webp,) if width == original_width \
+                or original_format == webp else (original_format, webp)
+            for image_format in formats:
+                derivatives.append(
+                    (width, image_format, _encode(resized, image_format)))
+    return original_width, derivatives
+
+
+def generate_derivatives(image) -> list[dict]:
+    """Saves derivatives of the Image instance's file and returns their
+    descriptions, for Image.derivatives. The original image is described
+    as well (as the widest variant in its format).
+
+    Former derivatives are not deleted - with content-addressed storage
+    they may be shared with other images (unreferenced ones are deleted
+    by the delete_unused_media command).
+    """
+    storage = image.image.storage
+    with image.image.open("rb") as image_file:
+        original_width, derivatives = make_derivatives(
+            image_file, settings.IMAGE_DERIVATIVE_WIDTHS)
+    descriptions = [{"name": image.image.name, "width": original_width,
+                     "format": None}]
+    for width, image_format, content in derivatives:
+        name = storage.save(
+            get_derivative_name(image.image.name, width, image_format),
+            ContentFile(content))
+        descriptions.append({"name": name, "width": width,
+                             "format": image_format})
+    return descriptions
+
+
+def generate_image_derivatives(image_pk):
+    """Generates derivatives of the image and stores their descriptions.
+    """
+    from cards.models import Image
+    image = Image.objects.filter(pk=image_pk).first()
+    if image is None or not image.image:
+        return
+    Image.objects.filter(pk=image_pk).update(
+        derivatives=generate_derivatives(image))
+
+
+def _generate_in_background(image_pk):
+    try:
+        generate_image_derivatives(image_pk)
+    except Exception:
+        logger.exception("Generating derivatives of the image %s failed.",
+                         image_pk)
+    finally:
+        # the thread's connection is closed according to CONN_MAX_AGE
+        close_old_connections()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # created on first use - in a worker process (after forking)
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_DERIVATIVE_WORKERS,
+                thread_name_prefix="image-derivatives")
+    return _executor
+
+
+def schedule_image_derivatives(image_pk):
+    if settings.IMAGE_DERIVATIVE_WORKERS:
+        _get_executor().submit(_generate_in_background, image_pk)
+    else:
+        generate_image_derivatives(image_pk)
@@ -0,0 +1,40 @@
+import os
+import re
+
+from django.core.files.storage import FileSystemStorage
+
+from .helpers import hash_file_sha256
+
+content_addressed_name_re = re.compile(r"^[0-9a-f]{64}(\.[^/]*)?$")
+
+
+def is_content_addressed(name) -> bool:
+    return bool(content_addressed_name_re.match(os.path.basename(name)))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Stores files under names made of the SHA-256 hash of their contents
+    (in the directory of the original name and with its extension), so
+    that files with identical contents are stored once - saving
+    a file which is already stored returns the existing file's name.
+
+    A file's contents never change under its name, so it may be cached
+    indefinitely.
+    """
+
+    @staticmethod
+    def get_content_name(name, content_hash) -> str:
+        directory, file_name = os.path.split(name)
+        extension = os.path.splitext(file_name)[1].lower()
+        return os.path.join(directory, content_hash + extension)
+
+    def _save(self, name, content):
+        name = self.get_content_name(name, hash_file_sha256(content))
+        if self.exists(name):
+            return name
+        # a file saved concurrently under the same name gets a suffix
+        # (and is merged by the dedupe_media command)
+        return super()._save(name, content)
+
+
+content_addressed_storage = ContentAddressedStorage()
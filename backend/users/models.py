@@ -1,7 +1,7 @@
 import uuid
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, m2m_changed
 
 
 # Create your models here.
@@ -51,8 +51,33 @@ def set_default_selected_user_categories(sender, instance, created, **kwargs):
     if created:
         root_nodes = list(Category.get_root_nodes())
         instance.selected_categories.set(root_nodes)
+        if not root_nodes:
+            # no m2m_changed signal was sent, but cards without
+            # categories are visible anyway
+            VisibleCard.rebuild(instance)
+
+
+def update_visible_cards(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Rebuilds visible cards of users whose selected categories changed.
+    """
+    if reverse and action == "pre_clear":
+        instance._cleared_user_ids = list(
+            instance.category_users.values_list("id", flat=True))
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        users = [instance]
+    elif action == "post_clear":
+        users = User.objects.filter(id__in=instance._cleared_user_ids)
+    else:
+        users = User.objects.filter(id__in=pk_set)
+    for user in users:
+        VisibleCard.rebuild(user)
 
 
 post_save.connect(set_default_selected_user_categories, sender=User)
+m2m_changed.connect(update_visible_cards,
+                    sender=User.selected_categories.through)
 
-from cards.models import CardUserData, Category
+from cards.models import CardUserData, Category, VisibleCard
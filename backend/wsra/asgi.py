@@ -5,6 +5,17 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
+
+Running with gunicorn and uvicorn workers (each worker serves many slow
+clients concurrently; async views - OutstandingCards and MemorizedCard -
+wait for the database in threads without blocking the worker's event
+loop):
+
+    gunicorn wsra.asgi:application -k uvicorn.workers.UvicornWorker \
+        --workers=2 -b 0.0.0.0:8000
+
+Sync views and Django's async ORM share a single thread per worker,
+so the number of workers (not threads) limits the database throughput.
 """
 
 import os
@@ -0,0 +1,57 @@
+"""
+Gunicorn configuration (production profile), used with:
+
+    gunicorn -c python:wsra.gunicorn_config wsra.wsgi
+
+Settings are read from the environment (GUNICORN_* variables):
+
+- worker class defaults to gthread: threads of a worker share the loaded
+  application, while each one uses its own database connection (kept
+  open according to DB_CONN_MAX_AGE),
+- the application is loaded in the master process before forking workers
+  (GUNICORN_PRELOAD), so workers share the memory pages of imported code
+  and start faster,
+- workers are restarted after max requests (with random jitter, so they
+  do not restart all at once) to bound memory growth,
+- each worker is warmed up (see wsra/warmup.py) before it accepts
+  connections.
+"""
+
+import os
+
+
+def env_bool(name, default):
+    return bool(int(os.environ.get(name, default)))
+
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+preload_app = env_bool("GUNICORN_PRELOAD", 1)
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+warm_up_workers = env_bool("GUNICORN_WARM_UP", 1)
+
+
+def pre_fork(server, worker):
+    # database connections must not be shared with forked workers
+    # (the preloaded application should not open any, but be sure)
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
+
+
+def post_worker_init(worker):
+    # called after the worker has loaded the application (which, without
+    # preload_app, is not loaded yet in post_fork) and before it starts
+    # accepting connections
+    if warm_up_workers:
+        from django.db import connections
+        from wsra.warmup import warm_up
+        warm_up()
+        # request threads open their own connections
+        connections.close_all()
@@ -0,0 +1,182 @@
+"""
+Serving of uploaded media files (card images and sounds).
+
+With a front proxy configured (settings.MEDIA_SENDFILE_HEADER) the view
+only checks the file and hands it over to the proxy, so workers are not
+tied up with sending files. Otherwise files are sent by Django, with
+support for conditional (ETag, If-Modified-Since) and range requests,
+used by browsers for seeking in and re-fetching of audio files.
+
+Content-addressed files (see cards.utils.storage) are cached by browsers
+as immutable.
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from cards.utils.storage import is_content_addressed
+
+range_header_re = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def get_file_path(path) -> tuple[str, str]:
+    """Returns the normalized path (relative to MEDIA_ROOT) and the absolute
+    path of the media file.
+    """
+    relative_path = posixpath.normpath(path).lstrip("/")
+    try:
+        absolute_path = safe_join(settings.MEDIA_ROOT, relative_path)
+    except SuspiciousFileOperation:
+        raise Http404("Invalid path.")
+    if not os.path.isfile(absolute_path):
+        raise Http404("The file does not exist.")
+    return relative_path, absolute_path
+
+
+def get_etag(stat_result) -> str:
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def parse_range(range_header, size) -> tuple[int, int] | None:
+    """Returns the first and the last (inclusive) byte position of
+    a single byte range or None if the header is absent or should be
+    ignored (malformed ranges and multiple ranges - the whole file is
+    sent instead).
+    """
+    match = range_header_re.match(range_header.strip()) \
+        if range_header else None
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # suffix range: the last bytes of the file
+        suffix_length = int(last)
+        if not suffix_length or not size:
+            raise RangeNotSatisfiable
+        return max(size - suffix_length, 0), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise RangeNotSatisfiable
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def if_range_matches(request, etag, last_modified) -> bool:
+    if_range = request.headers.get("If-Range")
+    if if_range is None:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def read_file_range(path, first, length, block_size=FileResponse.block_size):
+    with open(path, "rb") as file:
+        file.seek(first)
+        while length > 0:
+            chunk = file.read(min(block_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def set_content_headers(response, absolute_path):
+    content_type, encoding = mimetypes.guess_type(absolute_path)
+    response.headers["Content-Type"] = content_type \
+        or "application/octet-stream"
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+
+
+def set_cache_headers(response, relative_path, etag=None,
+                      last_modified=None):
+    if etag is not None:
+        response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    if is_content_addressed(relative_path):
+        # contents of the file never change under its name
+        patch_cache_control(response, public=True, immutable=True,
+                            max_age=settings.MEDIA_IMMUTABLE_MAX_AGE)
+    else:
+        patch_cache_control(response, public=True,
+                            max_age=settings.MEDIA_CACHE_MAX_AGE)
+
+
+def get_proxy_response(relative_path, absolute_path) -> HttpResponse:
+    """Response delegating sending of the file to the front proxy (which
+    also handles conditional and range requests).
+    """
+    header = settings.MEDIA_SENDFILE_HEADER
+    response = HttpResponse()
+    if header.lower() == "x-accel-redirect":
+        response.headers[header] = quote(
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/")
+            + "/" + relative_path)
+    else:
+        response.headers[header] = absolute_path
+    set_content_headers(response, absolute_path)
+    set_cache_headers(response, relative_path)
+    return response
+
+
+def get_file_response(request, relative_path, absolute_path) \
+        -> HttpResponse:
+    stat_result = os.stat(absolute_path)
+    size = stat_result.st_size
+    etag = get_etag(stat_result)
+    last_modified = int(stat_result.st_mtime)
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        set_cache_headers(not_modified, relative_path, etag, last_modified)
+        return not_modified
+
+    try:
+        byte_range = parse_range(request.headers.get("Range"), size) \
+            if if_range_matches(request, etag, last_modified) else None
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response.headers["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(absolute_path, "rb"))
+    else:
+        first, last = byte_range
+        length = last - first + 1
+        response = StreamingHttpResponse(
+            read_file_range(absolute_path, first, length), status=206)
+        response.headers["Content-Length"] = str(length)
+        response.headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    response.headers["Accept-Ranges"] = "bytes"
+    set_content_headers(response, absolute_path)
+    set_cache_headers(response, relative_path, etag, last_modified)
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    relative_path, absolute_path = get_file_path(path)
+    if settings.MEDIA_SENDFILE_HEADER:
+        return get_proxy_response(relative_path, absolute_path)
+    return get_file_response(request, relative_path, absolute_path)
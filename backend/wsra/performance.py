@@ -0,0 +1,197 @@
+"""
+Per-request performance metrics: number and total time of SQL queries,
+time spent serializing (serializers' to_representation) and rendering
+card bodies, and total (wall) time of the request.
+
+Metrics of sampled requests are sent in the Server-Timing header and
+logged (as JSON) by the 'wsra.performance' logger - at WARNING level for
+requests slower than the threshold (also when not sampled - with
+the total time only). Configured with settings.PERFORMANCE_METRICS;
+when disabled the middleware is not used at all.
+"""
+
+import json
+import logging
+import random
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, \
+    sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# metrics of the current (sampled) request - propagated to threads
+# running sync_to_async() code
+current_metrics: ContextVar["RequestMetrics | None"] = ContextVar(
+    "current_metrics", default=None)
+
+
+class RequestMetrics:
+    timers = ("sql", "serialize", "render")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.durations = dict.fromkeys(self.timers, 0.0)
+        # nested timers (e.g. nested serializers) are not counted twice
+        self.running = set()
+        self._lock = Lock()
+
+    def add(self, timer, seconds):
+        with self._lock:
+            self.durations[timer] += seconds
+            if timer == "sql":
+                self.sql_count += 1
+
+    def as_dict(self, total) -> dict:
+        return {
+            "sql_count": self.sql_count,
+            **{f"{timer}_ms": round(seconds * 1000, 2)
+               for timer, seconds in self.durations.items()},
+            "total_ms": round(total * 1000, 2),
+        }
+
+    def server_timing(self, total) -> str:
+        metrics = [f'sql;dur={self.durations["sql"] * 1000:.2f};'
+                   f'desc="{self.sql_count} queries"']
+        metrics += [f"{timer};dur={self.durations[timer] * 1000:.2f}"
+                    for timer in self.timers[1:]]
+        metrics.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+@contextmanager
+def measure(timer):
+    """Adds time spent in the block to the timer of the current request's
+    metrics (if the request is sampled).
+    """
+    metrics = current_metrics.get()
+    if metrics is None or timer in metrics.running:
+        yield
+        return
+    metrics.running.add(timer)
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(timer, perf_counter() - start)
+        metrics.running.discard(timer)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add("sql", perf_counter() - start)
+
+
+@contextmanager
+def instrument_queries():
+    """Records queries run in the current thread (database connections
+    are thread-local) if the request is sampled.
+    """
+    if current_metrics.get() is None:
+        yield
+        return
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(record_query))
+        yield
+
+
+class TimedSerializerMixin:
+    """Records time of serializing objects (outermost serializers only).
+    """
+
+    def to_representation(self, instance):
+        if current_metrics.get() is None:
+            return super().to_representation(instance)
+        with measure("serialize"):
+            return super().to_representation(instance)
+
+
+class PerformanceMiddleware:
+    """Measures requests in both sync (WSGI) and async (ASGI) mode - so
+    Django doesn't adapt the rest of the middleware chain to it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = settings.PERFORMANCE_METRICS
+        if not config["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config["SAMPLE_RATE"]
+        self.slow_request_seconds = config["SLOW_REQUEST_MS"] / 1000
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            start = perf_counter()
+            response = self.get_response(request)
+            self.log_slow(request, response, perf_counter() - start)
+            return response
+
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        start = perf_counter()
+        try:
+            with instrument_queries():
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.add_metrics(request, response, metrics, perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            start = perf_counter()
+            response = await self.get_response(request)
+            self.log_slow(request, response, perf_counter() - start)
+            return response
+
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        start = perf_counter()
+        # queries are run in the request's sync thread (and connections
+        # are thread-local), so they are instrumented there
+        queries = ExitStack()
+        try:
+            await sync_to_async(queries.enter_context)(instrument_queries())
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(queries.close)()
+            current_metrics.reset(token)
+        self.add_metrics(request, response, metrics, perf_counter() - start)
+        return response
+
+    def log_slow(self, request, response, total):
+        # metrics of a request which isn't sampled
+        if total >= self.slow_request_seconds:
+            self.log(request, response, {
+                "total_ms": round(total * 1000, 2)}, slow=True)
+
+    def add_metrics(self, request, response, metrics, total):
+        response.headers["Server-Timing"] = metrics.server_timing(total)
+        self.log(request, response, metrics.as_dict(total),
+                 slow=total >= self.slow_request_seconds)
+
+    @staticmethod
+    def log(request, response, metrics, slow):
+        record = {"method": request.method, "path": request.path,
+                  "status": response.status_code, "slow": slow, **metrics}
+        logger.log(logging.WARNING if slow else logging.INFO,
+                   json.dumps(record), extra={"performance": record})
@@ -0,0 +1,52 @@
+"""PostgreSQL backend which records the number of opened connections and
+the time spent opening them (including the connection's initialization).
+"""
+import logging
+from threading import Lock
+from time import perf_counter
+
+from django.db.backends.postgresql import base
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionStats:
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.total_time = 0.0
+            self.max_time = 0.0
+
+    def record(self, setup_time):
+        with self._lock:
+            self.count += 1
+            self.total_time += setup_time
+            self.max_time = max(self.max_time, setup_time)
+
+    @property
+    def mean_time(self):
+        return self.total_time / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {"count": self.count,
+                "total_ms": self.total_time * 1000,
+                "mean_ms": self.mean_time * 1000,
+                "max_ms": self.max_time * 1000}
+
+
+connection_stats = ConnectionStats()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def connect(self):
+        start = perf_counter()
+        super().connect()
+        setup_time = perf_counter() - start
+        connection_stats.record(setup_time)
+        logger.debug("database connection %r opened in %.2f ms "
+                     "(%d opened by the process)", self.alias,
+                     setup_time * 1000, connection_stats.count)
@@ -66,6 +66,8 @@ AUTH_USER_MODEL = 'users.User'
 # DBBACKUP_STORAGE_OPTIONS = {'location': '/wsra/backup'}
 
 MIDDLEWARE = [
+    # not used unless PERFORMANCE_METRICS['ENABLED']
+    'wsra.performance.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -77,6 +79,17 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
 ]
 
+# Per-request performance metrics (Server-Timing header and logs of
+# the 'wsra.performance' logger) - see wsra/performance.py. Metrics are
+# collected for SAMPLE_RATE (0-1) of requests; requests slower than
+# SLOW_REQUEST_MS are logged with WARNING level.
+PERFORMANCE_METRICS = {
+    'ENABLED': bool(int(os.environ.get('PERFORMANCE_METRICS', 0))),
+    'SAMPLE_RATE': float(
+        os.environ.get('PERFORMANCE_METRICS_SAMPLE_RATE', 1)),
+    'SLOW_REQUEST_MS': float(
+        os.environ.get('PERFORMANCE_METRICS_SLOW_REQUEST_MS', 500)),
+}
 
 CORS_ORIGIN_WHITELIST = (
     'http://localhost:3000',
@@ -106,14 +119,36 @@ WSGI_APPLICATION = 'wsra.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# connection management (environment variables):
+# DB_CONN_MAX_AGE - seconds a connection is reused for
+#   (0 - a new connection for each request, 'none' - unlimited);
+#   default: 60 in production, 0 otherwise
+# DB_CONN_HEALTH_CHECKS - 1/0, check reused connections before requests;
+#   default: 1 in production
+# DB_POOLER - 1 when connecting through a transaction pooler
+#   (e.g. PgBouncer - with async workers, where persistent connections
+#   cannot be reused): connections are closed after each request
+#   and server-side cursors are disabled
+DB_POOLER = bool(int(os.environ.get('DB_POOLER', 0)))
+_db_conn_max_age = os.environ.get(
+    'DB_CONN_MAX_AGE', '60' if ENVIRONMENT == 'production' else '0')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # django.db.backends.postgresql with connection instrumentation
+        'ENGINE': 'wsra.postgresql',
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
-        'PORT': 5432
+        'PORT': int(os.environ.get('DB_PORT', 5432)),
+        'CONN_MAX_AGE': (0 if DB_POOLER
+                         else None if _db_conn_max_age.lower() == 'none'
+                         else int(_db_conn_max_age)),
+        'CONN_HEALTH_CHECKS': bool(int(os.environ.get(
+            'DB_CONN_HEALTH_CHECKS',
+            1 if ENVIRONMENT == 'production' else 0))),
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOLER,
     }
 }
 
@@ -154,6 +189,34 @@ MEDIA_URL = '/media/'
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media files are served by wsra.media.serve_media. With a front proxy
+# configured (MEDIA_SENDFILE_HEADER), the response only names the file
+# and the proxy sends it:
+# - 'X-Accel-Redirect' (nginx) - with the file's path appended to
+#   MEDIA_ACCEL_REDIRECT_PREFIX (an internal location aliased to
+#   MEDIA_ROOT),
+# - 'X-Sendfile' (Apache mod_xsendfile, lighttpd) - with the file's
+#   absolute path.
+# Otherwise files are sent by Django (with range requests support).
+MEDIA_SENDFILE_HEADER = os.environ.get('MEDIA_SENDFILE_HEADER') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get(
+    'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+# seconds browsers may use media files without revalidation
+MEDIA_CACHE_MAX_AGE = int(os.environ.get('MEDIA_CACHE_MAX_AGE', 86400))
+# ... and files named by their contents hash (which never change)
+MEDIA_IMMUTABLE_MAX_AGE = int(
+    os.environ.get('MEDIA_IMMUTABLE_MAX_AGE', 365 * 24 * 60 * 60))
+
+# Resized variants of uploaded card images (in the original format and in
+# WebP), generated in a pool of IMAGE_DERIVATIVE_WORKERS background
+# threads (0 - generated while saving the image).
+IMAGE_DERIVATIVE_WIDTHS = [
+    int(width) for width in
+    os.environ.get('IMAGE_DERIVATIVE_WIDTHS', '320,640,1280').split(',')]
+IMAGE_DERIVATIVE_WORKERS = int(os.environ.get('IMAGE_DERIVATIVE_WORKERS', 2))
+IMAGE_DERIVATIVE_WEBP_QUALITY = int(
+    os.environ.get('IMAGE_DERIVATIVE_WEBP_QUALITY', 80))
+
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "static"),
 ]
@@ -176,7 +239,7 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         # for tests, SessionAuthentication should be turned on
         # 'rest_framework.authentication.SessionAuthentication'
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -187,6 +250,17 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# token -> user lookups cached by api.authentication.CachedTokenAuthentication
+# process-local by default - cached tokens of a logged out or deactivated
+# user are invalidated in other processes only after TIMEOUT (seconds);
+# SHARED_CACHE (an alias from CACHES, e.g. using Redis or Memcached)
+# invalidates them in all processes at once
+TOKEN_AUTH_CACHE = {
+    'TIMEOUT': int(os.environ.get('TOKEN_AUTH_CACHE_TIMEOUT', 60)),
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_MAX_SIZE', 10000)),
+    'SHARED_CACHE': os.environ.get('TOKEN_AUTH_SHARED_CACHE'),
+}
+
 DJOSER = {
     'PERMISSIONS': {
         'user_create': ['rest_framework.permissions.IsAdminUser'],
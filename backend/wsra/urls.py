@@ -13,11 +13,9 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.conf import settings
 from django.urls import path, include, re_path
-from django.views.static import serve
+from wsra.media import serve_media
 
 urlpatterns = [
     path("", include("react_app.urls")),
@@ -27,15 +25,7 @@ urlpatterns = [
     path('api/auth/', include('djoser.urls.authtoken')),
     path('api-auth/', include('rest_framework.urls')),
 
-    # hack for public testing purposes only
-    # for real life deployment - cloud storage
-    # or proxy server (installed as another service in Render,
-    # for example) should be used
-    re_path(r'^media/(?P<path>.*)$', serve,
-            {'document_root': settings.MEDIA_ROOT}),
+    # files are sent by the front proxy if one is configured
+    # (see MEDIA_SENDFILE_HEADER in settings)
+    re_path(r'^media/(?P<path>.*)$', serve_media, name="media"),
 ]
-
-# works only in debug mode
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL,
-                          document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,63 @@
+"""
+Warms up a freshly started (e.g. gunicorn) worker process, so that
+the first requests it serves do not pay for lazy initialization:
+importing views and building the URL resolver, opening the database
+connection and compiling card templates.
+
+Only connections and imports are primed - no data (e.g. the category
+forest) is cached, so requests never see stale data.
+"""
+
+import logging
+from pathlib import Path
+from time import perf_counter
+
+from django.apps import apps
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def load_urlconf():
+    resolver = get_resolver()
+    # imports the views and populates reverse() lookups
+    resolver.reverse_dict
+    return resolver
+
+
+def open_database_connection():
+    """Opens the connection with the query the categories view starts
+    with (the result isn't kept).
+    """
+    from cards.models import Category
+    Category.objects.filter(parent=None).exists()
+
+
+def compile_card_templates() -> int:
+    """Loads the file templates of the cards app (into the cached template
+    loader) and compiles database templates of the cards.
+    """
+    from api.utils.helpers import compile_card_template
+    from cards.models import CardTemplate
+    templates_dir = Path(apps.get_app_config("cards").path) / "templates"
+    for template_path in templates_dir.glob("*.html"):
+        get_template(template_path.name)
+    bodies = CardTemplate.objects.values_list("body", flat=True).distinct()
+    for body in bodies:
+        compile_card_template(body)
+    return len(bodies)
+
+
+def warm_up():
+    start = perf_counter()
+    try:
+        load_urlconf()
+        open_database_connection()
+        compiled_templates = compile_card_templates()
+    except Exception:
+        # a worker should start (and report errors on requests) regardless
+        logger.exception("Warm-up failed.")
+        return
+    logger.info("Warm-up finished in %.1f ms (%d card templates compiled).",
+                (perf_counter() - start) * 1000, compiled_templates)